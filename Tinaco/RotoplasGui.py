@@ -1,6 +1,15 @@
 import tkinter as tk
 from tkinter import ttk
 import customtkinter as ctk
+from grafica_nivel import GraficaNivel
+
+# Cada cuánto se revisa el contador de versión del tinaco (lectura sin lock)
+INTERVALO_REVISION_MS = 50
+# Cada cuánto se agrega una muestra a la gráfica de historial
+INTERVALO_GRAFICA_MS = 1000
+# Cada cuánto se refresca el panel de instrumentación mientras está abierto
+INTERVALO_INSTRUMENTACION_MS = 1000
+
 
 class RotoplasGUI(ctk.CTk):
     def __init__(self, tinaco):
@@ -110,7 +119,7 @@ class RotoplasGUI(ctk.CTk):
         self.create_status_section(
             self.right_panel, 
             "ENTRADAS DE AGUA", 
-            ["Pluvial", "Cisterna"], 
+            self.tinaco.FUENTES, 
             0
         )
         
@@ -118,7 +127,7 @@ class RotoplasGUI(ctk.CTk):
         self.create_status_section(
             self.right_panel, 
             "TOMAS DE AGUA", 
-            ["Jardin", "Lavadero", "Banio"], 
+            self.tinaco.CONSUMOS, 
             1
         )
         
@@ -132,12 +141,31 @@ class RotoplasGUI(ctk.CTk):
         )
         self.rain_button.grid(row=2, column=0, sticky="ew", padx=20, pady=20)
         
+        # Panel de instrumentación (solo si el tinaco se creó con instrumentar=True)
+        self.panel_instrumentacion = None
+        if self.tinaco.instrumentacion is not None:
+            self.instrumentation_button = ctk.CTkButton(
+                self.right_panel,
+                text="Instrumentación",
+                command=self.toggle_instrumentation,
+                font=("Roboto", 14),
+                height=32
+            )
+            self.instrumentation_button.grid(row=3, column=0, sticky="ew", padx=20, pady=(0, 20))
+        
+        # Gráfica de historial
+        self.create_chart()
+        
         # Footer con información adicional
         self.create_footer()
         
         # Iniciar actualización
         self.is_raining = False
-        self.after(500, self.update_display)
+        self._version_mostrada = None
+        self._valores_mostrados = {}  # widget -> último valor aplicado
+        self._instantanea = self.tinaco.instantanea()  # se llena en sitio en cada revisión
+        self.after(INTERVALO_REVISION_MS, self.update_display)
+        self.after(INTERVALO_GRAFICA_MS, self.sample_chart)
     
     def toggle_rain(self):
         if self.is_raining:
@@ -149,6 +177,46 @@ class RotoplasGUI(ctk.CTk):
             self.is_raining = True
             self.rain_button.configure(text="Detener Lluvia")
 
+    def toggle_instrumentation(self):
+        if self.panel_instrumentacion is not None:
+            self.after_cancel(self._revision_instrumentacion)
+            self.panel_instrumentacion.destroy()
+            self.panel_instrumentacion = None
+            return
+        
+        self.panel_instrumentacion = ctk.CTkToplevel(self)
+        self.panel_instrumentacion.title("Instrumentación del tinaco")
+        self.panel_instrumentacion.geometry("900x400")
+        self.panel_instrumentacion.protocol("WM_DELETE_WINDOW", self.toggle_instrumentation)
+        self.instrumentation_text = ctk.CTkTextbox(
+            self.panel_instrumentacion, font=("Courier", 12), wrap="none"
+        )
+        self.instrumentation_text.pack(fill="both", expand=True, padx=10, pady=10)
+        self.update_instrumentation()
+    
+    def update_instrumentation(self):
+        lineas = [
+            f"{'Proceso':<24}{'Operación':<22}{'Llamadas':>10}{'Éxitos':>9}{'Fallos':>9}"
+            f"{'Espera µs':>11}{'p99':>9}{'Retención µs':>14}{'p99':>9}"
+        ]
+        por_proceso = self.tinaco.estadisticas(por_proceso=True)
+        for (pid, nombre), operaciones in por_proceso.items():
+            for operacion, datos in operaciones.items():
+                if datos['llamadas'] == 0:
+                    continue
+                lineas.append(
+                    f"{f'{nombre} ({pid})':<24.24}{operacion:<22.22}{datos['llamadas']:>10}"
+                    f"{datos['exitos']:>9}{datos['fallos']:>9}"
+                    f"{datos['espera_media_us']:>11.1f}{datos['espera_p99_us']:>9.1f}"
+                    f"{datos['retencion_media_us']:>14.1f}{datos['retencion_p99_us']:>9.1f}"
+                )
+        
+        self.instrumentation_text.configure(state="normal")
+        self.instrumentation_text.delete("1.0", "end")
+        self.instrumentation_text.insert("1.0", "\n".join(lineas))
+        self.instrumentation_text.configure(state="disabled")
+        self._revision_instrumentacion = self.after(INTERVALO_INSTRUMENTACION_MS, self.update_instrumentation)
+    
     def create_status_section(self, parent, title, items, row):
         section = ctk.CTkFrame(parent)
         section.grid(row=row, column=0, sticky="ew", padx=10, pady=10)
@@ -210,9 +278,40 @@ class RotoplasGUI(ctk.CTk):
         
         return {"indicator": status_indicator, "status": status}
 
+    def create_chart(self):
+        chart_frame = ctk.CTkFrame(self.main_frame)
+        chart_frame.grid(row=2, column=0, sticky="ew", padx=10, pady=5)
+        
+        chart_title = ctk.CTkLabel(
+            chart_frame,
+            text="HISTORIAL (última hora)",
+            font=("Roboto", 14, "bold"),
+            text_color="#3B82F6"
+        )
+        chart_title.pack(pady=(5, 0))
+        
+        self.grafica = GraficaNivel(chart_frame, self.tinaco.CONSUMOS, self.tinaco.capacidad_max)
+        self.grafica.pack(padx=10, pady=5)
+        
+        # Si hay historial guardado se muestra lo que ya cabe en la ventana
+        historial = self.tinaco.historial
+        if historial is not None:
+            desde = self.tinaco.reloj() - self.grafica.ventana
+            self.grafica.cargar(
+                (tiempo, nivel, bomba, consumos)
+                for tiempo, nivel, _, consumos, bomba in historial.rango(desde)
+            )
+
+    def sample_chart(self):
+        if self._version_mostrada is not None:
+            estado = self._instantanea
+            self.grafica.agregar(self.tinaco.reloj(), estado.nivel_agua,
+                                 bool(estado.bomba_activa), estado.consumos)
+        self.after(INTERVALO_GRAFICA_MS, self.sample_chart)
+
     def create_footer(self):
         footer = ctk.CTkFrame(self.main_frame)
-        footer.grid(row=2, column=0, sticky="ew", padx=10, pady=5)
+        footer.grid(row=3, column=0, sticky="ew", padx=10, pady=5)
         footer.grid_columnconfigure(0, weight=1)
         
         status_text = ctk.CTkLabel(
@@ -222,40 +321,47 @@ class RotoplasGUI(ctk.CTk):
         )
         status_text.pack(pady=5)
 
+    def _aplicar(self, widget, valor, **opciones):
+        """Reconfigura `widget` solo si `valor` cambió desde la última vez."""
+        if self._valores_mostrados.get(widget) != valor:
+            self._valores_mostrados[widget] = valor
+            widget.configure(**opciones)
+
+    def _aplicar_indicador(self, indicador, activo):
+        color = "#22C55E" if activo else "#EF4444"
+        self._aplicar(indicador["status"], activo,
+                      text="Activo" if activo else "Desactivado", text_color=color)
+        self._aplicar(indicador["indicator"], activo, text_color=color)
+
     def update_display(self):
-        # Obtener estado actual
-        estado = self.tinaco.obtener_estado()
-        
-        # Actualizar nivel de agua
-        level = estado['nivel_agua'] / self.tinaco.capacidad_max
-        self.water_level.set(level)
-        self.water_info.configure(text=f"{estado['nivel_agua']:.1f}L ({estado['porcentaje']:.1f}%)")
-        
-        # Actualizar estado de bomba
-        self.bomba_status.configure(
-            text="Activa" if estado['bomba_activa'] else "Inactiva",
-            text_color="#22C55E" if estado['bomba_activa'] else "#EF4444"
-        )
-        
-        # Actualizar indicadores de entrada
-        for source, status in estado['fuentes'].items():
-            self.input_indicators[source]["status"].configure(
-                text="Activo" if status else "Desactivado",
-                text_color="#22C55E" if status else "#EF4444"
-            )
-            self.input_indicators[source]["indicator"].configure(
-                text_color="#22C55E" if status else "#EF4444"
-            )
+        # Solo se redibuja si el estado cambió desde la última revisión
+        if self.tinaco.version != self._version_mostrada:
+            estado = self.tinaco.leer_estado(self._instantanea)
+            self._version_mostrada = estado.version
             
-        # Actualizar indicadores de toma
-        for outlet, status in estado['consumos'].items():
-            self.output_indicators[outlet]["status"].configure(
-                text="Activo" if status else "Desactivado",
-                text_color="#22C55E" if status else "#EF4444"
-            )
-            self.output_indicators[outlet]["indicator"].configure(
-                text_color="#22C55E" if status else "#EF4444"
+            # Actualizar nivel de agua
+            level = estado.nivel_agua / self.tinaco.capacidad_max
+            if self._valores_mostrados.get(self.water_level) != level:
+                self._valores_mostrados[self.water_level] = level
+                self.water_level.set(level)
+            texto = f"{estado.nivel_agua:.1f}L ({estado.porcentaje:.1f}%)"
+            self._aplicar(self.water_info, texto, text=texto)
+            
+            # Actualizar estado de bomba
+            bomba_activa = bool(estado.bomba_activa)
+            self._aplicar(
+                self.bomba_status, bomba_activa,
+                text="Activa" if bomba_activa else "Inactiva",
+                text_color="#22C55E" if bomba_activa else "#EF4444"
             )
-        
-        # próxima actualización
-        self.after(500, self.update_display)
\ No newline at end of file
+            
+            # Actualizar indicadores de entrada
+            for source in self.tinaco.FUENTES:
+                self._aplicar_indicador(self.input_indicators[source], estado.fuente_activa(source))
+                
+            # Actualizar indicadores de toma
+            for outlet in self.tinaco.CONSUMOS:
+                self._aplicar_indicador(self.output_indicators[outlet], estado.consumo_activo(outlet))
+        
+        # próxima revisión
+        self.after(INTERVALO_REVISION_MS, self.update_display)
\ No newline at end of file
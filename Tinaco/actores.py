@@ -0,0 +1,234 @@
+import random
+
+# Periodo de cada actor en segundos
+PERIODO_PLUVIAL = 4
+PERIODO_CISTERNA = 3
+PERIODO_BOMBA = 1
+PERIODO_JARDIN = 5
+PERIODO_LAVADERO = 4
+PERIODO_BANIO = 3
+PERIODO_DESPACHO = 1
+
+# Actores del tinaco por defecto. Cada fuente tiene un tipo que decide su
+# regla ('pluvial' o 'cisterna'); los umbrales están en porcentaje.
+ACTORES_BASE = {
+    'fuentes': [
+        {'nombre': 'Pluvial', 'tipo': 'pluvial', 'periodo': PERIODO_PLUVIAL, 'probabilidad': 0.2},
+        {'nombre': 'Cisterna', 'tipo': 'cisterna', 'periodo': PERIODO_CISTERNA,
+         'encender_bajo': 30, 'apagar_sobre': 90},
+    ],
+    'bomba': {'periodo': PERIODO_BOMBA, 'nivel_minimo': 25},
+    'consumos': [
+        {'nombre': 'Jardin', 'periodo': PERIODO_JARDIN},
+        {'nombre': 'Lavadero', 'periodo': PERIODO_LAVADERO},
+        {'nombre': 'Banio', 'periodo': PERIODO_BANIO},
+    ],
+}
+
+
+def paso_pluvial(tinaco, rng=random, fuente='Pluvial', probabilidad=0.2, periodo=PERIODO_PLUVIAL):
+    """
+    Un ciclo de la entrada de agua pluvial.
+    Se activa aleatoriamente o por simulación manual.
+    Devuelve los segundos hasta el siguiente ciclo.
+    """
+    # Simulación aleatoria de lluvia (20% de probabilidad por defecto)
+    if rng.random() < probabilidad:
+        tinaco.lluvia_evento.set()
+        tinaco.registrar("Está lloviendo")
+
+    if tinaco.lluvia_evento.is_set():
+        tinaco.llenar(fuente)  # El mensaje ya se imprime en el método
+
+    return periodo
+
+
+def paso_cisterna(tinaco, fuente='Cisterna', encender_bajo=30, apagar_sobre=90, periodo=PERIODO_CISTERNA,
+                  pronostico=None, horizonte=0):
+    """
+    Un ciclo del llenado desde la cisterna.
+    Llena cuando el nivel es menor al 30% y apaga la bomba al llegar al 90%.
+    La revisión del nivel y las acciones van en una sola transacción.
+    
+    Con `pronostico` (PronosticoDemanda) el llenado es anticipado: el
+    pronóstico sigue la demanda neta (consumo menos lo que entregan las
+    demás fuentes) y la bomba arranca solo si, sin llenar, el nivel bajaría
+    de `encender_bajo` dentro de `horizonte` segundos. Encendida, llena
+    hasta `apagar_sobre`; ahí se apaga solo si no se prevé otro arranque
+    dentro del horizonte siguiente, así que con tandas seguidas la bomba
+    sigue en marcha en vez de arrancar una vez por tanda. Mientras el
+    pronóstico no está listo arranca como la regla reactiva y no se apaga.
+    """
+    def regla(transaccion):
+        porcentaje = transaccion.porcentaje
+        # Activar llenado si el nivel es menor al 30%
+        if porcentaje < encender_bajo:
+            transaccion.activar_bomba()
+            if not transaccion.llenar(fuente):
+                transaccion.desactivar_bomba()
+        elif porcentaje >= apagar_sobre:
+            # Desactivar bomba si el tinaco está casi lleno
+            transaccion.desactivar_bomba()
+    
+    def previsto(ahora, segundos):
+        """Porcentaje del nivel que se prevé consumir en `segundos` (sin la cisterna)."""
+        if not pronostico.listo:
+            return 0.0
+        return max(pronostico.demanda(ahora, segundos), 0.0) / tinaco.capacidad_max * 100
+    
+    def anticipada(transaccion):
+        ahora = tinaco.reloj()
+        neta = transaccion.consumido - (transaccion.entregado() - transaccion.entregado(fuente))
+        pronostico.observar(ahora, neta)
+        porcentaje = transaccion.porcentaje
+        if not transaccion.bomba_activa:
+            if porcentaje - previsto(ahora, horizonte) < encender_bajo and transaccion.activar_bomba():
+                transaccion.llenar(fuente)
+        elif porcentaje < apagar_sobre:
+            transaccion.llenar(fuente)
+        elif pronostico.listo and porcentaje - previsto(ahora, 2 * horizonte) >= encender_bajo:
+            # Si dentro de dos horizontes no baja del umbral, tampoco habría
+            # que volver a arrancar dentro de uno
+            transaccion.desactivar_bomba()
+    
+    tinaco.ejecutar(regla if pronostico is None else anticipada)
+    return periodo
+
+
+def paso_bomba(tinaco, nivel_minimo=25, periodo=PERIODO_BOMBA):
+    """
+    Un ciclo de la bomba de presión.
+    Se apaga si no hay ninguna toma abierta o el nivel baja del 25%.
+    """
+    def regla(transaccion):
+        # Verificar si hay algún consumo activo y el nivel del agua
+        consumos_activos = any(transaccion.consumos.values())
+        if not consumos_activos or transaccion.porcentaje < nivel_minimo:
+            return transaccion.desactivar_bomba()
+        return False
+
+    # La lectura sin lock evita la transacción cuando la bomba está apagada
+    if tinaco.bomba_activa and tinaco.ejecutar(regla):
+        tinaco.registrar("Bomba apagada")
+
+    return periodo
+
+
+def controlar_cisterna(tinaco, terminar_evento, fuente='Cisterna', encender_bajo=30, apagar_sobre=90,
+                       periodo=PERIODO_CISTERNA, pronostico=None, horizonte=0):
+    """
+    Control de la cisterna por eventos (para un proceso propio): duerme
+    hasta que el nivel baja de `encender_bajo` o llega a `apagar_sobre`
+    con la bomba activa y entonces aplica paso_cisterna. Mientras el nivel
+    siga bajo, `periodo` marca el ritmo de llenado.
+    Con `pronostico` el llenado es anticipado (ver paso_cisterna) y se
+    revisa cada `periodo`, porque el pronóstico necesita una muestra del
+    consumo en cada ciclo.
+    """
+    if pronostico is not None:
+        while True:
+            paso_cisterna(tinaco, fuente, encender_bajo, apagar_sobre, periodo, pronostico, horizonte)
+            if terminar_evento.wait(periodo):
+                return
+    
+    def relevante(transaccion):
+        porcentaje = transaccion.porcentaje
+        return porcentaje < encender_bajo or (porcentaje >= apagar_sobre and transaccion.bomba_activa)
+
+    while tinaco.esperar(relevante, terminar_evento=terminar_evento):
+        paso_cisterna(tinaco, fuente, encender_bajo, apagar_sobre, periodo)
+        if tinaco.nivel_agua / tinaco.capacidad_max * 100 < encender_bajo:
+            if terminar_evento.wait(periodo):
+                break
+
+
+def controlar_bomba(tinaco, terminar_evento, nivel_minimo=25):
+    """
+    Control de la bomba de presión por eventos: duerme hasta que la bomba
+    está activa sin ninguna toma abierta o con el nivel bajo del 25%, y
+    entonces la apaga con paso_bomba.
+    """
+    def apagar(transaccion):
+        return transaccion.bomba_activa and (
+            not any(transaccion.consumos.values()) or transaccion.porcentaje < nivel_minimo
+        )
+
+    while tinaco.esperar(apagar, terminar_evento=terminar_evento):
+        paso_bomba(tinaco, nivel_minimo)
+
+
+def paso_consumo(tinaco, consumo, periodo):
+    """Un uso de la toma `consumo`; la regla de nivel la aplica el tinaco."""
+    tinaco.consumir(consumo)  # El mensaje ya se imprime en el método
+    return periodo
+
+
+def paso_solicitud(tinaco, consumo, periodo, usos=1):
+    """Un ciclo de la toma `consumo` con despacho: encola `usos` usos (ver TinacoContext.solicitar)."""
+    tinaco.solicitar(consumo, usos)
+    return periodo
+
+
+def paso_despacho(tinaco, periodo=PERIODO_DESPACHO):
+    """Un despacho de la demanda encolada, por prioridad y en lote (ver TinacoContext.despachar)."""
+    tinaco.despachar()
+    return periodo
+
+
+def paso_jardin(tinaco):
+    """Riego del jardín; solo consume si el nivel está por encima del 50%."""
+    return paso_consumo(tinaco, 'Jardin', PERIODO_JARDIN)
+
+
+def paso_lavadero(tinaco):
+    """Uso del lavadero; no debe llevar el tinaco a menos del 3%."""
+    return paso_consumo(tinaco, 'Lavadero', PERIODO_LAVADERO)
+
+
+def paso_banio(tinaco):
+    """Uso del baño; siempre puede consumir mientras haya agua."""
+    return paso_consumo(tinaco, 'Banio', PERIODO_BANIO)
+
+
+def _paso_fuente(tinaco, fuente, rng):
+    nombre = fuente['nombre']
+    if fuente['tipo'] == 'pluvial':
+        return lambda: paso_pluvial(tinaco, rng, nombre, fuente['probabilidad'], fuente['periodo'])
+    if fuente['tipo'] == 'cisterna':
+        # 'horizonte' (segundos, opcional) activa el llenado anticipado
+        horizonte = fuente.get('horizonte', 0)
+        pronostico = tinaco.pronostico(nombre) if horizonte else None
+        return lambda: paso_cisterna(tinaco, nombre, fuente['encender_bajo'], fuente['apagar_sobre'],
+                                     fuente['periodo'], pronostico, horizonte)
+    raise ValueError(f"Tipo de fuente desconocido: {fuente['tipo']}")
+
+
+def con_anticipacion(config, horizonte):
+    """Copia de `config` con las cisternas en llenado anticipado a `horizonte` segundos."""
+    return dict(config, fuentes=[
+        dict(fuente, horizonte=horizonte) if fuente['tipo'] == 'cisterna' else fuente
+        for fuente in config['fuentes']
+    ])
+
+
+def actores_tinaco(tinaco, rng=random, config=None, despacho=False):
+    """
+    Actores de un tinaco como pares (nombre, paso), según `config`
+    (mismo formato que ACTORES_BASE).
+    Cada paso ejecuta un ciclo y devuelve los segundos hasta el siguiente.
+    Con `despacho` los consumos solo encolan sus usos y un actor "Despacho"
+    los atiende por prioridad cada PERIODO_DESPACHO segundos.
+    """
+    config = ACTORES_BASE if config is None else config
+    bomba = config['bomba']
+
+    actores = [(fuente['nombre'], _paso_fuente(tinaco, fuente, rng)) for fuente in config['fuentes']]
+    actores.append(("Bomba", lambda: paso_bomba(tinaco, bomba['nivel_minimo'], bomba['periodo'])))
+    paso = paso_solicitud if despacho else paso_consumo
+    for consumo in config['consumos']:
+        actores.append((consumo['nombre'],
+                        lambda nombre=consumo['nombre'], periodo=consumo['periodo']:
+                            paso(tinaco, nombre, periodo)))
+    if despacho:
+        actores.append(("Despacho", lambda: paso_despacho(tinaco)))
+    return actores
@@ -0,0 +1,309 @@
+"""
+Barrido de parámetros en paralelo, sin GUI ni esperas.
+
+Cada combinación de la rejilla es un escenario: un tinaco (el por defecto o
+el primero de una topología) con esos parámetros, simulado con el motor de
+eventos (las mismas reglas que los procesos) o con caudales continuos. Los
+escenarios se reparten por lotes en un ProcessPoolExecutor y las métricas
+de cada uno se escriben en cuanto llega su lote, en Parquet (si está
+pyarrow) o CSV.
+
+    python barrido.py -p flujo_cisterna=10:60:10 -p encender_bajo=20,30,40 \\
+        -p nivel_minimo_bomba=15,25 --duracion 86400 --salida barrido.parquet
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from modelo_continuo import ModeloContinuo
+from registro_eventos import (LLENADO, LLENADO_RECHAZADO, CONSUMO, CONSUMO_RECHAZADO,
+                              BOMBA_ACTIVADA, BOMBA_DESACTIVADA)
+from simulacion import MotorSimulacion
+from topologia import cargar_topologia, crear_tinaco, normalizar_tinaco
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+def _fuentes(config, tipo):
+    return [fuente for fuente in config['fuentes'] if fuente['tipo'] == tipo]
+
+
+def _asignar(destinos, campo, valor):
+    for destino in destinos:
+        destino[campo] = valor
+
+
+# Parámetros que se pueden barrer: nombre -> función que lo aplica a una
+# configuración normalizada (ver topologia.py)
+PARAMETROS = {
+    'flujo_cisterna': lambda c, v: _asignar(_fuentes(c, 'cisterna'), 'flujo', v),
+    'encender_bajo': lambda c, v: _asignar(_fuentes(c, 'cisterna'), 'encender_bajo', v),
+    'apagar_sobre': lambda c, v: _asignar(_fuentes(c, 'cisterna'), 'apagar_sobre', v),
+    'flujo_pluvial': lambda c, v: _asignar(_fuentes(c, 'pluvial'), 'flujo', v),
+    'probabilidad_lluvia': lambda c, v: _asignar(_fuentes(c, 'pluvial'), 'probabilidad', v),
+    'nivel_minimo_bomba': lambda c, v: c['bomba'].__setitem__('nivel_minimo', v),
+    'activacion_minima_bomba': lambda c, v: c['bomba'].__setitem__('activacion_minima', v),
+    'capacidad_max': lambda c, v: c.__setitem__('capacidad_max', v),
+    'capacidad_min': lambda c, v: c.__setitem__('capacidad_min', v),
+    'nivel_inicial': lambda c, v: c.__setitem__('nivel_inicial', v),
+    'semilla': lambda c, v: None,  # se usa al simular
+}
+
+# Columnas de métricas de cada escenario
+METRICAS = ('nivel_final', 'fraccion_bajo_minimo', 'ciclo_trabajo_bomba', 'arranques_bomba',
+            'litros_rechazados', 'demanda_no_atendida', 'eventos', 'segundos')
+
+MODELOS = ("eventos", "continuo")
+
+
+class MedidorEscenario:
+    """
+    Sustituto de RegistroEventos (mismos métodos anotar y mensaje) que en
+    vez de imprimir acumula las métricas del escenario con el reloj virtual.
+    """
+
+    def __init__(self, capacidad_min, nivel_inicial, inicio=0.0):
+        self.capacidad_min = capacidad_min
+        self.nivel = nivel_inicial
+        self.bomba = False
+        self._instante = inicio
+        self.tiempo_bajo_minimo = 0.0
+        self.tiempo_bomba = 0.0
+        self.arranques_bomba = 0
+        self.litros_rechazados = 0.0
+        self.demanda_no_atendida = 0.0
+
+    def _avanzar(self, tiempo):
+        # El nivel y la bomba solo cambian con los eventos: entre dos
+        # eventos el estado es constante
+        transcurrido = tiempo - self._instante
+        if self.nivel < self.capacidad_min:
+            self.tiempo_bajo_minimo += transcurrido
+        if self.bomba:
+            self.tiempo_bomba += transcurrido
+        self._instante = tiempo
+
+    def anotar(self, tiempo, actor, codigo, delta, nivel, capacidad):
+        self._avanzar(tiempo)
+        if codigo == LLENADO or codigo == CONSUMO:
+            self.nivel = nivel
+        elif codigo == LLENADO_RECHAZADO:
+            self.litros_rechazados += delta
+        elif codigo == CONSUMO_RECHAZADO:
+            self.demanda_no_atendida += delta
+        elif codigo == BOMBA_ACTIVADA:
+            self.bomba = True
+            self.arranques_bomba += 1
+        elif codigo == BOMBA_DESACTIVADA:
+            self.bomba = False
+
+    def mensaje(self, tiempo, texto):
+        pass
+
+    def resumen(self, fin):
+        """Métricas hasta el instante `fin` (mismas claves que ModeloContinuo.resumen)."""
+        self._avanzar(fin)
+        duracion = max(fin, 1e-12)
+        return {
+            'nivel_final': self.nivel,
+            'fraccion_bajo_minimo': self.tiempo_bajo_minimo / duracion,
+            'ciclo_trabajo_bomba': self.tiempo_bomba / duracion,
+            'arranques_bomba': self.arranques_bomba,
+            'litros_rechazados': self.litros_rechazados,
+            'demanda_no_atendida': self.demanda_no_atendida,
+        }
+
+
+def configurar(base, parametros):
+    """Copia de la configuración `base` con `parametros` aplicados."""
+    config = normalizar_tinaco(base or {})
+    for nombre, valor in parametros.items():
+        if nombre not in PARAMETROS:
+            raise ValueError(f"Parámetro desconocido: {nombre!r} (válidos: {', '.join(PARAMETROS)})")
+        PARAMETROS[nombre](config, valor)
+    return config
+
+
+def simular_escenario(parametros, base=None, duracion=86400, modelo="eventos", semilla=0):
+    """Simula un escenario y devuelve sus métricas (METRICAS)."""
+    config = configurar(base, parametros)
+    semilla = parametros.get('semilla', semilla)
+    inicio = time.perf_counter()
+    if modelo == "continuo":
+        simulado = ModeloContinuo(config, semilla=semilla)
+        simulado.ejecutar(duracion)
+        resumen = simulado.resumen()
+        eventos = simulado.eventos
+    else:
+        tinaco = crear_tinaco(config, verbosidad="silencio")
+        medidor = MedidorEscenario(tinaco.capacidad_min, tinaco.nivel_agua)
+        tinaco.registro = medidor
+        motor = MotorSimulacion(semilla=semilla)
+        motor.agregar_tinaco(tinaco, config)
+        motor.ejecutar(duracion)
+        resumen = medidor.resumen(motor.reloj)
+        eventos = motor.eventos
+    resumen['eventos'] = eventos
+    resumen['segundos'] = time.perf_counter() - inicio
+    return resumen
+
+
+def _ejecutar_lote(lote, base, duracion, modelo, semilla):
+    """Tarea de un proceso del pool: simula un lote de (índice, parámetros)."""
+    return [dict(parametros, escenario=indice,
+                 **simular_escenario(parametros, base, duracion, modelo, semilla))
+            for indice, parametros in lote]
+
+
+def rejilla(valores):
+    """Producto cartesiano de {parámetro: [valores]} como diccionarios."""
+    nombres = list(valores)
+    for combinacion in itertools.product(*(valores[nombre] for nombre in nombres)):
+        yield dict(zip(nombres, combinacion))
+
+
+class _SalidaCSV:
+    def __init__(self, ruta, columnas):
+        self._archivo = open(ruta, 'w', newline='', encoding='utf-8')
+        self._escritor = csv.DictWriter(self._archivo, fieldnames=columnas)
+        self._escritor.writeheader()
+
+    def escribir(self, filas):
+        self._escritor.writerows(filas)
+        self._archivo.flush()
+
+    def cerrar(self):
+        self._archivo.close()
+
+
+class _SalidaParquet:
+    def __init__(self, ruta, columnas):
+        self._columnas = columnas
+        self._escritor = None
+        self._ruta = ruta
+
+    def escribir(self, filas):
+        # Un grupo de filas por lote; el esquema sale del primero
+        tabla = pyarrow.Table.from_pydict({c: [fila[c] for fila in filas] for c in self._columnas})
+        if self._escritor is None:
+            self._escritor = pyarrow.parquet.ParquetWriter(self._ruta, tabla.schema)
+        self._escritor.write_table(tabla.cast(self._escritor.schema))
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+
+
+def abrir_salida(ruta, columnas):
+    """Escritor por lotes según la extensión: .parquet (requiere pyarrow) o CSV."""
+    if ruta.endswith(".parquet"):
+        if pyarrow is None:
+            raise RuntimeError("Para escribir Parquet hace falta pyarrow (o use una salida .csv)")
+        return _SalidaParquet(ruta, columnas)
+    return _SalidaCSV(ruta, columnas)
+
+
+def barrer(valores, salida, base=None, duracion=86400, modelo="eventos", semilla=0,
+           trabajadores=None, tamano_lote=None):
+    """
+    Simula todas las combinaciones de `valores` ({parámetro: [valores]})
+    repartidas en `trabajadores` procesos y escribe una fila por escenario
+    en `salida` a medida que terminan (el orden de las filas no es el de la
+    rejilla; la columna 'escenario' da el índice).
+    Devuelve escenarios, segundos y escenarios_por_s.
+    """
+    if modelo not in MODELOS:
+        raise ValueError(f"Modelo desconocido: {modelo!r}")
+    desconocidos = set(valores) - set(PARAMETROS)
+    if desconocidos:
+        raise ValueError(f"Parámetros desconocidos: {sorted(desconocidos)}")
+    trabajadores = trabajadores or os.cpu_count() or 1
+    total = 1
+    for lista in valores.values():
+        total *= len(lista)
+    if tamano_lote is None:
+        # Lotes suficientes para repartir bien la carga sin pagar IPC por escenario
+        tamano_lote = max(1, min(64, total // (trabajadores * 8)))
+
+    escenarios = enumerate(rejilla(valores))
+    lotes = iter(lambda: list(itertools.islice(escenarios, tamano_lote)), [])
+    escritor = abrir_salida(salida, ['escenario', *valores, *METRICAS])
+    hechos = 0
+    inicio = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(trabajadores) as pool:
+            # Pocos lotes en vuelo a la vez: la rejilla nunca se materializa completa
+            pendientes = {pool.submit(_ejecutar_lote, lote, base, duracion, modelo, semilla)
+                          for lote in itertools.islice(lotes, trabajadores * 2)}
+            while pendientes:
+                terminados, pendientes = wait(pendientes, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    filas = futuro.result()
+                    escritor.escribir(filas)
+                    hechos += len(filas)
+                for lote in itertools.islice(lotes, len(terminados)):
+                    pendientes.add(pool.submit(_ejecutar_lote, lote, base, duracion, modelo, semilla))
+    finally:
+        escritor.cerrar()
+    segundos = time.perf_counter() - inicio
+    return {
+        'escenarios': hechos,
+        'segundos': segundos,
+        'escenarios_por_s': hechos / segundos if segundos > 0 else 0.0,
+    }
+
+
+def _valores(texto):
+    """'10,20,30' o 'inicio:fin:paso' (fin incluido) -> lista de números."""
+    if ":" in texto:
+        inicio, fin, paso = (float(parte) for parte in texto.split(":"))
+        n = int(round((fin - inicio) / paso)) + 1
+        valores = [inicio + i * paso for i in range(n)]
+    else:
+        valores = [float(parte) for parte in texto.split(",")]
+    return [int(v) if v.is_integer() else v for v in valores]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Barrido de parámetros del tinaco en paralelo")
+    parser.add_argument("-p", "--parametro", action="append", default=[], metavar="NOMBRE=VALORES",
+                        help="valores de un parámetro: lista '10,20,30' o rango 'inicio:fin:paso' "
+                             f"(parámetros: {', '.join(PARAMETROS)})")
+    parser.add_argument("--duracion", type=float, default=86400, help="segundos simulados por escenario")
+    parser.add_argument("--modelo", choices=MODELOS, default="eventos",
+                        help="motor de eventos (reglas por ciclo) o caudales continuos")
+    parser.add_argument("--semilla", type=int, default=0,
+                        help="semilla de la lluvia en todos los escenarios (salvo si se barre 'semilla')")
+    parser.add_argument("--topologia", default=None,
+                        help="tomar como base el primer tinaco de este archivo")
+    parser.add_argument("--trabajadores", type=int, default=None, help="procesos (por defecto uno por núcleo)")
+    parser.add_argument("--lote", type=int, default=None, help="escenarios por tarea")
+    parser.add_argument("--salida", default="barrido.parquet" if pyarrow else "barrido.csv",
+                        help="archivo .parquet (requiere pyarrow) o .csv")
+    args = parser.parse_args()
+
+    valores = {}
+    for parametro in args.parametro:
+        nombre, _, texto = parametro.partition("=")
+        if nombre not in PARAMETROS or not texto:
+            parser.error(f"Parámetro inválido: {parametro!r}")
+        valores[nombre] = _valores(texto)
+    if not valores:
+        parser.error("Indique al menos un parámetro con -p")
+    base = cargar_topologia(args.topologia)[0] if args.topologia else None
+
+    resumen = barrer(valores, args.salida, base, args.duracion, args.modelo, args.semilla,
+                     args.trabajadores, args.lote)
+    print(f"{resumen['escenarios']} escenarios en {resumen['segundos']:.2f}s "
+          f"({resumen['escenarios_por_s']:.1f}/s) -> {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,730 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from multiprocessing import Event, Process, Queue
+
+from actores import ACTORES_BASE, con_anticipacion, controlar_cisterna, paso_cisterna
+from planificador import Planificador
+from modelo_continuo import simular_continuo
+from pronostico import PronosticoDemanda
+from simulacion import MotorSimulacion, simular
+from traza import reproducir
+from tinaco_context import TinacoContext
+
+
+def _percentil(valores, p):
+    """Percentil p (0-100) de una lista ya ordenada."""
+    if not valores:
+        return 0.0
+    indice = min(len(valores) - 1, int(round(p / 100 * (len(valores) - 1))))
+    return valores[indice]
+
+
+def _resumen_latencias(latencias, segundos):
+    """ops/s, p50 y p99 (en microsegundos) de una lista de latencias."""
+    latencias.sort()
+    return {
+        'operaciones': len(latencias),
+        'ops_por_s': len(latencias) / segundos if segundos > 0 else 0.0,
+        'p50_us': _percentil(latencias, 50) * 1e6,
+        'p99_us': _percentil(latencias, 99) * 1e6,
+    }
+
+
+# Métodos públicos de TinacoContext que se miden uno por uno
+METODOS = (
+    'llenar_desde_pluvial', 'llenar_desde_cisterna',
+    'activar_bomba', 'desactivar_bomba',
+    'consumir_jardin', 'consumir_lavadero', 'consumir_banio',
+    'obtener_estado',
+)
+
+
+def _llamar(tinaco, metodo, iteraciones):
+    """Llama `iteraciones` veces al método y devuelve las latencias."""
+    funcion = getattr(tinaco, metodo)
+    latencias = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        latencias.append(time.perf_counter() - inicio)
+    return latencias
+
+
+def _trabajador_metodo(tinaco, metodo, iteraciones, arrancar, resultados):
+    arrancar.wait()
+    resultados.put(_llamar(tinaco, metodo, iteraciones))
+
+
+def medir_metodo(metodo, n_trabajadores=1, iteraciones=5000, sincronizacion="nativa", instrumentar=False):
+    """
+    ops/s y latencias p50/p99 de un método de TinacoContext, llamado desde
+    este proceso (n_trabajadores=1) o desde N procesos a la vez sobre el
+    mismo tinaco. Con instrumentar=True se mide además el costo de la
+    instrumentación y se agrega la espera media del lock que registró.
+    """
+    tinaco = TinacoContext(sincronizacion, verbosidad="silencio", instrumentar=instrumentar)
+    tinaco.nivel_agua = tinaco.capacidad_max * 0.6
+
+    if n_trabajadores == 1:
+        inicio = time.perf_counter()
+        latencias = _llamar(tinaco, metodo, iteraciones)
+        segundos = time.perf_counter() - inicio
+    else:
+        arrancar = Event()
+        resultados = Queue()
+        procesos = [
+            Process(target=_trabajador_metodo, args=(tinaco, metodo, iteraciones, arrancar, resultados))
+            for _ in range(n_trabajadores)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        inicio = time.perf_counter()
+        arrancar.set()
+        latencias = []
+        for _ in procesos:
+            latencias.extend(resultados.get())
+        segundos = time.perf_counter() - inicio
+        for proceso in procesos:
+            proceso.join()
+
+    resultado = {
+        'nombre': f"metodo/{metodo}/{sincronizacion}/{n_trabajadores}" + ("/instrumentado" if instrumentar else ""),
+        'metodo': metodo,
+        'sincronizacion': sincronizacion,
+        'trabajadores': n_trabajadores,
+    }
+    resultado.update(_resumen_latencias(latencias, segundos))
+    if instrumentar:
+        estadisticas = tinaco.estadisticas()
+        llamadas = sum(datos['llamadas'] for datos in estadisticas.values())
+        espera = sum(datos['espera_media_us'] * datos['llamadas'] for datos in estadisticas.values())
+        resultado['espera_lock_media_us'] = espera / llamadas if llamadas else 0.0
+    return resultado
+
+
+def _trabajador_mixto(tinaco, iteraciones, resultados):
+    """
+    Trabajador que alterna llenados y consumos sobre el tinaco compartido.
+    Devuelve cuántas operaciones tuvieron éxito y sus latencias.
+    """
+    llenados = 0
+    consumos = 0
+    latencias = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        if tinaco.llenar_desde_pluvial():
+            llenados += 1
+        latencias.append(time.perf_counter() - inicio)
+
+        for _ in range(3):
+            inicio = time.perf_counter()
+            if tinaco.consumir_banio():
+                consumos += 1
+            latencias.append(time.perf_counter() - inicio)
+
+    resultados.put((llenados, consumos, latencias))
+
+
+def medir_consistencia(n_trabajadores=8, iteraciones=200, sincronizacion="nativa"):
+    """
+    Lanza varios procesos que modifican el mismo tinaco a la vez y comprueba
+    que el nivel final coincide con la suma de las operaciones exitosas.
+    """
+    tinaco = TinacoContext(sincronizacion, verbosidad="silencio")
+    nivel_inicial = tinaco.nivel_agua
+    resultados = Queue()
+
+    procesos = [
+        Process(target=_trabajador_mixto, args=(tinaco, iteraciones, resultados))
+        for _ in range(n_trabajadores)
+    ]
+    for proceso in procesos:
+        proceso.start()
+
+    llenados = 0
+    consumos = 0
+    latencias = []
+    for _ in procesos:
+        l, c, lat = resultados.get()
+        llenados += l
+        consumos += c
+        latencias.extend(lat)
+    for proceso in procesos:
+        proceso.join()
+
+    esperado = nivel_inicial + llenados * tinaco.flujo_pluvial - consumos * tinaco.consumo_banio
+    latencias.sort()
+    return {
+        'nombre': f"consistencia/{sincronizacion}/{n_trabajadores}",
+        'sincronizacion': sincronizacion,
+        'trabajadores': n_trabajadores,
+        'operaciones': len(latencias),
+        'nivel_final': tinaco.nivel_agua,
+        'nivel_esperado': esperado,
+        'consistente': tinaco.nivel_agua == esperado,
+        'latencia_p50_us': _percentil(latencias, 50) * 1e6,
+        'latencia_p99_us': _percentil(latencias, 99) * 1e6,
+    }
+
+
+def medir_cerrojo(sincronizacion, iteraciones=20000):
+    """Latencia de adquirir y liberar el lock del tinaco sin contención."""
+    inicio = time.perf_counter()
+    tinaco = TinacoContext(sincronizacion, verbosidad="silencio")
+    arranque = time.perf_counter() - inicio
+
+    latencias = []
+    for _ in range(iteraciones):
+        t0 = time.perf_counter()
+        with tinaco.lock:
+            pass
+        latencias.append(time.perf_counter() - t0)
+    latencias.sort()
+    return {
+        'nombre': f"cerrojo/{sincronizacion}",
+        'sincronizacion': sincronizacion,
+        'arranque_ms': arranque * 1e3,
+        'lock_p50_us': _percentil(latencias, 50) * 1e6,
+        'lock_p99_us': _percentil(latencias, 99) * 1e6,
+    }
+
+
+def _ciclo_cisterna_separado(tinaco):
+    """Ciclo de la cisterna con una llamada (y un lock) por operación."""
+    estado = tinaco.obtener_estado()
+    if estado['porcentaje'] < 30:
+        tinaco.activar_bomba()
+        if not tinaco.llenar('Cisterna'):
+            tinaco.desactivar_bomba()
+    elif estado['porcentaje'] >= 90:
+        tinaco.desactivar_bomba()
+
+
+def medir_transaccion(sincronizacion, iteraciones=2000):
+    """
+    Ciclo de la cisterna (lectura, activar bomba, llenar) con llamadas
+    separadas frente a una sola transacción (paso_cisterna).
+    """
+    resultado = {'nombre': f"transaccion/{sincronizacion}", 'sincronizacion': sincronizacion}
+    for variante, ciclo in (('separado', _ciclo_cisterna_separado), ('transaccion', paso_cisterna)):
+        tinaco = TinacoContext(sincronizacion, verbosidad="silencio")
+        latencias = []
+        for _ in range(iteraciones):
+            # Nivel bajo para que el ciclo haga todas sus operaciones
+            tinaco.nivel_agua = tinaco.capacidad_max * 0.28
+            tinaco.bomba_activa = False
+            inicio = time.perf_counter()
+            ciclo(tinaco)
+            latencias.append(time.perf_counter() - inicio)
+        latencias.sort()
+        resultado[f'{variante}_p50_us'] = _percentil(latencias, 50) * 1e6
+        resultado[f'{variante}_p99_us'] = _percentil(latencias, 99) * 1e6
+    return resultado
+
+
+def medir_reaccion(iteraciones=50):
+    """
+    Tiempo desde que el nivel cruza el 30% hacia abajo hasta que el
+    controlador de la cisterna (otro proceso, por eventos) activa la bomba.
+    Con el sondeo anterior el promedio era la mitad del periodo (1.5 s).
+    """
+    tinaco = TinacoContext(verbosidad="silencio", nivel_inicial=350,
+                           consumos={'Prueba': {'consumo': 60, 'umbral': 0, 'piso': 0}})
+    terminar_evento = Event()
+    # Sin periodo de llenado, para no esperar entre una medición y la siguiente
+    controlador = Process(target=controlar_cisterna, args=(tinaco, terminar_evento, 'Cisterna', 30, 90, 0))
+    controlador.start()
+
+    def preparar(transaccion):
+        transaccion.desactivar_bomba()
+        transaccion.tinaco.nivel_agua = 350
+
+    latencias = []
+    for _ in range(iteraciones):
+        tinaco.ejecutar(preparar)
+        inicio = time.perf_counter()
+        tinaco.consumir('Prueba')  # 350 L -> 290 L (29%)
+        if tinaco.esperar(lambda transaccion: transaccion.bomba_activa, timeout=5):
+            latencias.append(time.perf_counter() - inicio)
+
+    terminar_evento.set()
+    tinaco.despertar()
+    controlador.join()
+    latencias.sort()
+    return {
+        'nombre': "reaccion/cisterna",
+        'reacciones': len(latencias),
+        'latencia_p50_us': _percentil(latencias, 50) * 1e6,
+        'latencia_p99_us': _percentil(latencias, 99) * 1e6,
+    }
+
+
+def medir_reproduccion(duracion=86400, semilla=1):
+    """
+    Graba la traza de un día simulado y la reproduce: throughput de las
+    operaciones del tinaco sin procesos ni esperas, con la misma carga
+    en cada ejecución.
+    """
+    with tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, "traza.bin")
+        simular(duracion, semilla=semilla, grabar=ruta)
+        resumen = reproducir(ruta)
+    return {
+        'nombre': "reproduccion/dia",
+        'operaciones': resumen['operaciones'],
+        'ops_por_s': resumen['ops_por_s'],
+        'consistente': resumen['coincide'] and resumen['divergencia'] is None,
+    }
+
+
+def _bytes_por_llamada(funcion, muestras=200):
+    """Memoria que asigna una llamada (pico de tracemalloc, mediana)."""
+    picos = []
+    tracemalloc.start()
+    try:
+        for _ in range(muestras):
+            base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            funcion()
+            picos.append(tracemalloc.get_traced_memory()[1] - base)
+    finally:
+        tracemalloc.stop()
+    picos.sort()
+    return _percentil(picos, 50)
+
+
+def medir_instantanea(iteraciones=100000):
+    """
+    Lectura del estado: obtener_estado() (diccionario nuevo por llamada)
+    frente a leer_estado() sobre una Instantanea reutilizada.
+    """
+    tinaco = TinacoContext(verbosidad="silencio")
+    instantanea = tinaco.instantanea()
+    resultados = {}
+    for nombre, funcion in (('dict', tinaco.obtener_estado),
+                            ('instantanea', lambda: tinaco.leer_estado(instantanea))):
+        for _ in range(1000):
+            funcion()
+        inicio = time.perf_counter()
+        for _ in range(iteraciones):
+            funcion()
+        resultados[nombre] = ((time.perf_counter() - inicio) / iteraciones * 1e9,
+                              _bytes_por_llamada(funcion))
+    return {
+        'nombre': "lectura_estado",
+        'dict_ns': resultados['dict'][0],
+        'dict_bytes': resultados['dict'][1],
+        'instantanea_ns': resultados['instantanea'][0],
+        'instantanea_bytes': resultados['instantanea'][1],
+    }
+
+
+def medir_despacho(salidas=320, tipos=32, ciclos=200):
+    """
+    Un ciclo de demanda de `salidas` tomas repartidas en `tipos` consumos:
+    un consumir() por uso (una toma del lock cada uno) frente a encolar con
+    un solicitar() por tipo y atender todo con un despachar() (una toma del
+    lock cada uno).
+    """
+    consumos = {f"Toma {i}": {'consumo': 1, 'umbral': 0, 'piso': 0} for i in range(tipos)}
+    demanda = {nombre: {'prioridad': i % 3, 'cuota': None} for i, nombre in enumerate(consumos)}
+    por_tipo = salidas // tipos
+    usos = por_tipo * tipos * ciclos
+    
+    def tinaco():
+        return TinacoContext(verbosidad="silencio", capacidad_max=1e12, nivel_inicial=1e12,
+                             consumos=consumos, demanda=demanda)
+    
+    directo = tinaco()
+    inicio = time.perf_counter()
+    for _ in range(ciclos):
+        for nombre in consumos:
+            for _ in range(por_tipo):
+                directo.consumir(nombre)
+    segundos_directo = time.perf_counter() - inicio
+    
+    despacho = tinaco()
+    inicio = time.perf_counter()
+    for _ in range(ciclos):
+        for nombre in consumos:
+            despacho.solicitar(nombre, por_tipo)
+        despacho.despachar()
+    segundos_despacho = time.perf_counter() - inicio
+    return {
+        'nombre': f"despacho/{salidas}_tomas",
+        'directo_us_por_uso': segundos_directo / usos * 1e6,
+        'despacho_us_por_uso': segundos_despacho / usos * 1e6,
+        'despacho_us_por_ciclo': segundos_despacho / ciclos * 1e6,
+        'locks_por_ciclo_directo': por_tipo * tipos,
+        'locks_por_ciclo_despacho': tipos + 1,
+    }
+
+
+def medir_anticipacion(horizonte=300, duracion=86400, semilla=1, probabilidad_lluvia=0):
+    """
+    Uso de la bomba en un día con la cisterna reactiva (llena al bajar del
+    30%) y con llenado anticipado a `horizonte` segundos, más el costo de
+    una muestra del pronóstico. Sin lluvia la cisterna es la única fuente.
+    arranques_extra cuenta los arranques anticipados por encima de los
+    reactivos: anticipar no debe hacer que la bomba arranque más.
+    """
+    config = dict(ACTORES_BASE, fuentes=[
+        dict(fuente, probabilidad=probabilidad_lluvia) if fuente['tipo'] == 'pluvial' else fuente
+        for fuente in ACTORES_BASE['fuentes']
+    ])
+    resultado = {'nombre': f"anticipacion/{horizonte:.0f}s/lluvia_{probabilidad_lluvia:g}"}
+    for modo, actores in (('reactiva', config), ('anticipada', con_anticipacion(config, horizonte))):
+        tinaco = TinacoContext(verbosidad="silencio")
+        motor = MotorSimulacion(semilla=semilla)
+        motor.agregar_tinaco(tinaco, actores)
+        motor.ejecutar(duracion)
+        uso = tinaco.uso_bomba()
+        resultado[f'{modo}_ciclo_trabajo'] = uso['segundos_activa'] / duracion
+        resultado[f'{modo}_arranques'] = uso['arranques']
+        resultado[f'{modo}_nivel'] = tinaco.nivel_agua
+    resultado['arranques_extra'] = max(0, resultado['anticipada_arranques'] - resultado['reactiva_arranques'])
+    
+    pronostico = PronosticoDemanda()
+    iteraciones = 100000
+    inicio = time.perf_counter()
+    for i in range(iteraciones):
+        pronostico.observar(i * 3.0, i * 11.0)
+    resultado['observar_ns'] = (time.perf_counter() - inicio) / iteraciones * 1e9
+    return resultado
+
+
+def medir_panel(n_tinacos=500, cuadros=100):
+    """
+    Panel de `n_tinacos` tinacos: tiempo hasta el primer cuadro y tiempo
+    por cuadro desplazando una fila a la vez. Sin pantalla se omite.
+    """
+    import tkinter
+    tinacos = [TinacoContext(verbosidad="silencio", nombre=f"Tinaco {i + 1}") for i in range(n_tinacos)]
+    inicio = time.perf_counter()
+    try:
+        from panel_tinacos import PanelTinacos
+        app = PanelTinacos(tinacos)
+    except tkinter.TclError:
+        return {'nombre': f"panel/{n_tinacos}", 'omitido': "sin pantalla"}
+    app.update()
+    grilla = app.grilla
+    grilla._redibujar()
+    app.update_idletasks()
+    apertura = time.perf_counter() - inicio
+    
+    inicio = time.perf_counter()
+    for _ in range(cuadros):
+        grilla.yview("scroll", 1, "units")
+        grilla._redibujar()
+        app.update_idletasks()
+    cuadro = (time.perf_counter() - inicio) / cuadros
+    resultado = {
+        'nombre': f"panel/{n_tinacos}",
+        'apertura_ms': apertura * 1e3,
+        'cuadro_ms': cuadro * 1e3,
+        'tarjetas': len(grilla._tarjetas),
+        'elementos_canvas': len(grilla.find_all()),
+    }
+    app.destroy()
+    return resultado
+
+
+def medir_continuo(duracion=86400, semilla=1):
+    """
+    Un día simulado del tinaco por defecto con el motor de eventos (un
+    evento por ciclo de cada actor) y con caudales continuos (un tramo por
+    cruce de umbral).
+    """
+    motor, segundos_eventos = simular(duracion, semilla=semilla)
+    modelo, segundos_continuo = simular_continuo(duracion, semilla=semilla)
+    return {
+        'nombre': "continuo/dia",
+        'eventos': motor.eventos,
+        'tramos': modelo.eventos,
+        'segundos_eventos': segundos_eventos,
+        'segundos_continuo': segundos_continuo,
+        'nivel_eventos': motor.tinaco.nivel_agua,
+        'nivel_continuo': modelo.nivel_agua,
+    }
+
+
+def medir_barrido(trabajadores, escenarios_por_trabajador=16, duracion=3600):
+    """
+    Escenarios por segundo de barrido.barrer con el motor de eventos y
+    `trabajadores` procesos; eficiencia = aceleración / trabajadores frente
+    a un solo proceso (la línea base se mide en la misma llamada).
+    """
+    from barrido import barrer
+
+    def throughput(n):
+        valores = {'semilla': list(range(escenarios_por_trabajador * n))}
+        with tempfile.TemporaryDirectory() as directorio:
+            return barrer(valores, os.path.join(directorio, "barrido.csv"), duracion=duracion,
+                          trabajadores=n)['escenarios_por_s']
+
+    base = throughput(1)
+    actual = base if trabajadores == 1 else throughput(trabajadores)
+    return {
+        'nombre': f"barrido/{trabajadores}",
+        'trabajadores': trabajadores,
+        'escenarios_por_s': actual,
+        'eficiencia': actual / (base * trabajadores) if base > 0 else 0.0,
+    }
+
+
+def _rss_kb(pid):
+    """RSS de un proceso en KB (Linux, /proc)."""
+    try:
+        with open(f"/proc/{pid}/status") as archivo:
+            for linea in archivo:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1])
+    except FileNotFoundError:
+        pass
+    return 0
+
+
+def medir_planificador(estrategia, n_tinacos=1, trabajadores=2, espera=1.0):
+    """
+    Tiempo de arranque y RSS total con una estrategia de Planificador.
+    El arranque se mide hasta que todos los tinacos registran su primer
+    cambio de estado; "procesos" equivale a un proceso por actor.
+    """
+    tinacos = [TinacoContext(nombre=f"T{i}", verbosidad="silencio") for i in range(n_tinacos)]
+    planificador = Planificador(estrategia, trabajadores)
+    for tinaco in tinacos:
+        planificador.agregar_tinaco(tinaco)
+    terminar_evento = Event()
+
+    inicio = time.perf_counter()
+    planificador.iniciar(terminar_evento)
+    while any(tinaco.version == 0 for tinaco in tinacos):
+        time.sleep(0.001)
+    arranque = time.perf_counter() - inicio
+
+    time.sleep(espera)
+    rss = _rss_kb(os.getpid()) + sum(_rss_kb(pid) for pid in planificador.pids)
+
+    terminar_evento.set()
+    planificador.detener()
+    return {
+        'nombre': f"planificador/{estrategia}/{n_tinacos}",
+        'estrategia': estrategia,
+        'tinacos': n_tinacos,
+        'actores': 6 * n_tinacos,
+        'procesos': 1 + len(planificador.pids),
+        'arranque_ms': arranque * 1e3,
+        'rss_total_mb': rss / 1024,
+    }
+
+
+def medir_arranque_main(espera=0.5):
+    """
+    Arranque del sistema de main.main() sin la GUI: desde crear el tinaco
+    hasta que los seis procesos registran su primer cambio de estado.
+    """
+    from main import iniciar_procesos, detener_procesos
+
+    inicio = time.perf_counter()
+    tinaco = TinacoContext(verbosidad="silencio")
+    terminar_evento = Event()
+    procesos = iniciar_procesos(tinaco, terminar_evento)
+    while tinaco.version == 0:
+        time.sleep(0.001)
+    arranque = time.perf_counter() - inicio
+
+    time.sleep(espera)
+    rss = _rss_kb(os.getpid()) + sum(_rss_kb(proceso.pid) for proceso in procesos)
+    terminar_evento.set()
+    detener_procesos(procesos, tinaco)
+    return {
+        'nombre': "arranque_main",
+        'procesos': 1 + len(procesos),
+        'arranque_ms': arranque * 1e3,
+        'rss_total_mb': rss / 1024,
+    }
+
+
+# Lo que hace un proceso trabajador con el método 'spawn' (o forkserver):
+# un intérprete nuevo que importa main antes de correr su función
+_SCRIPT_TRABAJADOR = (
+    "import resource, sys\n"
+    "import main\n"
+    "print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, 'customtkinter' in sys.modules)\n"
+)
+
+
+def medir_arranque_spawn(iteraciones=5):
+    """
+    Arranque de un proceso trabajador con 'spawn': tiempo hasta que el
+    intérprete nuevo termina de importar main, su RSS máximo y si cargó la GUI.
+    """
+    directorio = os.path.dirname(os.path.abspath(__file__))
+    tiempos = []
+    rss = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        salida = subprocess.run([sys.executable, "-c", _SCRIPT_TRABAJADOR], capture_output=True,
+                                text=True, cwd=directorio, check=True).stdout.split()
+        tiempos.append(time.perf_counter() - inicio)
+        rss.append(int(salida[0]))
+    tiempos.sort()
+    rss.sort()
+    return {
+        'nombre': "arranque_spawn",
+        'spawn_ms': _percentil(tiempos, 50) * 1e3,
+        'rss_hijo_mb': _percentil(rss, 50) / 1024,
+        'gui_importada': salida[1] == "True",
+    }
+
+
+def _metadatos():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'commit': commit,
+        'python': platform.python_version(),
+        'plataforma': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def ejecutar_suite(iteraciones=5000, trabajadores=(1, 4), sincronizaciones=("nativa", "manager")):
+    """Ejecuta todas las mediciones y devuelve los resultados como diccionario."""
+    resultados = []
+    for sincronizacion in sincronizaciones:
+        resultados.append(medir_cerrojo(sincronizacion))
+        # Con Manager cada llamada es IPC; se reduce el número de iteraciones
+        n = iteraciones if sincronizacion == "nativa" else max(100, iteraciones // 10)
+        for metodo in METODOS:
+            for n_trabajadores in trabajadores:
+                resultados.append(medir_metodo(metodo, n_trabajadores, n, sincronizacion))
+        resultados.append(medir_consistencia(sincronizacion=sincronizacion))
+        resultados.append(medir_transaccion(sincronizacion, n // 2))
+    # Costo de la instrumentación frente a las mediciones sin ella
+    for n_trabajadores in trabajadores:
+        resultados.append(medir_metodo('consumir_banio', n_trabajadores, iteraciones, instrumentar=True))
+    resultados.append(medir_reaccion())
+    resultados.append(medir_reproduccion())
+    resultados.append(medir_continuo())
+    resultados.append(medir_anticipacion())
+    resultados.append(medir_anticipacion(probabilidad_lluvia=0.2))
+    resultados.append(medir_instantanea())
+    resultados.append(medir_despacho())
+    for n_trabajadores in sorted({1, os.cpu_count() or 1}):
+        resultados.append(medir_barrido(n_trabajadores))
+    for n_tinacos in (1, 20):
+        for estrategia in ("procesos", "pool", "asyncio"):
+            resultados.append(medir_planificador(estrategia, n_tinacos))
+    resultados.append(medir_panel())
+    resultados.append(medir_arranque_main())
+    resultados.append(medir_arranque_spawn())
+    return {'metadatos': _metadatos(), 'resultados': resultados}
+
+
+# Métricas comparables y si un valor mayor es mejor
+_METRICAS = {
+    'ops_por_s': True,
+    'p50_us': False,
+    'p99_us': False,
+    'lock_p50_us': False,
+    'lock_p99_us': False,
+    'separado_p50_us': False,
+    'transaccion_p50_us': False,
+    'latencia_p50_us': False,
+    'latencia_p99_us': False,
+    'arranque_ms': False,
+    'rss_total_mb': False,
+    'spawn_ms': False,
+    'segundos_continuo': False,
+    'instantanea_ns': False,
+    'instantanea_bytes': False,
+    'despacho_us_por_uso': False,
+    'observar_ns': False,
+    'cuadro_ms': False,
+    'apertura_ms': False,
+    'escenarios_por_s': True,
+    'eficiencia': True,
+    'rss_hijo_mb': False,
+}
+
+
+def comparar(actual, anterior, umbral=0.10):
+    """
+    Compara dos ejecuciones de la suite y devuelve las líneas de las
+    métricas que empeoraron más que `umbral` (fracción).
+    """
+    previos = {r['nombre']: r for r in anterior['resultados']}
+    regresiones = []
+    for resultado in actual['resultados']:
+        previo = previos.get(resultado['nombre'])
+        if previo is None:
+            continue
+        for metrica, mayor_es_mejor in _METRICAS.items():
+            if metrica not in resultado or not previo.get(metrica):
+                continue
+            cambio = (resultado[metrica] - previo[metrica]) / previo[metrica]
+            empeora = -cambio if mayor_es_mejor else cambio
+            if empeora > umbral:
+                regresiones.append(f"{resultado['nombre']} {metrica}: {previo[metrica]:.2f} -> "
+                                   f"{resultado[metrica]:.2f} ({cambio * 100:+.1f}%)")
+        if previo.get('consistente', True) and not resultado.get('consistente', True):
+            regresiones.append(f"{resultado['nombre']}: dejó de ser consistente")
+    return regresiones
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks de TinacoContext y del sistema multiproceso")
+    parser.add_argument("--salida", default="bench_output.json",
+                        help="archivo JSON donde guardar los resultados")
+    parser.add_argument("--comparar", default=None,
+                        help="resultados JSON de una versión anterior para detectar regresiones")
+    parser.add_argument("--iteraciones", type=int, default=5000,
+                        help="llamadas por trabajador en cada método")
+    parser.add_argument("--trabajadores", type=int, nargs="+", default=[1, 4],
+                        help="números de procesos concurrentes a medir")
+    args = parser.parse_args()
+
+    suite = ejecutar_suite(args.iteraciones, tuple(args.trabajadores))
+    for resultado in suite['resultados']:
+        valores = ", ".join(f"{clave}={valor:.2f}" if isinstance(valor, float) else f"{clave}={valor}"
+                            for clave, valor in resultado.items() if clave != 'nombre')
+        print(f"{resultado['nombre']}: {valores}")
+
+    with open(args.salida, "w", encoding="utf-8") as archivo:
+        json.dump(suite, archivo, indent=2, ensure_ascii=False)
+    print(f"Resultados guardados en {args.salida}")
+
+    codigo = 0
+    if not all(r.get('consistente', True) for r in suite['resultados']):
+        print("ERROR: el nivel final no coincide con las operaciones exitosas")
+        codigo = 1
+    if any(r.get('arranques_extra') for r in suite['resultados']):
+        print("ERROR: el llenado anticipado arranca la bomba más que el reactivo")
+        codigo = 1
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as archivo:
+            regresiones = comparar(suite, json.load(archivo))
+        if regresiones:
+            print(f"Regresiones respecto a {args.comparar}:")
+            for linea in regresiones:
+                print(f"  {linea}")
+            codigo = 1
+        else:
+            print(f"Sin regresiones respecto a {args.comparar}")
+    sys.exit(codigo)
+
+
+if __name__ == "__main__":
+    main()
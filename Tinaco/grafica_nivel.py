@@ -0,0 +1,188 @@
+import collections
+import tkinter as tk
+
+# Colores de la gráfica (mismos tonos que RotoplasGUI)
+COLOR_FONDO = "#1F2937"
+COLOR_GUIA = "#374151"
+COLOR_NIVEL = "#3B82F6"
+COLOR_BOMBA = "#22C55E"
+COLOR_CONSUMO = "#F59E0B"
+
+ALTO_FRANJA = 8  # alto en px de cada franja de actividad (bomba y consumos)
+
+
+def reducir_min_max(muestras, segundos_por_cubeta):
+    """
+    Agrupa muestras (tiempo, nivel, bomba, consumos) en cubetas de tiempo
+    y conserva por cubeta el mínimo, el máximo y el último nivel, y si la
+    bomba o cada consumo estuvo activo en algún momento. Así una ventana de
+    horas a 1 Hz se reduce a una columna por píxel sin perder los picos.
+    Genera tuplas (cubeta, minimo, maximo, ultimo, bomba, consumos).
+    """
+    actual = None
+    for tiempo, nivel, bomba, consumos in muestras:
+        cubeta = int(tiempo // segundos_por_cubeta)
+        if actual is not None and cubeta != actual[0]:
+            yield tuple(actual)
+            actual = None
+        if actual is None:
+            actual = [cubeta, nivel, nivel, nivel, bool(bomba), consumos]
+        else:
+            if nivel < actual[1]:
+                actual[1] = nivel
+            if nivel > actual[2]:
+                actual[2] = nivel
+            actual[3] = nivel
+            actual[4] = actual[4] or bool(bomba)
+            actual[5] |= consumos
+    if actual is not None:
+        yield tuple(actual)
+
+
+class GraficaNivel(tk.Canvas):
+    """
+    Gráfica desplazable del nivel (%), la bomba y la actividad de cada
+    consumo. Cada columna de píxeles es una cubeta min/max; al llegar una
+    muestra solo se redibuja la columna en curso y, cuando empieza una nueva,
+    lo ya dibujado se desplaza a la izquierda en vez de redibujarse.
+    """
+
+    def __init__(self, parent, consumos, capacidad, ventana=3600, ancho=640, alto=180, **kwargs):
+        """
+        consumos: nombres de los consumos, en el orden de sus bits
+        capacidad: capacidad del tinaco en litros (para convertir a %)
+        ventana: segundos visibles en la gráfica
+        """
+        super().__init__(parent, width=ancho, height=alto, bg=COLOR_FONDO,
+                         highlightthickness=0, **kwargs)
+        self.consumos = list(consumos)
+        self.capacidad = capacidad
+        self.ventana = ventana
+        self.ancho = ancho
+        self.segundos_por_columna = ventana / ancho
+
+        # Zona del nivel arriba, franjas de bomba y consumos abajo
+        franjas = (1 + len(self.consumos)) * ALTO_FRANJA
+        self._y_nivel_inferior = alto - franjas - 6
+        self._y_franjas = self._y_nivel_inferior + 6
+
+        self._columnas = collections.deque()  # (columna, ids) ya cerradas
+        self._columna_derecha = None          # columna en el borde derecho
+        self._cubeta = None                   # cubeta en curso (lista mutable)
+        self._ids_cubeta = ()
+        self._punto_anterior = None           # último (columna, y) cerrado
+
+        self._dibujar_fondo()
+
+    def _dibujar_fondo(self):
+        for porcentaje in (30, 50, 90):
+            y = self._y(porcentaje)
+            self.create_line(0, y, self.ancho, y, fill=COLOR_GUIA, dash=(2, 4), tags="fondo")
+            self.create_text(4, y - 6, text=f"{porcentaje}%", anchor="w",
+                             fill=COLOR_GUIA, font=("Roboto", 8), tags="fondo")
+        etiquetas = ["Bomba"] + self.consumos
+        for i, etiqueta in enumerate(etiquetas):
+            y = self._y_franjas + i * ALTO_FRANJA + ALTO_FRANJA / 2
+            self.create_text(self.ancho - 4, y, text=etiqueta, anchor="e",
+                             fill=COLOR_GUIA, font=("Roboto", 7), tags="fondo")
+
+    def _y(self, porcentaje):
+        return self._y_nivel_inferior - (porcentaje / 100) * (self._y_nivel_inferior - 4)
+
+    def _x(self, columna):
+        return self.ancho - 1 - (self._columna_derecha - columna)
+
+    def _dibujar_columna(self, cubeta):
+        """Dibuja una cubeta y devuelve los ids de los elementos creados."""
+        columna, minimo, maximo, ultimo, bomba, consumos = cubeta
+        x = self._x(columna)
+        a = lambda nivel: self._y((nivel / self.capacidad) * 100)
+        ids = []
+
+        if self._punto_anterior is not None:
+            columna_anterior, y_anterior = self._punto_anterior
+            ids.append(self.create_line(self._x(columna_anterior), y_anterior, x, a(ultimo),
+                                        fill=COLOR_NIVEL, tags="datos"))
+        if maximo != minimo:
+            ids.append(self.create_line(x, a(minimo), x, a(maximo) - 1, fill=COLOR_NIVEL, tags="datos"))
+
+        if bomba:
+            y = self._y_franjas
+            ids.append(self.create_line(x, y, x, y + ALTO_FRANJA - 2, fill=COLOR_BOMBA, tags="datos"))
+        for i in range(len(self.consumos)):
+            if consumos & (1 << i):
+                y = self._y_franjas + (i + 1) * ALTO_FRANJA
+                ids.append(self.create_line(x, y, x, y + ALTO_FRANJA - 2, fill=COLOR_CONSUMO, tags="datos"))
+        return ids
+
+    def _cerrar_cubeta(self):
+        """Deja fija la cubeta en curso; sus elementos ya están dibujados."""
+        if self._cubeta is None:
+            return
+        columna = self._cubeta[0]
+        self._columnas.append((columna, self._ids_cubeta))
+        self._punto_anterior = (columna, self._y((self._cubeta[3] / self.capacidad) * 100))
+        self._cubeta = None
+        self._ids_cubeta = ()
+
+    def _desplazar_hasta(self, columna):
+        """Mueve lo dibujado a la izquierda para que `columna` quede al borde derecho."""
+        if self._columna_derecha is None:
+            self._columna_derecha = columna
+            return
+        desplazamiento = columna - self._columna_derecha
+        if desplazamiento <= 0:
+            return
+        self._columna_derecha = columna
+        self.move("datos", -desplazamiento, 0)
+
+        # Borrar las columnas que salieron por la izquierda
+        primera_visible = columna - self.ancho
+        while self._columnas and self._columnas[0][0] < primera_visible:
+            _, ids = self._columnas.popleft()
+            for item in ids:
+                self.delete(item)
+
+    def agregar(self, tiempo, nivel, bomba, consumos):
+        """Agrega una muestra; solo se redibuja la columna en curso."""
+        columna = int(tiempo // self.segundos_por_columna)
+        if self._cubeta is not None and columna != self._cubeta[0]:
+            self._cerrar_cubeta()
+
+        if self._cubeta is None:
+            self._desplazar_hasta(columna)
+            self._cubeta = [columna, nivel, nivel, nivel, bool(bomba), consumos]
+        else:
+            cubeta = self._cubeta
+            cubeta[1] = min(cubeta[1], nivel)
+            cubeta[2] = max(cubeta[2], nivel)
+            cubeta[3] = nivel
+            cubeta[4] = cubeta[4] or bool(bomba)
+            cubeta[5] |= consumos
+
+        for item in self._ids_cubeta:
+            self.delete(item)
+        self._ids_cubeta = self._dibujar_columna(self._cubeta)
+
+    def cargar(self, muestras):
+        """
+        Dibuja de una vez muestras previas (tiempo, nivel, bomba, consumos),
+        por ejemplo las de un HistorialNivel, reducidas a una columna por píxel.
+        """
+        muestras = list(muestras)
+        if not muestras:
+            return
+        self._cerrar_cubeta()
+        ultima = int(muestras[-1][0] // self.segundos_por_columna)
+        self._desplazar_hasta(ultima)
+
+        desde = (ultima - self.ancho) * self.segundos_por_columna
+        visibles = (m for m in muestras if m[0] >= desde)
+        for cubeta in reducir_min_max(visibles, self.segundos_por_columna):
+            if cubeta[0] == ultima:
+                # La última columna queda abierta para las muestras en vivo
+                self._cubeta = list(cubeta)
+                self._ids_cubeta = self._dibujar_columna(cubeta)
+            else:
+                self._columnas.append((cubeta[0], self._dibujar_columna(cubeta)))
+                self._punto_anterior = (cubeta[0], self._y((cubeta[3] / self.capacidad) * 100))
@@ -0,0 +1,154 @@
+import mmap
+import os
+import struct
+
+# Encabezado: firma, tamaño de registro, reservado, capacidad (registros), total escritos
+_ENCABEZADO = struct.Struct('<8sIIQQ')
+_TAMANO_ENCABEZADO = 64
+_FIRMA = b'TINHIST1'
+_OFFSET_ESCRITOS = 24
+_ESCRITOS = struct.Struct('<Q')
+
+# Muestra: tiempo, nivel_agua, fuentes (bits), consumos (bits), bomba_activa
+MUESTRA = struct.Struct('<ddIIB7x')
+
+
+class HistorialNivel:
+    """
+    Historial del tinaco en un archivo circular mapeado en memoria.
+    Cada muestra ocupa MUESTRA.size bytes en una posición fija, así que
+    agregar es O(1) y no crea objetos nuevos. Otros procesos (o una sesión
+    posterior) pueden mapear el mismo archivo y consultar rangos de tiempo
+    sin copiar el buffer.
+
+    La escritura no es segura entre procesos por sí sola: TinacoContext
+    agrega las muestras con su lock tomado.
+    """
+
+    def __init__(self, ruta, tamano_max=4 * 1024 * 1024, solo_lectura=False):
+        """
+        ruta: archivo del historial; si ya existe con el mismo formato se
+              continúa a partir de sus muestras
+        tamano_max: bytes del archivo; determina cuántas muestras se retienen
+        solo_lectura: mapear sin permiso de escritura (para consultas)
+        """
+        self.ruta = ruta
+        self.tamano_max = tamano_max
+        self.solo_lectura = solo_lectura
+        self._abrir()
+
+    def _abrir(self):
+        if self.solo_lectura:
+            with open(self.ruta, 'rb') as archivo:
+                self._mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ)
+            firma, tamano_registro, capacidad, _ = self._leer_encabezado()
+            if firma != _FIRMA or tamano_registro != MUESTRA.size:
+                raise ValueError(f"{self.ruta} no es un historial de tinaco válido")
+            self.capacidad = capacidad
+        else:
+            capacidad = (self.tamano_max - _TAMANO_ENCABEZADO) // MUESTRA.size
+            if capacidad < 1:
+                raise ValueError(f"tamano_max demasiado pequeño: {self.tamano_max} bytes")
+            tamano = _TAMANO_ENCABEZADO + capacidad * MUESTRA.size
+
+            fd = os.open(self.ruta, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                nuevo = os.fstat(fd).st_size != tamano
+                if nuevo:
+                    os.ftruncate(fd, tamano)
+                self._mapa = mmap.mmap(fd, tamano)
+            finally:
+                os.close(fd)
+
+            firma, tamano_registro, capacidad_actual, _ = self._leer_encabezado()
+            if nuevo or firma != _FIRMA or tamano_registro != MUESTRA.size or capacidad_actual != capacidad:
+                _ENCABEZADO.pack_into(self._mapa, 0, _FIRMA, MUESTRA.size, 0, capacidad, 0)
+            self.capacidad = capacidad
+
+        self._vista = memoryview(self._mapa)
+
+    def _leer_encabezado(self):
+        firma, tamano_registro, _, capacidad, escritos = _ENCABEZADO.unpack_from(self._mapa, 0)
+        return firma, tamano_registro, capacidad, escritos
+
+    def __getstate__(self):
+        # El mapa se vuelve a abrir en cada proceso
+        return {'ruta': self.ruta, 'tamano_max': self.tamano_max, 'solo_lectura': self.solo_lectura}
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._abrir()
+
+    @property
+    def escritos(self):
+        """Total de muestras escritas desde que se creó el archivo."""
+        return _ESCRITOS.unpack_from(self._mapa, _OFFSET_ESCRITOS)[0]
+
+    def __len__(self):
+        return min(self.escritos, self.capacidad)
+
+    def agregar(self, tiempo, nivel_agua, bomba_activa, fuentes, consumos):
+        """Agrega una muestra sobrescribiendo la más antigua si está lleno."""
+        escritos = self.escritos
+        posicion = _TAMANO_ENCABEZADO + (escritos % self.capacidad) * MUESTRA.size
+        MUESTRA.pack_into(self._mapa, posicion, tiempo, nivel_agua, fuentes, consumos, bomba_activa)
+        # El contador se actualiza después: un lector nunca ve una muestra a medias
+        _ESCRITOS.pack_into(self._mapa, _OFFSET_ESCRITOS, escritos + 1)
+
+    def _posicion(self, indice, escritos):
+        """Offset de la muestra `indice` (0 = la más antigua retenida)."""
+        primero = escritos - min(escritos, self.capacidad)
+        return _TAMANO_ENCABEZADO + ((primero + indice) % self.capacidad) * MUESTRA.size
+
+    def _tiempo(self, indice, escritos):
+        return struct.unpack_from('<d', self._mapa, self._posicion(indice, escritos))[0]
+
+    def _tramos(self, inicio, fin, escritos):
+        """Vistas de memoria contiguas con las muestras [inicio, fin)."""
+        if inicio >= fin:
+            return []
+        primero = escritos - min(escritos, self.capacidad)
+        a = (primero + inicio) % self.capacidad
+        n = fin - inicio
+        hasta_final = self.capacidad - a
+        base = _TAMANO_ENCABEZADO
+        if n <= hasta_final:
+            return [self._vista[base + a * MUESTRA.size:base + (a + n) * MUESTRA.size]]
+        return [
+            self._vista[base + a * MUESTRA.size:base + self.capacidad * MUESTRA.size],
+            self._vista[base:base + (n - hasta_final) * MUESTRA.size],
+        ]
+
+    def _buscar(self, tiempo, escritos):
+        """Primer índice con tiempo >= `tiempo` (búsqueda binaria)."""
+        bajo, alto = 0, min(escritos, self.capacidad)
+        while bajo < alto:
+            medio = (bajo + alto) // 2
+            if self._tiempo(medio, escritos) < tiempo:
+                bajo = medio + 1
+            else:
+                alto = medio
+        return bajo
+
+    def rango(self, desde=None, hasta=None):
+        """
+        Itera las muestras con desde <= tiempo < hasta, en orden cronológico,
+        como tuplas (tiempo, nivel_agua, fuentes, consumos, bomba_activa).
+        Se desempaqueta directamente del mapa, sin copiar el buffer.
+        """
+        escritos = self.escritos
+        inicio = 0 if desde is None else self._buscar(desde, escritos)
+        fin = min(escritos, self.capacidad) if hasta is None else self._buscar(hasta, escritos)
+        for tramo in self._tramos(inicio, fin, escritos):
+            yield from MUESTRA.iter_unpack(tramo)
+
+    def ultimas(self, n):
+        """Itera las últimas `n` muestras en orden cronológico."""
+        escritos = self.escritos
+        total = min(escritos, self.capacidad)
+        for tramo in self._tramos(max(0, total - n), total, escritos):
+            yield from MUESTRA.iter_unpack(tramo)
+
+    def cerrar(self):
+        self._vista.release()
+        self._mapa.close()
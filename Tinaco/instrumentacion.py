@@ -0,0 +1,254 @@
+import ctypes
+import os
+import threading
+import time
+import weakref
+from multiprocessing import Lock, current_process
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+# Filas de contadores: una por cada hilo (de cualquier proceso) que mide, más
+# una compartida para los que llegan con todas ocupadas por hilos vivos
+MAX_PROCESOS = 64
+# Cubetas de los histogramas: la cubeta i cuenta duraciones de [2^(i-1), 2^i) ns
+CUBETAS = 32
+_LARGO_NOMBRE = 32
+
+# Disposición de los contadores de cada (hilo, operación)
+_LLAMADAS = 0
+_EXITOS = 1
+_FALLOS = 2
+_ESPERA_TOTAL = 3
+_RETENCION_TOTAL = 4
+_ESPERA_HIST = 5
+_RETENCION_HIST = _ESPERA_HIST + CUBETAS
+_CAMPOS = _RETENCION_HIST + CUBETAS
+
+# Instancias vivas en este proceso; tras un fork el hijo debe pedir sus filas
+_instancias = weakref.WeakSet()
+
+
+def _despues_de_fork():
+    for instrumentacion in _instancias:
+        instrumentacion._local = threading.local()
+
+
+os.register_at_fork(after_in_child=_despues_de_fork)
+
+
+class _Seccion:
+    """Context manager que toma el lock midiendo la espera y la retención."""
+    __slots__ = ('instrumentacion', 'lock', 'base', 'inicio', 'adquirido')
+
+    def __init__(self, instrumentacion, lock, base):
+        self.instrumentacion = instrumentacion
+        self.lock = lock
+        self.base = base
+
+    def __enter__(self):
+        self.inicio = time.perf_counter_ns()
+        self.lock.acquire()
+        self.adquirido = time.perf_counter_ns()
+
+    def __exit__(self, *excepcion):
+        self.lock.release()
+        fin = time.perf_counter_ns()
+        self.instrumentacion._medir(self.base, self.adquirido - self.inicio, fin - self.adquirido)
+
+
+class Instrumentacion:
+    """
+    Contadores compartidos de las operaciones de un TinacoContext, por
+    operación y por hilo que llama: llamadas, éxitos/fallos e histogramas
+    de espera y retención del lock.
+    Cada hilo escribe solo en su propia fila (un proceso puede tener varios:
+    el planificador asyncio, la GUI, la telemetría), así que los contadores
+    se actualizan sin sincronización adicional. La fila de un hilo que
+    terminó pasa, con sus contadores, al siguiente hilo nuevo; si las
+    MAX_PROCESOS filas son de hilos vivos, los demás comparten una fila
+    extra donde pueden perderse incrementos (ver hilos_compartidos).
+    """
+
+    def __init__(self, operaciones):
+        self.operaciones = tuple(operaciones)
+        self._indices = {operacion: i for i, operacion in enumerate(self.operaciones)}
+        self._contadores = RawArray(ctypes.c_uint64, (MAX_PROCESOS + 1) * len(self.operaciones) * _CAMPOS)
+        self._pids = RawArray(ctypes.c_int64, MAX_PROCESOS)
+        self._hilos = RawArray(ctypes.c_uint64, MAX_PROCESOS)  # threading.get_ident() de cada fila
+        self._nombres = RawArray(ctypes.c_char, MAX_PROCESOS * _LARGO_NOMBRE)
+        self._ocupados = RawValue(ctypes.c_int32, 0)
+        self._compartidos = RawValue(ctypes.c_int32, 0)
+        self._lock_registro = Lock()
+        self._iniciar()
+
+    def _iniciar(self):
+        # Vista de los contadores con acceso más rápido que el arreglo ctypes
+        self._vista = memoryview(self._contadores).cast('B').cast('Q')
+        # .bases: operación -> índice en la fila del hilo actual
+        self._local = threading.local()
+        _instancias.add(self)
+
+    def __getstate__(self):
+        estado = self.__dict__.copy()
+        del estado['_vista'], estado['_local']
+        return estado
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._iniciar()
+
+    def _fila_libre(self, pid, hilo):
+        """Fila de un hilo que ya terminó (de este proceso o de uno muerto), o None."""
+        vivos = {h.ident for h in threading.enumerate()} - {hilo}
+        otros_pids = {}
+        for fila in range(MAX_PROCESOS):
+            if self._pids[fila] == pid:
+                if self._hilos[fila] not in vivos:
+                    return fila
+                continue
+            vivo = otros_pids.get(self._pids[fila])
+            if vivo is None:
+                try:
+                    os.kill(self._pids[fila], 0)
+                    vivo = True
+                except ProcessLookupError:
+                    vivo = False
+                except PermissionError:
+                    vivo = True
+                otros_pids[self._pids[fila]] = vivo
+            if not vivo:
+                return fila
+        return None
+
+    def _asignar_fila(self):
+        """
+        Reserva la fila del hilo actual la primera vez que mide. No falla:
+        sin filas libres el hilo usa la compartida.
+        """
+        pid = os.getpid()
+        hilo = threading.get_ident()
+        with self._lock_registro:
+            fila = self._ocupados.value
+            if fila < MAX_PROCESOS:
+                self._ocupados.value = fila + 1
+            else:
+                fila = self._fila_libre(pid, hilo)
+            if fila is None:
+                fila = MAX_PROCESOS
+                self._compartidos.value += 1
+            else:
+                self._pids[fila] = pid
+                self._hilos[fila] = hilo
+                nombre = current_process().name
+                if threading.current_thread() is not threading.main_thread():
+                    nombre = f"{nombre}/{threading.current_thread().name}"
+                nombre = nombre.encode("utf-8")[:_LARGO_NOMBRE - 1].ljust(_LARGO_NOMBRE, b"\0")
+                inicio = fila * _LARGO_NOMBRE
+                self._nombres[inicio:inicio + _LARGO_NOMBRE] = nombre
+        base = fila * len(self.operaciones) * _CAMPOS
+        bases = {operacion: base + i * _CAMPOS for operacion, i in self._indices.items()}
+        self._local.bases = bases
+        return bases
+
+    def _filas(self):
+        return getattr(self._local, 'bases', None) or self._asignar_fila()
+
+    def seccion(self, lock, operacion):
+        """Context manager para `with` que toma `lock` y mide `operacion`."""
+        return _Seccion(self, lock, self._filas()[operacion])
+
+    def _medir(self, base, espera, retencion):
+        c = self._vista
+        c[base + _LLAMADAS] += 1
+        c[base + _ESPERA_TOTAL] += espera
+        c[base + _RETENCION_TOTAL] += retencion
+        c[base + _ESPERA_HIST + min(espera.bit_length(), CUBETAS - 1)] += 1
+        c[base + _RETENCION_HIST + min(retencion.bit_length(), CUBETAS - 1)] += 1
+
+    def resultado(self, operacion, exito, veces=1):
+        """Cuenta `veces` resultados True/False de una operación."""
+        self._vista[self._filas()[operacion] + (_EXITOS if exito else _FALLOS)] += veces
+
+    @staticmethod
+    def _percentil_us(histograma, total, p):
+        """Cota superior (µs) de la cubeta donde cae el percentil p."""
+        if total == 0:
+            return 0.0
+        objetivo = total * p / 100
+        acumulado = 0
+        for i, cuenta in enumerate(histograma):
+            acumulado += cuenta
+            if acumulado >= objetivo:
+                return (1 << i) / 1000
+        return (1 << (len(histograma) - 1)) / 1000
+
+    def _resumen(self, filas):
+        """Suma los contadores de varias filas (hilos) para una operación."""
+        total = [0] * _CAMPOS
+        for base in filas:
+            for i, valor in enumerate(self._vista[base:base + _CAMPOS]):
+                total[i] += valor
+        llamadas = total[_LLAMADAS]
+        espera = total[_ESPERA_HIST:_ESPERA_HIST + CUBETAS]
+        retencion = total[_RETENCION_HIST:_RETENCION_HIST + CUBETAS]
+        return {
+            'llamadas': llamadas,
+            'exitos': total[_EXITOS],
+            'fallos': total[_FALLOS],
+            'espera_media_us': total[_ESPERA_TOTAL] / llamadas / 1000 if llamadas else 0.0,
+            'espera_p99_us': self._percentil_us(espera, llamadas, 99),
+            'retencion_media_us': total[_RETENCION_TOTAL] / llamadas / 1000 if llamadas else 0.0,
+            'retencion_p99_us': self._percentil_us(retencion, llamadas, 99),
+            'espera_histograma': espera,
+            'retencion_histograma': retencion,
+        }
+
+    @property
+    def hilos_compartidos(self):
+        """
+        Hilos que midieron en la fila compartida; con más de uno sus
+        contadores pueden haber perdido incrementos.
+        """
+        return self._compartidos.value
+
+    def _filas_usadas(self):
+        filas = list(range(self._ocupados.value))
+        if self._compartidos.value:
+            filas.append(MAX_PROCESOS)
+        return filas
+
+    def procesos(self):
+        """
+        Lista de (pid, nombre) de los hilos que han medido algo; el nombre es
+        el del proceso, más "/hilo" si no es el hilo principal. La fila
+        compartida, si se usó, va al final con pid 0.
+        """
+        resultado = []
+        for fila in range(self._ocupados.value):
+            inicio = fila * _LARGO_NOMBRE
+            nombre = bytes(self._nombres[inicio:inicio + _LARGO_NOMBRE]).split(b"\0", 1)[0]
+            resultado.append((self._pids[fila], nombre.decode("utf-8", "replace")))
+        if self._compartidos.value:
+            resultado.append((0, f"(compartida, {self._compartidos.value} hilos)"))
+        return resultado
+
+    def instantanea(self, por_proceso=False):
+        """
+        Copia de los contadores: {operacion: resumen} con los hilos
+        sumados, o {(pid, nombre): {operacion: resumen}} por hilo si
+        por_proceso.
+        Los histogramas usan cubetas de potencias de dos en nanosegundos.
+        """
+        tamano_fila = len(self.operaciones) * _CAMPOS
+        filas = self._filas_usadas()
+        if por_proceso:
+            return {
+                proceso: {
+                    operacion: self._resumen([fila * tamano_fila + i * _CAMPOS])
+                    for i, operacion in enumerate(self.operaciones)
+                }
+                for fila, proceso in zip(filas, self.procesos())
+            }
+        return {
+            operacion: self._resumen([fila * tamano_fila + i * _CAMPOS for fila in filas])
+            for i, operacion in enumerate(self.operaciones)
+        }
@@ -1,92 +1,67 @@
-from multiprocessing import Process, Manager
-import time
+from multiprocessing import Process, Event
+import argparse
 import random
-import tkinter as tk
-from tkinter import ttk
-import customtkinter as ctk
-from RotoplasGui import RotoplasGUI
+import signal
+import time
 
+# Con 'spawn' o 'forkserver' cada proceso trabajador vuelve a importar este
+# módulo: aquí solo va lo que necesitan los actores. Lo demás (GUI,
+# planificador, telemetría, simulación acelerada, topologías, trazas, puntos
+# de control, historial) se importa dentro de las funciones que lo usan.
 
 # Importar TinacoContext
 from tinaco_context import TinacoContext
+from actores import (paso_pluvial, paso_jardin, paso_lavadero, paso_banio, paso_solicitud,
+                     paso_despacho, controlar_cisterna, controlar_bomba,
+                     PERIODO_JARDIN, PERIODO_LAVADERO, PERIODO_BANIO)
 
-def proceso_pluvial(tinaco, terminar_evento):
+def proceso_pluvial(tinaco, terminar_evento, generador=None):
     """
     Proceso que simula la entrada de agua pluvial.
     Se activa aleatoriamente o por simulación manual.
+    Con `generador` (GeneradorCompartido) el generador aleatorio parte del
+    estado publicado ahí y publica el suyo tras cada ciclo, para los puntos
+    de control.
     """
     print("Proceso Pluvial iniciado")
     
+    rng = random
+    if generador is not None:
+        rng = random.Random()
+        estado = generador.estado()
+        if estado is not None:
+            rng.setstate(estado)
+    
     while not terminar_evento.is_set():
-        # Simulación aleatoria de lluvia (20% de probabilidad)
-        if random.random() < 0.2:
-            tinaco.lluvia_evento.set()
-            print("Está lloviendo")
-        else:
-            # No interferimos con la lluvia manual
-            if not tinaco.lluvia_evento.is_set():
-                pass
-            
-        if tinaco.lluvia_evento.is_set():
-            if tinaco.llenar_desde_pluvial():
-                pass  # El mensaje ya se imprime en el método
-            else:
-                pass  # El mensaje ya se imprime en el método
-        
-        time.sleep(4)  # Verificar cada 4 segundos
+        periodo = paso_pluvial(tinaco, rng)
+        if generador is not None:
+            generador.publicar(rng.getstate())
+        time.sleep(periodo)  # Verificar cada 4 segundos
 
 
-def proceso_cisterna(tinaco, terminar_evento):
+def proceso_cisterna(tinaco, terminar_evento, horizonte=None):
     """
     Proceso que gestiona el llenado desde la cisterna.
-    Se activa cuando el nivel del agua es bajo.
+    Se activa cuando el nivel del agua es bajo (despierta al cruzar el 30%
+    o el 90%, sin revisar periódicamente). Con `horizonte` llena por
+    anticipado según el pronóstico de la demanda (revisa cada ciclo); el
+    pronóstico es el del tinaco, que main crea antes de los procesos.
     """
     print("Proceso Cisterna iniciado")
-    
-    while not terminar_evento.is_set():
-        estado = tinaco.obtener_estado()
-        
-        # Activar llenado si el nivel es menor al 30%
-        if estado['porcentaje'] < 30:
-            tinaco.activar_bomba()
-            if tinaco.llenar_desde_cisterna():
-                pass  # El mensaje ya se imprime en el método
-            else:
-                pass  # El mensaje ya se imprime en el método
-                tinaco.desactivar_bomba()
-        elif estado['porcentaje'] >= 90:
-            # Desactivar bomba si el tinaco está casi lleno
-            tinaco.desactivar_bomba()
-            
-        time.sleep(3)  # Verificar cada 3 segundos
+    if horizonte:
+        controlar_cisterna(tinaco, terminar_evento, pronostico=tinaco.pronostico('Cisterna'),
+                           horizonte=horizonte)
+    else:
+        controlar_cisterna(tinaco, terminar_evento)
 
 
 def proceso_bomba(tinaco, terminar_evento):
     """
     Proceso que controla la bomba de presión.
-    La bomba se activa cuando alguna toma está abierta y el nivel es superior al 25%.
+    La bomba se apaga en cuanto no hay tomas abiertas o el nivel baja del 25%.
     """
     print("Proceso Bomba iniciado")
-    
-    while not terminar_evento.is_set():
-        # Esperar a que la bomba se active
-        if tinaco.bomba_evento.wait(timeout=1):
-            print("Bomba encendida")
-            
-            # Mientras la bomba esté activa y haya consumo
-            while tinaco.bomba_activa and not terminar_evento.is_set():
-                estado = tinaco.obtener_estado()
-                
-                # Verificar si hay algún consumo activo
-                consumos_activos = any(estado['consumos'].values())
-                
-                # Verificar nivel del agua
-                if not consumos_activos or estado['porcentaje'] < 25:
-                    tinaco.desactivar_bomba()
-                    print("Bomba apagada")
-                    break
-                
-                time.sleep(1)
+    controlar_bomba(tinaco, terminar_evento)
 
 
 def proceso_jardin(tinaco, terminar_evento):
@@ -97,8 +72,7 @@ def proceso_jardin(tinaco, terminar_evento):
     print("Proceso Jardín iniciado")
     
     while not terminar_evento.is_set():
-        tinaco.consumir_jardin()  # El mensaje ya se imprime en el método
-        time.sleep(5)  # Regar cada 5 segundos
+        time.sleep(paso_jardin(tinaco))  # Regar cada 5 segundos
 
 
 def proceso_lavadero(tinaco, terminar_evento):
@@ -109,8 +83,7 @@ def proceso_lavadero(tinaco, terminar_evento):
     print("Proceso Lavadero iniciado")
     
     while not terminar_evento.is_set():
-        tinaco.consumir_lavadero()  # El mensaje ya se imprime en el método
-        time.sleep(4)  # Usar lavadero cada 4 segundos
+        time.sleep(paso_lavadero(tinaco))  # Usar lavadero cada 4 segundos
 
 
 def proceso_banio(tinaco, terminar_evento):
@@ -121,39 +94,419 @@ def proceso_banio(tinaco, terminar_evento):
     print("Proceso Baño iniciado")
     
     while not terminar_evento.is_set():
-        tinaco.consumir_banio()  # El mensaje ya se imprime en el método
-        time.sleep(3)  # Usar baño cada 3 segundos
+        time.sleep(paso_banio(tinaco))  # Usar baño cada 3 segundos
 
 
-def main():
-    """Función principal que inicia el sistema completo."""
-    #contexto compartido
-    manager = Manager()
-    terminar_evento = manager.Event()
+def proceso_demanda(tinaco, terminar_evento, consumo, periodo):
+    """
+    Proceso de una toma con despacho: solo encola sus usos (una toma breve
+    del lock para sumarlos); el proceso Despacho decide cuáles se atienden.
+    """
+    print(f"Proceso {consumo} iniciado (despacho por prioridad)")
     
-    # se crea el objeti tinacocontexts
-    tinaco = TinacoContext()
+    while not terminar_evento.is_set():
+        time.sleep(paso_solicitud(tinaco, consumo, periodo))
+
+
+def proceso_despacho(tinaco, terminar_evento):
+    """Proceso que atiende la demanda encolada en lote, por prioridad."""
+    print("Proceso Despacho iniciado")
+    
+    while not terminar_evento.is_set():
+        time.sleep(paso_despacho(tinaco))
+
+
+def describir_bomba(tinaco, duracion, previo=None):
+    """
+    Ciclo de trabajo, arranques y paradas de la bomba. Los totales del
+    tinaco incluyen lo restaurado de un punto de control: `duracion` debe
+    cubrir lo mismo, o `previo` (uso_bomba() al empezar `duracion`) da el
+    tiempo activa de esos segundos.
+    """
+    uso = tinaco.uso_bomba()
+    activa = uso['segundos_activa'] - (previo['segundos_activa'] if previo else 0.0)
+    return (f"bomba activa {activa / max(duracion, 1e-12) * 100:.1f}% del tiempo, "
+            f"{uso['arranques']} arranques, {uso['paradas']} paradas")
+
+
+def imprimir_demanda(tinaco):
+    """Resumen de la cola de demanda por consumo."""
+    for consumo, (pendientes, atendidas, rechazadas) in tinaco.demanda().items():
+        print(f"  {consumo}: {atendidas} atendidas, {rechazadas} rechazadas, {pendientes} en cola")
+
+
+def simulacion_acelerada(duracion, semilla=None, verbosidad="silencio", historial=None,
+                         punto_control=None, reanudar=False, intervalo_punto_control=3600, grabar=None,
+                         despacho=False, anticipar=None):
+    """Ejecuta las reglas sin procesos ni GUI sobre un reloj virtual."""
+    from simulacion import simular
+    motor, segundos = simular(duracion, semilla=semilla, verbosidad=verbosidad, historial=historial,
+                              punto_control=punto_control, reanudar=reanudar,
+                              intervalo_punto_control=intervalo_punto_control, grabar=grabar,
+                              despacho=despacho, anticipar=anticipar)
+    estado = motor.tinaco.obtener_estado()
+    print(f"Simulados {motor.reloj:.0f}s ({motor.eventos} eventos) en {segundos:.2f}s reales")
+    print(f"Nivel final: {estado['nivel_agua']:.1f}L ({estado['porcentaje']:.1f}%)")
+    print(f"Bomba activa: {estado['bomba_activa']}")
+    print(f"Uso: {describir_bomba(motor.tinaco, motor.reloj)}")
+    print(f"Fuentes: {estado['fuentes']}")
+    print(f"Consumos: {estado['consumos']}")
+    if despacho:
+        print("Demanda:")
+        imprimir_demanda(motor.tinaco)
+
+
+def simulacion_continua(duracion, semilla=None, ruta=None):
+    """Simula con caudales continuos (un tinaco, o los de una topología)."""
+    from modelo_continuo import ModeloContinuo
+    from topologia import cargar_topologia
+    configs = cargar_topologia(ruta) if ruta else [None]
+    inicio = time.perf_counter()
+    modelos = []
+    for config in configs:
+        modelo = ModeloContinuo(config, semilla=semilla)
+        modelo.ejecutar(duracion)
+        modelos.append(modelo)
+    segundos = time.perf_counter() - inicio
     
-    #  procesos
+    print(f"Caudales continuos: simulados {duracion:.0f}s ({sum(m.eventos for m in modelos)} tramos) "
+          f"en {segundos * 1e3:.2f}ms reales")
+    for modelo in modelos:
+        resumen = modelo.resumen()
+        print(f"{modelo.nombre or 'Tinaco'}: {resumen['nivel_final']:.1f}L "
+              f"({resumen['nivel_final'] / modelo.capacidad_max * 100:.1f}%), "
+              f"bomba {resumen['ciclo_trabajo_bomba'] * 100:.1f}% del tiempo "
+              f"({resumen['arranques_bomba']} arranques), "
+              f"{resumen['demanda_no_atendida']:.0f}L sin atender, "
+              f"{resumen['litros_rechazados']:.0f}L rechazados por desborde")
+
+
+def iniciar_procesos(tinaco, terminar_evento, generador=None, despacho=False, anticipar=None):
+    """
+    Inicia un proceso por actor y devuelve la lista de procesos.
+    Con `despacho` las tomas encolan su demanda y un proceso más la atiende.
+    Con `anticipar` la cisterna llena por anticipado con ese horizonte.
+    """
     procesos = [
-        Process(name="Pluvial", target=proceso_pluvial, args=(tinaco, terminar_evento)),
-        Process(name="Cisterna", target=proceso_cisterna, args=(tinaco, terminar_evento)),
+        Process(name="Pluvial", target=proceso_pluvial, args=(tinaco, terminar_evento, generador)),
+        Process(name="Cisterna", target=proceso_cisterna, args=(tinaco, terminar_evento, anticipar)),
         Process(name="Bomba", target=proceso_bomba, args=(tinaco, terminar_evento)),
-        Process(name="Jardin", target=proceso_jardin, args=(tinaco, terminar_evento)),
-        Process(name="Lavadero", target=proceso_lavadero, args=(tinaco, terminar_evento)),
-        Process(name="Banio", target=proceso_banio, args=(tinaco, terminar_evento)),
     ]
+    if despacho:
+        procesos += [
+            Process(name=consumo, target=proceso_demanda, args=(tinaco, terminar_evento, consumo, periodo))
+            for consumo, periodo in (("Jardin", PERIODO_JARDIN), ("Lavadero", PERIODO_LAVADERO),
+                                     ("Banio", PERIODO_BANIO))
+        ]
+        procesos.append(Process(name="Despacho", target=proceso_despacho, args=(tinaco, terminar_evento)))
+    else:
+        procesos += [
+            Process(name="Jardin", target=proceso_jardin, args=(tinaco, terminar_evento)),
+            Process(name="Lavadero", target=proceso_lavadero, args=(tinaco, terminar_evento)),
+            Process(name="Banio", target=proceso_banio, args=(tinaco, terminar_evento)),
+        ]
     
     # Inicia los  procesos
     for proceso in procesos:
         proceso.start()
         print(f"Proceso {proceso.name} iniciado con PID {proceso.pid}")
+    return procesos
+
+
+def detener_procesos(procesos, tinaco=None):
+    """
+    Espera a que terminen los procesos (la señal ya debe estar enviada).
+    Con `tinaco` se despierta antes a los controladores que esperan un cambio.
+    """
+    if tinaco is not None:
+        tinaco.despertar()
+    for proceso in procesos:
+        proceso.join(timeout=2)
+        if proceso.is_alive():
+            print(f"Proceso {proceso.name} no respondió, terminando forzosamente.")
+            proceso.terminate()
+
+
+def iniciar_telemetria(tinacos, puerto):
+    """Arranca el servidor de telemetría local (o nada si puerto es None)."""
+    if puerto is None:
+        return None
+    from telemetria import ServidorTelemetria
+    servidor = ServidorTelemetria(tinacos, puerto=puerto).iniciar()
+    print(f"Telemetría en http://127.0.0.1:{servidor.puerto}/estado y ws://127.0.0.1:{servidor.puerto}/ws")
+    return servidor
+
+
+def reproduccion(ruta):
+    """Reproduce una traza grabada sin procesos ni esperas y verifica el resultado."""
+    from traza import reproducir
+    resumen = reproducir(ruta)
+    print(f"Reproducidas {resumen['operaciones']} operaciones en {resumen['segundos']:.3f}s "
+          f"({resumen['ops_por_s']:.0f} ops/s)")
+    print(f"Nivel final: {resumen['nivel_final']:.1f}L, versión {resumen['version_final']}")
+    if resumen['truncada']:
+        print("La traza está truncada: se llenó durante la grabación")
+    if resumen['divergencia'] is not None:
+        print(f"El resultado difiere desde la operación {resumen['divergencia']}")
+    if resumen['coincide'] is None:
+        print("La traza no tiene estado final (la grabación no terminó)")
+    else:
+        print("Estado final idéntico al grabado" if resumen['coincide'] else "El estado final NO coincide")
+    return resumen['divergencia'] is None and resumen['coincide'] is not False
+
+
+def topologia_planificada(ruta, duracion, estrategia, trabajadores, semilla=None, verbosidad="silencio",
+                          telemetria=None, panel=False):
+    """
+    Ejecuta los tinacos de una topología en tiempo real con el planificador.
+    Con `panel` se muestran en una grilla (ver panel_tinacos) hasta cerrarla
+    o hasta cumplir `duracion`.
+    """
+    from planificador import Planificador
+    from topologia import cargar_topologia, crear_tinaco
+    planificador = Planificador(estrategia, trabajadores, semilla)
+    for config in cargar_topologia(ruta):
+        planificador.agregar_tinaco(crear_tinaco(config, verbosidad=verbosidad), config)
+    
+    terminar_evento = Event()
+    inicio = time.time()
+    planificador.iniciar(terminar_evento)
+    servidor = iniciar_telemetria([tinaco for tinaco, _ in planificador.tinacos], telemetria)
+    print(f"{len(planificador.tinacos)} tinacos en marcha con el planificador '{estrategia}'")
+    try:
+        if panel:
+            from panel_tinacos import PanelTinacos
+            app = PanelTinacos([tinaco for tinaco, _ in planificador.tinacos])
+            app.after(int(duracion * 1000), app.destroy)
+            app.mainloop()
+        else:
+            terminar_evento.wait(duracion)
+    except KeyboardInterrupt:
+        print("\nInterrupción del teclado detectada.")
+    finally:
+        terminar_evento.set()
+        planificador.detener()
+        if servidor is not None:
+            servidor.detener()
+    
+    for tinaco, _ in planificador.tinacos:
+        estado = tinaco.obtener_estado()
+        print(f"{tinaco.nombre}: {estado['nivel_agua']:.1f}L ({estado['porcentaje']:.1f}%), "
+              f"bomba {'activa' if estado['bomba_activa'] else 'inactiva'}; "
+              f"{describir_bomba(tinaco, time.time() - inicio)}")
+
+
+def simulacion_topologia(ruta, duracion, semilla=None, verbosidad="silencio", tiempo_real=False,
+                         punto_control=None, reanudar=False, intervalo_punto_control=3600, telemetria=None):
+    """Ejecuta todos los tinacos de una topología en un solo proceso."""
+    from topologia import cargar_topologia, crear_motor
+    from punto_control import leer, restaurar_motor, ejecutar_con_puntos_control
+    motor = crear_motor(cargar_topologia(ruta), semilla=semilla,
+                        tiempo_real=tiempo_real, verbosidad=verbosidad)
+    if reanudar:
+        restaurar_motor(motor, leer(punto_control))
+    servidor = iniciar_telemetria(motor.tinacos, telemetria)
+    inicio = time.perf_counter()
+    try:
+        if punto_control is None:
+            motor.ejecutar(duracion)
+        else:
+            ejecutar_con_puntos_control(motor, duracion, punto_control, intervalo_punto_control)
+    except KeyboardInterrupt:
+        print("\nInterrupción del teclado detectada.")
+    segundos = time.perf_counter() - inicio
+    if servidor is not None:
+        servidor.detener()
+    
+    print(f"{len(motor.tinacos)} tinacos: simulados {motor.reloj:.0f}s "
+          f"({motor.eventos} eventos) en {segundos:.2f}s reales")
+    for tinaco in motor.tinacos:
+        estado = tinaco.obtener_estado()
+        print(f"{tinaco.nombre}: {estado['nivel_agua']:.1f}L ({estado['porcentaje']:.1f}%), "
+              f"bomba {'activa' if estado['bomba_activa'] else 'inactiva'}; "
+              f"{describir_bomba(tinaco, motor.reloj)}")
+
+
+def main():
+    """Función principal que inicia el sistema completo."""
+    from planificador import Planificador, ESTRATEGIAS
+    from historial import HistorialNivel
+    from traza import TrazaMutaciones
+    from punto_control import GeneradorCompartido, PuntoControl, serializar, leer, restaurar_tinacos
+    
+    parser = argparse.ArgumentParser(description="Sistema de monitoreo Rotoplas")
+    parser.add_argument("--acelerado", action="store_true",
+                        help="simular sin procesos ni GUI, lo más rápido posible")
+    parser.add_argument("--duracion", type=float, default=86400,
+                        help="segundos de tiempo simulado en modo acelerado (reales con "
+                             "--headless o --topologia)")
+    parser.add_argument("--headless", action="store_true",
+                        help="correr los procesos sin GUI (sin importar tkinter ni customtkinter) "
+                             "hasta --duracion, Ctrl+C o SIGTERM")
+    parser.add_argument("--semilla", type=int, default=None,
+                        help="semilla del generador aleatorio de la lluvia")
+    parser.add_argument("--verbosidad", choices=["silencio", "normal", "detallado"], default=None,
+                        help="mensajes de eventos en consola (por defecto: detallado, "
+                             "o silencio en modo acelerado)")
+    parser.add_argument("--historial", default=None,
+                        help="archivo donde guardar el historial de nivel (buffer circular)")
+    parser.add_argument("--historial-mb", type=float, default=4,
+                        help="tamaño máximo del archivo de historial en MB")
+    parser.add_argument("--topologia", default=None,
+                        help="archivo JSON con varios tinacos; se simulan en un solo proceso "
+                             "(en tiempo real salvo con --acelerado)")
+    parser.add_argument("--panel", action="store_true",
+                        help="con --topologia y --planificador, mostrar los tinacos en una grilla "
+                             "(para cientos de tinacos)")
+    parser.add_argument("--continuo", action="store_true",
+                        help="con --acelerado, usar caudales continuos (L/s) e integrar el nivel "
+                             "entre cruces de umbral en vez de simular cada ciclo")
+    parser.add_argument("--planificador", choices=ESTRATEGIAS, default=None,
+                        help="ejecutar los actores como tareas en un event loop (asyncio) o en un "
+                             "pool fijo de procesos (pool) en vez de un proceso por actor")
+    parser.add_argument("--trabajadores", type=int, default=2,
+                        help="procesos del pool con --planificador pool")
+    parser.add_argument("--anticipar", type=float, default=None, metavar="SEGUNDOS",
+                        help="llenar la cisterna por anticipado según el pronóstico de la demanda "
+                             "neta a SEGUNDOS (en una topología: 'horizonte' en la cisterna)")
+    parser.add_argument("--despacho", action="store_true",
+                        help="las tomas encolan su demanda y un despacho la atiende en lote por "
+                             "prioridad (baño > lavadero > jardín) con cuotas")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="medir la espera y retención del lock por operación y por proceso "
+                             "(panel en la GUI)")
+    parser.add_argument("--punto-control", default=None,
+                        help="archivo donde guardar periódicamente el estado del tinaco")
+    parser.add_argument("--intervalo-punto-control", type=float, default=None,
+                        help="segundos entre puntos de control (por defecto 10 en tiempo real, "
+                             "3600 simulados en modo acelerado o con --topologia)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continuar desde el estado guardado en --punto-control")
+    parser.add_argument("--telemetria", type=int, default=None, metavar="PUERTO",
+                        help="servir el estado por HTTP (/estado) y WebSocket (/ws) en 127.0.0.1")
+    parser.add_argument("--grabar", default=None,
+                        help="grabar cada mutación del tinaco en una traza binaria")
+    parser.add_argument("--reproducir", default=None,
+                        help="reproducir una traza lo más rápido posible, verificar el estado "
+                             "final y salir")
+    args = parser.parse_args()
+    if args.resume and not args.punto_control:
+        parser.error("--resume requiere --punto-control")
+    if args.grabar and args.topologia:
+        parser.error("--grabar graba un solo tinaco; no se puede usar con --topologia")
+    if args.panel and not (args.topologia and args.planificador and not args.acelerado):
+        parser.error("--panel requiere --topologia y --planificador (en tiempo real)")
+    if args.anticipar and (args.topologia or args.planificador or args.continuo):
+        parser.error("--anticipar es para un tinaco con un proceso por actor o con --acelerado")
+    if args.despacho and (args.topologia or args.planificador or args.continuo):
+        parser.error("--despacho es para un tinaco con un proceso por actor o con --acelerado")
+    
+    if args.reproducir:
+        raise SystemExit(0 if reproduccion(args.reproducir) else 1)
+    intervalo_simulado = args.intervalo_punto_control or 3600
+    
+    if args.continuo:
+        if not args.acelerado:
+            parser.error("--continuo requiere --acelerado")
+        simulacion_continua(args.duracion, args.semilla, args.topologia)
+        return
+    
+    if args.topologia and args.planificador and not args.acelerado:
+        topologia_planificada(args.topologia, args.duracion, args.planificador, args.trabajadores,
+                              args.semilla, args.verbosidad or "silencio", args.telemetria, args.panel)
+        return
+    
+    if args.topologia:
+        simulacion_topologia(args.topologia, args.duracion, args.semilla,
+                             args.verbosidad or "silencio", tiempo_real=not args.acelerado,
+                             punto_control=args.punto_control, reanudar=args.resume,
+                             intervalo_punto_control=intervalo_simulado, telemetria=args.telemetria)
+        return
+    
+    historial = None
+    if args.historial:
+        historial = HistorialNivel(args.historial, tamano_max=int(args.historial_mb * 1024 * 1024))
+    
+    if args.acelerado:
+        simulacion_acelerada(args.duracion, args.semilla, args.verbosidad or "silencio", historial,
+                             args.punto_control, args.resume, intervalo_simulado, args.grabar,
+                             args.despacho, args.anticipar)
+        return
+    
+    #contexto compartido (primitivas nativas, sin proceso Manager)
+    terminar_evento = Event()
+    
+    # se crea el objeti tinacocontexts
+    tinaco = TinacoContext(verbosidad=args.verbosidad or "detallado", historial=historial,
+                           instrumentar=args.instrumentar)
+    
+    # El pronóstico del llenado anticipado se crea antes de restaurar y de
+    # crear los procesos, para que sea el mismo en todos
+    if args.anticipar:
+        tinaco.pronostico('Cisterna')
+    
+    # Estado del generador de la lluvia, compartido para los puntos de control
+    generador = GeneradorCompartido()
+    if args.semilla is not None:
+        generador.publicar(random.Random(args.semilla).getstate())
+    if args.resume:
+        inicio = time.perf_counter()
+        punto = leer(args.punto_control)
+        restaurar_tinacos([tinaco], punto)
+        if punto['generador'] is not None:
+            generador.publicar(punto['generador'])
+        print(f"Estado restaurado de {args.punto_control} en {(time.perf_counter() - inicio) * 1e3:.1f} ms")
+    
+    # La traza parte del estado ya restaurado
+    if args.grabar:
+        tinaco.traza = TrazaMutaciones.crear(args.grabar, tinaco)
+    
+    escritor = None
+    if args.punto_control:
+        def capturar():
+            return serializar([(tinaco.nombre, tinaco.exportar_estado())], generador.estado())
+        escritor = PuntoControl(args.punto_control)
+        escritor.periodico(capturar, args.intervalo_punto_control or 10, terminar_evento)
+    
+    # Sin GUI, Ctrl+C y SIGTERM solo anotan la señal. Se instala antes de
+    # crear los procesos para que la hereden: una señal al grupo completo
+    # (Ctrl+C, timeout, systemd) no mata a un actor con el lock del tinaco
+    # tomado, y el proceso principal los detiene con terminar_evento. Tampoco
+    # se interrumpe al hilo principal dentro de un método de terminar_evento,
+    # lo que dejaría tomado su lock.
+    senales = []
+    if args.headless:
+        for senal in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(senal, lambda numero, _: senales.append(numero))
+    
+    #  procesos (uno por actor) o planificador
+    planificador = None
+    procesos = []
+    if args.planificador:
+        planificador = Planificador(args.planificador, args.trabajadores, args.semilla, generador)
+        planificador.agregar_tinaco(tinaco)
+        planificador.iniciar(terminar_evento)
+        print(f"Actores en marcha con el planificador '{args.planificador}'")
+    else:
+        procesos = iniciar_procesos(tinaco, terminar_evento, generador, args.despacho, args.anticipar)
+    servidor = iniciar_telemetria([tinaco], args.telemetria)
+    inicio_sistema = time.time()
+    uso_inicial = tinaco.uso_bomba()
     
     try:
-        # Iniciar GUI
-        app = RotoplasGUI(tinaco)
-        app.protocol("WM_DELETE_WINDOW", lambda: terminar_evento.set())
-        app.mainloop()
+        if args.headless:
+            print(f"Sin GUI: en marcha por {args.duracion:.0f}s (Ctrl+C para terminar)")
+            fin = time.monotonic() + args.duracion
+            while not senales and not terminar_evento.is_set() and time.monotonic() < fin:
+                time.sleep(0.2)
+            if senales:
+                print("\nSeñal de terminación recibida.")
+        else:
+            # Iniciar GUI
+            from RotoplasGui import RotoplasGUI
+            app = RotoplasGUI(tinaco)
+            app.protocol("WM_DELETE_WINDOW", lambda: terminar_evento.set())
+            app.mainloop()
     except KeyboardInterrupt:
         print("\nInterrupción del teclado detectada.")
     finally:
@@ -161,12 +514,23 @@ def main():
         terminar_evento.set()
         print("Señal de terminación enviada a todos los procesos.")
         
+        if servidor is not None:
+            servidor.detener()
+        
         # Esperar a que todos los procesos terminen
-        for proceso in procesos:
-            proceso.join(timeout=2)
-            if proceso.is_alive():
-                print(f"Proceso {proceso.name} no respondió, terminando forzosamente.")
-                proceso.terminate()
+        if planificador is not None:
+            planificador.detener()
+        detener_procesos(procesos, tinaco)
+        
+        # Último punto de control con los actores ya detenidos
+        if escritor is not None:
+            escritor.cerrar(capturar())
+        if tinaco.traza is not None:
+            tinaco.traza.terminar(tinaco)
+        print(f"Uso: {describir_bomba(tinaco, time.time() - inicio_sistema, uso_inicial)}")
+        if args.despacho:
+            print("Demanda:")
+            imprimir_demanda(tinaco)
         
         print("Sistema terminado correctamente.")
 
@@ -0,0 +1,266 @@
+"""
+Modelo de caudales continuos: cada fuente y cada consumo tiene un caudal en
+L/s en vez de sumar o restar una porción de litros en cada ciclo.
+
+Entre dos cambios de estado el flujo neto es constante y el nivel es una
+recta, así que no hay pasos: se calcula directamente el instante del
+siguiente cruce de umbral (capacidad, 90%, 50%, 30%, 25%, 3%, ...) y se salta
+hasta él. Un día simulado son unos cientos de tramos en vez de decenas de
+miles de eventos por ciclo.
+
+Reglas, equivalentes a las de TinacoContext y actores.py:
+- una fuente llena mientras el nivel está por debajo de su límite (la
+  capacidad máxima, o encender_bajo en la cisterna); la pluvial además solo
+  desde que empieza a llover
+- un consumo toma agua mientras el nivel está por encima de su límite (el
+  mayor entre su umbral y su piso)
+- si en un límite el flujo neto cambia de signo (p. ej. con el jardín
+  abierto baja y cerrado sube), el nivel se queda en el límite y esa fuente
+  o consumo trabaja a caudal parcial: el equivalente continuo de encenderse
+  y apagarse en cada ciclo
+- la bomba se enciende cuando la cisterna llena con el nivel sobre la
+  activación mínima, y se apaga bajo el nivel mínimo, al llegar a
+  apagar_sobre o si no hay consumo
+"""
+import bisect
+import math
+import random
+import time
+
+from topologia import normalizar_tinaco
+
+
+def _primer_exito(rng, probabilidad):
+    """Ciclos sin éxito antes del primero con `probabilidad` por ciclo (geométrica)."""
+    if probabilidad >= 1:
+        return 0
+    if probabilidad <= 0:
+        return math.inf
+    return math.floor(math.log(1.0 - rng.random()) / math.log(1.0 - probabilidad))
+
+
+class ModeloContinuo:
+    """
+    Un tinaco con caudales continuos e integración exacta entre eventos.
+    Se avanza con ejecutar(duracion), como MotorSimulacion.
+    """
+
+    def __init__(self, config=None, semilla=None, trayectoria=False):
+        """
+        config: tinaco con el formato de topología (ver topologia.py); cada
+        fuente o consumo acepta además 'caudal' en L/s (por defecto
+        flujo/periodo o consumo/periodo: el mismo promedio que por ciclos)
+        semilla: semilla del generador del inicio de la lluvia
+        trayectoria: guardar en self.trayectoria los puntos (t, nivel) donde
+        cambia la pendiente; entre ellos el nivel es una recta
+        """
+        config = normalizar_tinaco(config or {})
+        capacidad = float(config['capacidad_max'])
+        self.nombre = config['nombre']
+        self.capacidad_max = capacidad
+        self.capacidad_min = float(config['capacidad_min'])
+        self.nivel_agua = float(config['nivel_inicial'])
+        self.reloj = 0.0
+        self.eventos = 0
+        rng = random.Random(semilla)
+
+        # Fuentes: [nombre, caudal, límite, es cisterna, inicio]
+        self._fuentes = []
+        apagar = []
+        for fuente in config['fuentes']:
+            caudal = fuente.get('caudal', fuente['flujo'] / fuente['periodo'])
+            if fuente['tipo'] == 'cisterna':
+                limite = capacidad * fuente['encender_bajo'] / 100
+                inicio = 0.0
+                apagar.append(capacidad * fuente['apagar_sobre'] / 100)
+            else:
+                # La lluvia empieza en el primer ciclo que sale y ya no se detiene
+                limite = capacidad
+                inicio = fuente['periodo'] * _primer_exito(rng, fuente['probabilidad'])
+            self._fuentes.append((fuente['nombre'], caudal, limite, fuente['tipo'] == 'cisterna', inicio))
+
+        # Consumos: [nombre, caudal, límite]
+        self._consumos = []
+        for consumo in config['consumos']:
+            caudal = consumo.get('caudal', consumo['consumo'] / consumo['periodo'])
+            piso = self.capacidad_min if consumo['piso'] == 'minimo' else capacidad * consumo['piso'] / 100
+            limite = max(capacidad * consumo['umbral'] / 100, piso)
+            self._consumos.append((consumo['nombre'], caudal, limite))
+
+        bomba = config['bomba']
+        self._bomba_minimo = capacidad * bomba['nivel_minimo'] / 100
+        self._bomba_activacion = capacidad * bomba['activacion_minima'] / 100
+        self._apagar = min(apagar, default=math.inf)
+        self.bomba_activa = False
+
+        # Niveles donde puede cambiar algo (flujos, bomba o métricas)
+        self._umbrales = sorted({
+            0.0, capacidad, self.capacidad_min, self._bomba_minimo, self._bomba_activacion, *apagar,
+            *(limite for _, _, limite, _, _ in self._fuentes),
+            *(limite for _, _, limite in self._consumos),
+        })
+
+        # Métricas acumuladas
+        self.tiempo_bajo_minimo = 0.0
+        self.tiempo_bomba = 0.0
+        self.arranques_bomba = 0
+        self.litros_rechazados = 0.0
+        self.entregado = {nombre: 0.0 for nombre, *_ in self._fuentes}
+        self.consumido = {nombre: 0.0 for nombre, *_ in self._consumos}
+        self.no_atendido = {nombre: 0.0 for nombre, *_ in self._consumos}
+        self.trayectoria = [(0.0, self.nivel_agua)] if trayectoria else None
+
+    def _caudales(self):
+        """
+        Caudales efectivos desde el nivel actual: (neto, por fuente, por consumo).
+        Las fuentes y consumos cuyo límite es justo el nivel actual se
+        encienden, se apagan o trabajan a caudal parcial según el sentido
+        en que se movería el nivel.
+        """
+        nivel = self.nivel_agua
+        fuentes = [0.0] * len(self._fuentes)
+        consumos = [0.0] * len(self._consumos)
+        base = 0.0
+        frontera_fuentes = []
+        frontera_consumos = []
+        for i, (_, caudal, limite, _, inicio) in enumerate(self._fuentes):
+            if inicio > self.reloj:
+                continue
+            if nivel < limite:
+                fuentes[i] = caudal
+                base += caudal
+            elif nivel == limite:
+                frontera_fuentes.append(i)
+        for j, (_, caudal, limite) in enumerate(self._consumos):
+            if nivel > limite:
+                consumos[j] = caudal
+                base -= caudal
+            elif nivel == limite:
+                frontera_consumos.append(j)
+
+        entrada_frontera = sum(self._fuentes[i][1] for i in frontera_fuentes)
+        salida_frontera = sum(self._consumos[j][1] for j in frontera_consumos)
+        if base - salida_frontera > 0:
+            # Sube aunque los consumos del límite estén abiertos
+            for j in frontera_consumos:
+                consumos[j] = self._consumos[j][1]
+            return base - salida_frontera, fuentes, consumos
+        if base + entrada_frontera < 0:
+            # Baja aunque las fuentes del límite estén llenando
+            for i in frontera_fuentes:
+                fuentes[i] = self._fuentes[i][1]
+            return base + entrada_frontera, fuentes, consumos
+
+        # Se queda en el límite: el sobrante (o el faltante) lo absorbe el
+        # lado del límite a caudal parcial
+        if base > 0:
+            fraccion = base / salida_frontera
+            for j in frontera_consumos:
+                consumos[j] = self._consumos[j][1] * fraccion
+        elif base < 0:
+            fraccion = -base / entrada_frontera
+            for i in frontera_fuentes:
+                fuentes[i] = self._fuentes[i][1] * fraccion
+        return 0.0, fuentes, consumos
+
+    def _siguiente_umbral(self, neto):
+        """Primer umbral en el sentido de `neto` (None si no hay)."""
+        if neto > 0:
+            i = bisect.bisect_right(self._umbrales, self.nivel_agua)
+            return self._umbrales[i] if i < len(self._umbrales) else None
+        if neto < 0:
+            i = bisect.bisect_left(self._umbrales, self.nivel_agua)
+            return self._umbrales[i - 1] if i > 0 else None
+        return None
+
+    def _actualizar_bomba(self, nivel, fuentes, consumos):
+        """Reglas de la bomba para un tramo cuyo nivel medio es `nivel`."""
+        if self.bomba_activa:
+            if nivel < self._bomba_minimo or nivel >= self._apagar or not any(consumos):
+                self.bomba_activa = False
+        else:
+            llenando = any(caudal > 0 and fuente[3] for caudal, fuente in zip(fuentes, self._fuentes))
+            if llenando and self._bomba_activacion < nivel < self._apagar:
+                self.bomba_activa = True
+                self.arranques_bomba += 1
+
+    def ejecutar(self, duracion):
+        """Avanza el reloj `duracion` segundos, tramo por tramo."""
+        fin = self.reloj + duracion
+        while self.reloj < fin:
+            neto, fuentes, consumos = self._caudales()
+
+            # Hasta el siguiente cruce de umbral, inicio de lluvia o el final
+            dt = fin - self.reloj
+            destino = None
+            umbral = self._siguiente_umbral(neto)
+            if umbral is not None and (umbral - self.nivel_agua) / neto <= dt:
+                dt = (umbral - self.nivel_agua) / neto
+                destino = umbral
+            for _, _, _, _, inicio in self._fuentes:
+                if self.reloj < inicio < self.reloj + dt:
+                    dt = inicio - self.reloj
+                    destino = None
+
+            medio = self.nivel_agua + neto * dt / 2
+            self._actualizar_bomba(medio, fuentes, consumos)
+            if medio < self.capacidad_min:
+                self.tiempo_bajo_minimo += dt
+            if self.bomba_activa:
+                self.tiempo_bomba += dt
+            for (nombre, caudal, limite, _, inicio), entregado in zip(self._fuentes, fuentes):
+                self.entregado[nombre] += entregado * dt
+                if limite >= self.capacidad_max and inicio <= self.reloj and self.nivel_agua >= limite:
+                    self.litros_rechazados += (caudal - entregado) * dt
+            for (nombre, caudal, _), consumido in zip(self._consumos, consumos):
+                self.consumido[nombre] += consumido * dt
+                self.no_atendido[nombre] += (caudal - consumido) * dt
+
+            self.nivel_agua = destino if destino is not None else self.nivel_agua + neto * dt
+            self.reloj = fin if dt == fin - self.reloj else self.reloj + dt
+            self.eventos += 1
+            if self.trayectoria is not None:
+                self.trayectoria.append((self.reloj, self.nivel_agua))
+
+    def nivel_en(self, t):
+        """Nivel exacto en el instante `t` (requiere trayectoria=True)."""
+        puntos = self.trayectoria
+        i = bisect.bisect_right(puntos, (t, math.inf))
+        if i == 0:
+            return puntos[0][1]
+        if i == len(puntos):
+            return puntos[-1][1]
+        (t0, n0), (t1, n1) = puntos[i - 1], puntos[i]
+        return n0 + (n1 - n0) * (t - t0) / (t1 - t0)
+
+    def obtener_estado(self):
+        """Estado con las mismas claves que TinacoContext.obtener_estado (sin version)."""
+        neto, fuentes, consumos = self._caudales()
+        return {
+            'nivel_agua': self.nivel_agua,
+            'porcentaje': (self.nivel_agua / self.capacidad_max) * 100,
+            'bomba_activa': self.bomba_activa,
+            'fuentes': {nombre: caudal > 0 for (nombre, *_), caudal in zip(self._fuentes, fuentes)},
+            'consumos': {nombre: caudal > 0 for (nombre, *_), caudal in zip(self._consumos, consumos)},
+            'neto': neto,
+        }
+
+    def resumen(self):
+        """Métricas acumuladas (en el estilo de LoteTinacos.resumen, en litros y segundos)."""
+        tiempo = max(self.reloj, 1e-12)
+        return {
+            'nivel_final': self.nivel_agua,
+            'fraccion_bajo_minimo': self.tiempo_bajo_minimo / tiempo,
+            'ciclo_trabajo_bomba': self.tiempo_bomba / tiempo,
+            'arranques_bomba': self.arranques_bomba,
+            'litros_rechazados': self.litros_rechazados,
+            'demanda_no_atendida': sum(self.no_atendido.values()),
+        }
+
+
+def simular_continuo(duracion, semilla=None, config=None):
+    """Simula `duracion` segundos con caudales continuos y devuelve (modelo, segundos reales)."""
+    modelo = ModeloContinuo(config, semilla=semilla)
+    inicio = time.perf_counter()
+    modelo.ejecutar(duracion)
+    return modelo, time.perf_counter() - inicio
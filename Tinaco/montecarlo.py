@@ -0,0 +1,206 @@
+import time
+
+import numpy as np
+
+from actores import (PERIODO_PLUVIAL, PERIODO_CISTERNA, PERIODO_BOMBA,
+                     PERIODO_JARDIN, PERIODO_LAVADERO, PERIODO_BANIO)
+
+# Mismos valores iniciales que TinacoContext, más la probabilidad de lluvia
+PARAMETROS_BASE = {
+    'capacidad_max': 1000.0,
+    'capacidad_min': 100.0,
+    'nivel_inicial': 300.0,
+    'flujo_pluvial': 15.0,
+    'flujo_cisterna': 30.0,
+    'consumo_jardin': 10.0,
+    'consumo_lavadero': 8.0,
+    'consumo_banio': 5.0,
+    'prob_lluvia': 0.2,
+}
+
+
+class LoteTinacos:
+    """
+    N tinacos independientes guardados como arreglos de NumPy.
+    Cada tick (1 segundo) aplica las reglas de TinacoContext a todo el lote
+    con operaciones enmascaradas; cada actor se dispara en los ticks
+    múltiplos de su periodo, igual que en la simulación con procesos.
+    Dentro de un tick los actores van en el orden de alta de
+    MotorSimulacion (pluvial, cisterna, bomba, jardín, lavadero, baño): sin
+    lluvia, un lote de un tinaco da los mismos niveles que el motor.
+    """
+
+    def __init__(self, n, semilla=None, **parametros):
+        """
+        Cada parámetro de PARAMETROS_BASE puede ser un escalar (igual para
+        todo el lote) o un arreglo de longitud n (un valor por escenario).
+        """
+        desconocidos = set(parametros) - set(PARAMETROS_BASE)
+        if desconocidos:
+            raise ValueError(f"Parámetros desconocidos: {sorted(desconocidos)}")
+
+        self.n = n
+        self.tick = 0
+        self.rng = np.random.default_rng(semilla)
+
+        p = dict(PARAMETROS_BASE, **parametros)
+        lote = lambda valor: np.broadcast_to(np.asarray(valor, dtype=np.float64), (n,)).copy()
+        self.capacidad_max = lote(p['capacidad_max'])
+        self.capacidad_min = lote(p['capacidad_min'])
+        self.flujo_pluvial = lote(p['flujo_pluvial'])
+        self.flujo_cisterna = lote(p['flujo_cisterna'])
+        self.consumo_jardin = lote(p['consumo_jardin'])
+        self.consumo_lavadero = lote(p['consumo_lavadero'])
+        self.consumo_banio = lote(p['consumo_banio'])
+        self.prob_lluvia = lote(p['prob_lluvia'])
+        self.nivel_agua = lote(p['nivel_inicial'])
+
+        # Umbrales en litros, precalculados una sola vez
+        self._nivel_jardin = self.capacidad_max * 0.5
+        self._nivel_lavadero = self.capacidad_max * 0.03
+        self._nivel_bomba = self.capacidad_max * 0.25
+        self._nivel_30 = self.capacidad_max * 0.30
+        self._nivel_90 = self.capacidad_max * 0.90
+
+        # Estado booleano por tinaco
+        self.lloviendo = np.zeros(n, dtype=bool)
+        self.bomba_activa = np.zeros(n, dtype=bool)
+        self.fuente_pluvial = np.zeros(n, dtype=bool)
+        self.fuente_cisterna = np.zeros(n, dtype=bool)
+        self.consumo_jardin_activo = np.zeros(n, dtype=bool)
+        self.consumo_lavadero_activo = np.zeros(n, dtype=bool)
+        self.consumo_banio_activo = np.zeros(n, dtype=bool)
+
+        # Métricas acumuladas por tinaco
+        self.ticks_bajo_minimo = np.zeros(n, dtype=np.int64)
+        self.ticks_bomba = np.zeros(n, dtype=np.int64)
+        self.rechazos_llenado = np.zeros(n, dtype=np.int64)
+        self.demanda_no_atendida = np.zeros(n, dtype=np.float64)
+
+        # Temporales reutilizados en cada tick
+        self._ok = np.empty(n, dtype=bool)
+        self._mascara = np.empty(n, dtype=bool)
+        self._aux = np.empty(n, dtype=bool)
+        self._bajo = np.empty(n, dtype=bool)
+        self._alto = np.empty(n, dtype=bool)
+        self._tmp = np.empty(n, dtype=np.float64)
+
+    def _llenar(self, mascara, flujo, fuente):
+        """Suma `flujo` donde hay llenado y cabe en el tinaco."""
+        ok, tmp = self._ok, self._tmp
+        np.add(self.nivel_agua, flujo, out=tmp)
+        np.less_equal(tmp, self.capacidad_max, out=ok)
+        ok &= mascara
+        np.copyto(self.nivel_agua, tmp, where=ok)
+        np.copyto(fuente, ok, where=mascara)
+        rechazados = self._aux
+        np.logical_not(ok, out=rechazados)
+        rechazados &= mascara
+        self.rechazos_llenado += rechazados
+        return ok
+
+    def _consumir(self, umbral, piso, consumo, activo):
+        """Resta `consumo` donde el nivel supera `umbral` y no baja de `piso`."""
+        ok, tmp = self._ok, self._tmp
+        np.subtract(self.nivel_agua, consumo, out=tmp)
+        np.greater_equal(tmp, piso, out=ok)
+        mascara = self._mascara
+        np.greater(self.nivel_agua, umbral, out=mascara)
+        ok &= mascara
+        np.copyto(self.nivel_agua, tmp, where=ok)
+        np.copyto(activo, ok)
+        np.logical_not(ok, out=mascara)
+        np.add(self.demanda_no_atendida, consumo, out=self.demanda_no_atendida, where=mascara)
+
+    def paso(self):
+        """Avanza un tick de un segundo en todos los tinacos."""
+        t = self.tick
+
+        if t % PERIODO_PLUVIAL == 0:
+            self.rng.random(out=self._tmp)
+            np.less(self._tmp, self.prob_lluvia, out=self._mascara)
+            self.lloviendo |= self._mascara
+            self._llenar(self.lloviendo, self.flujo_pluvial, self.fuente_pluvial)
+
+        if t % PERIODO_CISTERNA == 0:
+            bajo, alto, aux = self._bajo, self._alto, self._aux
+            np.less(self.nivel_agua, self._nivel_30, out=bajo)
+            np.greater_equal(self.nivel_agua, self._nivel_90, out=alto)
+            np.logical_not(bajo, out=aux)
+            alto &= aux
+            # activar_bomba: solo si el nivel supera el 25%
+            np.greater(self.nivel_agua, self._nivel_bomba, out=aux)
+            aux &= bajo
+            self.bomba_activa |= aux
+            ok = self._llenar(bajo, self.flujo_cisterna, self.fuente_cisterna)
+            # Se apaga donde se intentó llenar sin éxito o el nivel llegó al 90%
+            np.logical_not(ok, out=aux)
+            aux &= bajo
+            aux |= alto
+            np.logical_not(aux, out=aux)
+            self.bomba_activa &= aux
+
+        if t % PERIODO_BOMBA == 0:
+            mascara = self._mascara
+            np.logical_or(self.consumo_jardin_activo, self.consumo_lavadero_activo, out=mascara)
+            mascara |= self.consumo_banio_activo
+            # mascara = hay consumo y el nivel no baja del 25% -> la bomba sigue
+            np.greater_equal(self.nivel_agua, self._nivel_bomba, out=self._aux)
+            mascara &= self._aux
+            self.bomba_activa &= mascara
+
+        if t % PERIODO_JARDIN == 0:
+            self._consumir(self._nivel_jardin, self.capacidad_min,
+                           self.consumo_jardin, self.consumo_jardin_activo)
+
+        if t % PERIODO_LAVADERO == 0:
+            self._consumir(self._nivel_lavadero, self._nivel_lavadero,
+                           self.consumo_lavadero, self.consumo_lavadero_activo)
+
+        if t % PERIODO_BANIO == 0:
+            self._consumir(0.0, 0.0, self.consumo_banio, self.consumo_banio_activo)
+
+        self.ticks_bomba += self.bomba_activa
+        np.less(self.nivel_agua, self.capacidad_min, out=self._mascara)
+        self.ticks_bajo_minimo += self._mascara
+        self.tick += 1
+
+    def ejecutar(self, ticks):
+        """Avanza `ticks` segundos."""
+        for _ in range(ticks):
+            self.paso()
+
+    def resumen(self):
+        """Métricas por tinaco como diccionario de arreglos."""
+        ticks = max(self.tick, 1)
+        return {
+            'nivel_final': self.nivel_agua.copy(),
+            'fraccion_bajo_minimo': self.ticks_bajo_minimo / ticks,
+            'ciclo_trabajo_bomba': self.ticks_bomba / ticks,
+            'rechazos_llenado': self.rechazos_llenado.copy(),
+            'demanda_no_atendida': self.demanda_no_atendida.copy(),
+        }
+
+
+def main():
+    n, ticks = 100_000, 10_000
+    rng = np.random.default_rng(0)
+    lote = LoteTinacos(
+        n,
+        semilla=1,
+        capacidad_max=rng.choice([600.0, 1000.0, 1500.0, 2500.0], n),
+        flujo_cisterna=rng.uniform(10, 60, n),
+        prob_lluvia=rng.uniform(0.0, 0.5, n),
+    )
+    inicio = time.perf_counter()
+    lote.ejecutar(ticks)
+    segundos = time.perf_counter() - inicio
+
+    resumen = lote.resumen()
+    print(f"{n} tinacos x {ticks} ticks en {segundos:.2f}s")
+    for clave, valores in resumen.items():
+        print(f"{clave}: media={valores.mean():.3f} min={valores.min():.3f} max={valores.max():.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Panel para muchos tinacos (p. ej. los de una topología con cientos de
+réplicas): una grilla de tarjetas virtualizada sobre un solo tk.Canvas.
+
+- Solo existen las tarjetas de las filas visibles (más una): al desplazar,
+  las mismas tarjetas se reasignan a otros tinacos en vez de crearse.
+- Cada tarjeta son unos pocos elementos del canvas, no widgets, y se
+  crean la primera vez que hacen falta: abrir el panel con 500 tinacos
+  cuesta lo mismo que con 20.
+- Los cambios (estado, desplazamiento, tamaño) solo marcan el panel como
+  pendiente; se redibuja a lo sumo una vez por cuadro (INTERVALO_CUADRO_MS).
+- Solo se revisan los tinacos visibles: el contador de versión se lee sin
+  lock y el estado se copia con leer_estado en una Instantanea por tinaco,
+  creada la primera vez que se muestra.
+"""
+import math
+import tkinter as tk
+
+import customtkinter as ctk
+
+from grafica_nivel import COLOR_FONDO, COLOR_GUIA, COLOR_NIVEL, COLOR_BOMBA, COLOR_CONSUMO
+
+# Cada cuánto se revisan los contadores de versión de los tinacos visibles
+INTERVALO_REVISION_MS = 50
+# Un cuadro a 60 Hz: los cambios que llegan dentro de él se dibujan juntos
+INTERVALO_CUADRO_MS = 16
+
+ANCHO_TARJETA = 230
+ALTO_TARJETA = 84
+SEPARACION = 8
+ANCHO_BARRA = ANCHO_TARJETA - 24
+
+COLOR_TARJETA = "#111827"
+COLOR_TEXTO = "#E5E7EB"
+COLOR_INACTIVO = "#EF4444"
+
+
+class _Tarjeta:
+    """Elementos del canvas de una tarjeta y lo último que se dibujó en ellos."""
+    __slots__ = ('etiqueta', 'indice', 'version', 'x', 'y', 'visible', 'valores',
+                 'fondo', 'nombre', 'bomba', 'barra', 'nivel', 'consumos')
+
+    def __init__(self, canvas, numero):
+        self.etiqueta = f"tarjeta{numero}"
+        self.indice = None   # tinaco que muestra
+        self.version = None  # versión del estado dibujado
+        self.x = self.y = 0
+        self.visible = True
+        self.valores = {}    # elemento -> último valor aplicado
+        etiquetas = ("tarjeta", self.etiqueta)
+        self.fondo = canvas.create_rectangle(0, 0, ANCHO_TARJETA, ALTO_TARJETA, fill=COLOR_TARJETA,
+                                             outline=COLOR_GUIA, tags=etiquetas)
+        self.nombre = canvas.create_text(12, 14, anchor="w", fill=COLOR_TEXTO,
+                                         font=("Roboto", 11, "bold"), tags=etiquetas)
+        self.bomba = canvas.create_oval(ANCHO_TARJETA - 22, 8, ANCHO_TARJETA - 10, 20,
+                                        fill=COLOR_INACTIVO, outline="", tags=etiquetas)
+        canvas.create_rectangle(12, 30, 12 + ANCHO_BARRA, 44, fill=COLOR_FONDO,
+                                outline=COLOR_GUIA, tags=etiquetas)
+        self.barra = canvas.create_rectangle(12, 30, 12, 44, fill=COLOR_NIVEL, outline="", tags=etiquetas)
+        self.nivel = canvas.create_text(12, 56, anchor="w", fill=COLOR_TEXTO,
+                                        font=("Roboto", 10), tags=etiquetas)
+        self.consumos = canvas.create_text(12, 72, anchor="w", fill=COLOR_CONSUMO,
+                                           font=("Roboto", 9), tags=etiquetas)
+
+
+class GrillaTinacos(tk.Canvas):
+    """Grilla virtualizada de tarjetas, una por tinaco."""
+
+    def __init__(self, master, tinacos, barra=None, **opciones):
+        """
+        tinacos: lista de TinacoContext
+        barra: función que recibe (primero, ultimo) como fracciones de lo
+        visible, p. ej. el set de una barra de desplazamiento
+        """
+        super().__init__(master, bg=COLOR_FONDO, highlightthickness=0, **opciones)
+        self.tinacos = list(tinacos)
+        self.barra = barra
+        self._tarjetas = []       # conjunto reciclable, solo las filas visibles
+        self._instantaneas = {}   # índice del tinaco -> Instantanea (perezosa)
+        self._columnas = 1
+        self._filas_visibles = 0
+        self._ancho = self._alto = 0
+        self._desplazamiento = 0  # píxeles desde el inicio de la grilla completa
+        self._pendiente = None    # after() del próximo cuadro
+        self._revision = None
+        self.cuadros = 0          # cuadros dibujados (para mediciones)
+
+        self.bind("<Configure>", self._al_cambiar_tamano)
+        self.bind("<MouseWheel>", lambda evento: self.yview("scroll", -1 if evento.delta > 0 else 1, "units"))
+        self.bind("<Button-4>", lambda evento: self.yview("scroll", -1, "units"))
+        self.bind("<Button-5>", lambda evento: self.yview("scroll", 1, "units"))
+        self._revision = self.after(INTERVALO_REVISION_MS, self._revisar)
+
+    # Geometría de la grilla completa (virtual)
+    @property
+    def _alto_fila(self):
+        return ALTO_TARJETA + SEPARACION
+
+    def _alto_total(self):
+        filas = math.ceil(len(self.tinacos) / self._columnas)
+        return filas * self._alto_fila + SEPARACION
+
+    def _maximo_desplazamiento(self):
+        return max(self._alto_total() - self._alto, 0)
+
+    def _al_cambiar_tamano(self, evento):
+        if (evento.width, evento.height) == (self._ancho, self._alto):
+            return
+        self._ancho, self._alto = evento.width, evento.height
+        self._columnas = max(1, (self._ancho - SEPARACION) // (ANCHO_TARJETA + SEPARACION))
+        self._filas_visibles = self._alto // self._alto_fila + 2
+        self._desplazamiento = min(self._desplazamiento, self._maximo_desplazamiento())
+        self.programar()
+
+    def yview(self, *argumentos):
+        """Protocolo de desplazamiento de tk (moveto / scroll) sobre la grilla virtual."""
+        if not argumentos:
+            total = max(self._alto_total(), 1)
+            return self._desplazamiento / total, min((self._desplazamiento + self._alto) / total, 1.0)
+        if argumentos[0] == "moveto":
+            destino = float(argumentos[1]) * self._alto_total()
+        else:
+            cantidad, unidad = int(argumentos[1]), argumentos[2]
+            paso = self._alto_fila if unidad == "units" else max(self._alto - self._alto_fila, self._alto_fila)
+            destino = self._desplazamiento + cantidad * paso
+        destino = int(min(max(destino, 0), self._maximo_desplazamiento()))
+        if destino != self._desplazamiento:
+            self._desplazamiento = destino
+            self.programar()
+
+    def programar(self):
+        """Pide un cuadro; las peticiones dentro del mismo cuadro se juntan en una."""
+        if self._pendiente is None:
+            self._pendiente = self.after(INTERVALO_CUADRO_MS, self._redibujar)
+
+    def _revisar(self):
+        # Lectura sin lock de la versión de los tinacos visibles
+        for tarjeta in self._tarjetas:
+            if tarjeta.indice is not None and self.tinacos[tarjeta.indice].version != tarjeta.version:
+                self.programar()
+                break
+        self._revision = self.after(INTERVALO_REVISION_MS, self._revisar)
+
+    def _redibujar(self):
+        self._pendiente = None
+        self.cuadros += 1
+
+        # Solo hacen falta las tarjetas de las filas visibles
+        necesarias = min(self._filas_visibles * self._columnas, len(self.tinacos))
+        while len(self._tarjetas) < necesarias:
+            self._tarjetas.append(_Tarjeta(self, len(self._tarjetas)))
+        while len(self._tarjetas) > necesarias:
+            self.delete(self._tarjetas.pop().etiqueta)
+
+        primera = self._desplazamiento // self._alto_fila
+        for posicion, tarjeta in enumerate(self._tarjetas):
+            fila, columna = divmod(posicion, self._columnas)
+            indice = (primera + fila) * self._columnas + columna
+            if indice >= len(self.tinacos):
+                self._ocultar(tarjeta)
+                continue
+            x = SEPARACION + columna * (ANCHO_TARJETA + SEPARACION)
+            y = SEPARACION + (primera + fila) * self._alto_fila - self._desplazamiento
+            self._mostrar(tarjeta, indice, x, y)
+
+        if self.barra is not None:
+            self.barra(*self.yview())
+
+    def _ocultar(self, tarjeta):
+        if tarjeta.visible:
+            self.itemconfigure(tarjeta.etiqueta, state="hidden")
+            tarjeta.visible = False
+        tarjeta.indice = None
+
+    def _aplicar(self, tarjeta, elemento, valor, **opciones):
+        """Reconfigura un elemento de la tarjeta solo si `valor` cambió."""
+        if tarjeta.valores.get(elemento) != valor:
+            tarjeta.valores[elemento] = valor
+            self.itemconfigure(elemento, **opciones)
+
+    def _mostrar(self, tarjeta, indice, x, y):
+        if not tarjeta.visible:
+            self.itemconfigure(tarjeta.etiqueta, state="normal")
+            tarjeta.visible = True
+        if (x, y) != (tarjeta.x, tarjeta.y):
+            self.move(tarjeta.etiqueta, x - tarjeta.x, y - tarjeta.y)
+            tarjeta.x, tarjeta.y = x, y
+
+        tinaco = self.tinacos[indice]
+        if tarjeta.indice != indice:
+            # Tarjeta reciclada: pasa a mostrar otro tinaco
+            tarjeta.indice = indice
+            tarjeta.version = None
+            # La máscara de consumos se lee con los nombres de cada tinaco
+            tarjeta.valores.pop(tarjeta.consumos, None)
+            nombre = tinaco.nombre or f"Tinaco {indice + 1}"
+            self._aplicar(tarjeta, tarjeta.nombre, nombre, text=nombre)
+        if tinaco.version == tarjeta.version:
+            return
+
+        instantanea = self._instantaneas.get(indice)
+        if instantanea is None:
+            instantanea = self._instantaneas[indice] = tinaco.instantanea()
+        estado = tinaco.leer_estado(instantanea)
+        tarjeta.version = estado.version
+
+        fraccion = min(max(estado.nivel_agua / tinaco.capacidad_max, 0.0), 1.0)
+        ancho = round(fraccion * ANCHO_BARRA)
+        bajo = estado.nivel_agua < tinaco.capacidad_min
+        if tarjeta.valores.get(tarjeta.barra) != (ancho, bajo):
+            tarjeta.valores[tarjeta.barra] = (ancho, bajo)
+            self.coords(tarjeta.barra, x + 12, y + 30, x + 12 + ancho, y + 44)
+            self.itemconfigure(tarjeta.barra, fill=COLOR_INACTIVO if bajo else COLOR_NIVEL)
+        texto = f"{estado.nivel_agua:.1f}L ({estado.porcentaje:.1f}%)"
+        self._aplicar(tarjeta, tarjeta.nivel, texto, text=texto)
+        bomba = bool(estado.bomba_activa)
+        self._aplicar(tarjeta, tarjeta.bomba, bomba, fill=COLOR_BOMBA if bomba else COLOR_INACTIVO)
+        if tarjeta.valores.get(tarjeta.consumos) != estado.consumos:
+            activos = [consumo for consumo in tinaco.CONSUMOS if estado.consumo_activo(consumo)]
+            self._aplicar(tarjeta, tarjeta.consumos, estado.consumos,
+                          text=", ".join(activos) if activos else "Sin consumo")
+
+    def detener(self):
+        """Cancela las revisiones y el cuadro pendiente."""
+        for pendiente in (self._revision, self._pendiente):
+            if pendiente is not None:
+                self.after_cancel(pendiente)
+        self._revision = self._pendiente = None
+
+
+class PanelTinacos(ctk.CTk):
+    """Ventana con la grilla de tinacos y su barra de desplazamiento."""
+
+    def __init__(self, tinacos):
+        super().__init__()
+        tinacos = list(tinacos)
+
+        self.title("Sistema Rotoplas Monitor (tinacos)")
+        self.geometry("1024x768")
+        self.minsize(500, 400)
+        ctk.set_appearance_mode("dark")
+        ctk.set_default_color_theme("blue")
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(1, weight=1)
+
+        self.title_label = ctk.CTkLabel(
+            self,
+            text=f"MONITOREO ROTOPLAS ({len(tinacos)} TINACOS)",
+            font=("Roboto", 20, "bold"),
+            text_color="#3B82F6"
+        )
+        self.title_label.grid(row=0, column=0, columnspan=2, pady=10)
+
+        self.scrollbar = ctk.CTkScrollbar(self)
+        self.grilla = GrillaTinacos(self, tinacos, barra=self.scrollbar.set)
+        self.scrollbar.configure(command=self.grilla.yview)
+        self.grilla.grid(row=1, column=0, sticky="nsew", padx=(20, 0), pady=(0, 20))
+        self.scrollbar.grid(row=1, column=1, sticky="ns", padx=(0, 20), pady=(0, 20))
+
+    def destroy(self):
+        self.grilla.detener()
+        super().destroy()
@@ -0,0 +1,153 @@
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from multiprocessing import Process
+
+from actores import actores_tinaco
+
+ESTRATEGIAS = ('asyncio', 'pool', 'procesos')
+
+
+class _GeneradorPublicado(random.Random):
+    """
+    random.Random que parte del estado publicado en un GeneradorCompartido
+    (si lo hay) y publica el suyo tras cada número, para los puntos de
+    control. Solo la lluvia saca números, así que un trabajador sin fuente
+    pluvial nunca publica.
+    """
+
+    def __init__(self, generador, semilla=None):
+        super().__init__(semilla)
+        self._generador = generador
+        estado = generador.estado()
+        if estado is not None:
+            self.setstate(estado)
+
+    def random(self):
+        valor = super().random()
+        self._generador.publicar(self.getstate())
+        return valor
+
+
+def _generador(semilla, generador):
+    return random.Random(semilla) if generador is None else _GeneradorPublicado(generador, semilla)
+
+
+def _bucle_tiempo_real(tinacos, terminar_evento, indices, semilla, generador=None):
+    """
+    Ejecuta en este proceso los actores `indices` (posición global de cada
+    actor) de los tinacos dados. Cada actor es una tarea temporizada en un
+    heap; entre disparos se espera sobre terminar_evento, así que el proceso
+    termina en cuanto se pide sin esperar al siguiente disparo.
+    """
+    rng = _generador(semilla, generador)
+    actores = [paso for tinaco, config in tinacos for _, paso in actores_tinaco(tinaco, rng, config)]
+
+    secuencia = itertools.count()
+    ahora = time.monotonic()
+    cola = [(ahora, next(secuencia), actores[i]) for i in indices]
+    heapq.heapify(cola)
+
+    while cola and not terminar_evento.is_set():
+        instante, _, paso = cola[0]
+        espera = instante - time.monotonic()
+        if espera > 0 and terminar_evento.wait(espera):
+            break
+        heapq.heapreplace(cola, (instante + paso(), next(secuencia), paso))
+
+
+class Planificador:
+    """
+    Ejecuta los ciclos de los actores (pluvial, cisterna, bomba, jardín,
+    lavadero, baño) de uno o varios tinacos como tareas temporizadas, en vez
+    de un proceso del sistema operativo por actor.
+
+    Estrategias:
+    - "asyncio": todas las tareas en un event loop, en un hilo de este proceso
+    - "pool": las tareas repartidas entre `trabajadores` procesos fijos
+    - "procesos": un proceso por actor (como main.main), para comparar
+
+    Con `generador` (punto_control.GeneradorCompartido) la lluvia parte del
+    estado publicado ahí y publica el suyo tras cada sorteo, como
+    main.proceso_pluvial. Es un solo generador: sirve para un tinaco.
+    """
+
+    def __init__(self, estrategia="asyncio", trabajadores=2, semilla=None, generador=None):
+        if estrategia not in ESTRATEGIAS:
+            raise ValueError(f"Estrategia desconocida: {estrategia}")
+        self.estrategia = estrategia
+        self.trabajadores = trabajadores
+        self.semilla = semilla
+        self.generador = generador
+        self.tinacos = []
+        self._procesos = []
+        self._hilo = None
+
+    def agregar_tinaco(self, tinaco, config=None):
+        """Agrega un tinaco y sus actores (config con el formato de ACTORES_BASE)."""
+        self.tinacos.append((tinaco, config))
+
+    def _total_actores(self):
+        return sum(len(actores_tinaco(tinaco, random, config)) for tinaco, config in self.tinacos)
+
+    def iniciar(self, terminar_evento):
+        """Arranca los actores sin bloquear; se detienen al activar terminar_evento."""
+        if self.estrategia == "asyncio":
+            self._hilo = threading.Thread(
+                target=asyncio.run, args=(self._principal(terminar_evento),),
+                name="Planificador", daemon=True,
+            )
+            self._hilo.start()
+            return
+
+        total = self._total_actores()
+        if self.estrategia == "pool":
+            n = max(1, min(self.trabajadores, total))
+            repartos = [range(i, total, n) for i in range(n)]
+        else:
+            repartos = [[i] for i in range(total)]
+
+        for i, indices in enumerate(repartos):
+            semilla = None if self.semilla is None else self.semilla + i
+            proceso = Process(
+                name=f"Planificador-{i}", target=_bucle_tiempo_real,
+                args=(self.tinacos, terminar_evento, list(indices), semilla, self.generador),
+            )
+            proceso.start()
+            self._procesos.append(proceso)
+
+    async def _principal(self, terminar_evento):
+        rng = _generador(self.semilla, self.generador)
+        tareas = [
+            asyncio.create_task(self._tarea(paso))
+            for tinaco, config in self.tinacos
+            for _, paso in actores_tinaco(tinaco, rng, config)
+        ]
+        # Un hilo del executor espera la señal de terminación sin sondear
+        await asyncio.get_running_loop().run_in_executor(None, terminar_evento.wait)
+        for tarea in tareas:
+            tarea.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+    @staticmethod
+    async def _tarea(paso):
+        while True:
+            await asyncio.sleep(paso())
+
+    @property
+    def pids(self):
+        """PIDs de los procesos trabajadores (vacío con asyncio)."""
+        return [proceso.pid for proceso in self._procesos]
+
+    def detener(self, timeout=2):
+        """Espera a que terminen los actores (terminar_evento ya debe estar activo)."""
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        for proceso in self._procesos:
+            proceso.join(timeout=timeout)
+            if proceso.is_alive():
+                print(f"Proceso {proceso.name} no respondió, terminando forzosamente.")
+                proceso.terminate()
@@ -0,0 +1,155 @@
+"""
+Pronóstico en línea de la demanda de agua (litros por segundo).
+
+Se alimenta con un total acumulado de litros (p. ej. lo consumido menos lo
+que entregan las fuentes que no controla quien pronostica, ver
+actores.paso_cisterna) cada vez que se revisa la cisterna. El total puede
+bajar: una tasa negativa es un excedente. Cada muestra es
+una actualización O(1): la tasa del intervalo se suaviza exponencialmente
+en la franja horaria donde empezó y en una tasa global. La tasa de una
+franja se mezcla con la global según el peso de sus muestras, así que una
+franja con pocas (o ninguna) se parece a la global.
+
+El suavizado depende del tiempo y no del número de muestras
+(peso = 1 - exp(-dt / constante)), así que da lo mismo revisar cada 3 s en
+tiempo real o saltar con el reloj virtual. Cada tasa lleva además el peso
+acumulado de sus muestras y se corrige con él: las primeras muestras pesan
+según lo que duraron y no como si fueran toda la historia. Mientras no
+cubre `constante` segundos de muestras el pronóstico no está listo (ver
+`listo`).
+
+El perfil vive en memoria compartida (como el estado de TinacoContext):
+creado antes de los procesos, el proceso principal ve lo que aprende el de
+la cisterna y lo puede guardar en un punto de control.
+"""
+import ctypes
+import math
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+
+class _EstadoPronostico(ctypes.Structure):
+    """Valores escalares del pronóstico en memoria compartida."""
+    _fields_ = [
+        ('tasa_global', ctypes.c_double),
+        ('peso_global', ctypes.c_double),
+        ('muestras', ctypes.c_uint64),
+        ('iniciado', ctypes.c_uint8),  # hay al menos una muestra
+        ('inicio', ctypes.c_double),   # instante de la primera muestra
+        ('tiempo', ctypes.c_double),   # instante de la última muestra
+        ('total', ctypes.c_double),    # total de la última muestra
+    ]
+
+
+class PronosticoDemanda:
+    """Perfil de la demanda por franja horaria con suavizado exponencial."""
+
+    def __init__(self, constante=600, franjas=24, duracion_franja=3600):
+        """
+        constante: segundos de memoria del suavizado (más grande, más estable)
+        franjas: número de franjas del perfil (24 = una por hora del día)
+        duracion_franja: segundos de cada franja
+        Las franjas se cuentan desde el instante 0 del reloj del tinaco: con el
+        reloj virtual, desde el inicio de la simulación; con time.time, son
+        horas UTC.
+        """
+        self.constante = constante
+        self.duracion_franja = duracion_franja
+        self.tasas = RawArray(ctypes.c_double, franjas)
+        self.pesos = RawArray(ctypes.c_double, franjas)  # 0 = franja sin muestras
+        self._estado = RawValue(_EstadoPronostico)
+
+    @property
+    def tasa_global(self):
+        return self._estado.tasa_global
+
+    @property
+    def muestras(self):
+        return self._estado.muestras
+
+    def _franja(self, tiempo):
+        return int(tiempo // self.duracion_franja) % len(self.tasas)
+
+    def observar(self, tiempo, total):
+        """Agrega una muestra: `total` son los litros acumulados hasta `tiempo`."""
+        estado = self._estado
+        if estado.iniciado:
+            dt = tiempo - estado.tiempo
+            if dt <= 0:
+                return
+            tasa = (total - estado.total) / dt
+            peso = 1.0 - math.exp(-dt / self.constante)
+            i = self._franja(estado.tiempo)
+            acumulado = self.pesos[i] + peso * (1.0 - self.pesos[i])
+            self.tasas[i] += peso / acumulado * (tasa - self.tasas[i])
+            self.pesos[i] = acumulado
+            acumulado = estado.peso_global + peso * (1.0 - estado.peso_global)
+            estado.tasa_global += peso / acumulado * (tasa - estado.tasa_global)
+            estado.peso_global = acumulado
+            estado.muestras += 1
+        else:
+            estado.inicio = tiempo
+            estado.iniciado = 1
+        estado.tiempo = tiempo
+        estado.total = total
+
+    @property
+    def listo(self):
+        """True cuando las muestras cubren al menos `constante` segundos."""
+        estado = self._estado
+        return bool(estado.iniciado) and estado.tiempo - estado.inicio >= self.constante
+
+    def tasa(self, tiempo):
+        """Demanda prevista en L/s para el instante `tiempo` (negativa si sobra agua)."""
+        i = self._franja(tiempo)
+        tasa_global = self._estado.tasa_global
+        return tasa_global + self.pesos[i] * (self.tasas[i] - tasa_global)
+
+    def demanda(self, tiempo, horizonte):
+        """
+        Litros previstos entre `tiempo` y `tiempo + horizonte`, franja por
+        franja (a lo sumo una vuelta completa del perfil más los días
+        completos restantes).
+        """
+        if horizonte <= 0:
+            return 0.0
+        ciclo = self.duracion_franja * len(self.tasas)
+        vueltas, horizonte = divmod(horizonte, ciclo)
+        litros = 0.0
+        if vueltas:
+            por_vuelta = sum(self.tasa(i * self.duracion_franja) for i in range(len(self.tasas)))
+            litros += vueltas * por_vuelta * self.duracion_franja
+        fin = tiempo + horizonte
+        while tiempo < fin:
+            limite = min(fin, (math.floor(tiempo / self.duracion_franja) + 1) * self.duracion_franja)
+            litros += self.tasa(tiempo) * (limite - tiempo)
+            tiempo = limite
+        return litros
+
+    def exportar(self):
+        """
+        Copia del perfil para un punto de control: (tasas, pesos, tasa_global,
+        peso_global, muestras, inicio, tiempo, total), con inicio, tiempo y
+        total en None si aún no hay muestras. Quien lo llama evita que entre
+        una muestra mientras tanto (p. ej. con el lock del tinaco).
+        """
+        estado = self._estado
+        iniciado = bool(estado.iniciado)
+        return (tuple(self.tasas), tuple(self.pesos), estado.tasa_global, estado.peso_global,
+                estado.muestras, estado.inicio if iniciado else None,
+                estado.tiempo if iniciado else None, estado.total if iniciado else None)
+
+    def restaurar(self, exportado):
+        """Restaura un perfil devuelto por exportar (mismo número de franjas)."""
+        tasas, pesos, tasa_global, peso_global, muestras, inicio, tiempo, total = exportado
+        if len(tasas) != len(self.tasas) or len(pesos) != len(self.pesos):
+            raise ValueError("El pronóstico guardado tiene otras franjas")
+        self.tasas[:] = tasas
+        self.pesos[:] = pesos
+        estado = self._estado
+        estado.tasa_global = tasa_global
+        estado.peso_global = peso_global
+        estado.muestras = muestras
+        estado.iniciado = inicio is not None
+        estado.inicio = inicio or 0.0
+        estado.tiempo = tiempo or 0.0
+        estado.total = total or 0.0
@@ -0,0 +1,311 @@
+import ctypes
+import os
+import struct
+import threading
+import time
+from multiprocessing import Lock
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+# Encabezado: firma, formato, tinacos, actores, reloj virtual, eventos, creado (time.time)
+_ENCABEZADO = struct.Struct('<8sHHIdQd')
+_FIRMA = b'TINPCTL1'
+_FORMATO = 3
+# Formatos que se pueden leer: el 1 no tiene los contadores de demanda y el 2
+# tampoco los totales ni los pronósticos
+_FORMATOS_LEGIBLES = (1, 2, 3)
+# Tinaco: nivel_agua, bomba_activa, fuentes (bits), consumos (bits), version, lloviendo
+_TINACO = struct.Struct('<dBIIQB')
+# Después del tinaco van listas con su largo al inicio:
+# - demanda: por consumo, solicitadas, atendidas, rechazadas
+# - entregado: litros por fuente
+# - pronósticos: nombre de la fuente, tasa y peso por franja y _PRONOSTICO
+_LARGO_LISTA = struct.Struct('<H')
+_DEMANDA = struct.Struct('<QQQ')
+_LITROS = struct.Struct('<d')
+_FRANJA = struct.Struct('<dd')
+# Uso: consumido, arranques, paradas, segundos con la bomba activa
+_USO = struct.Struct('<dQQd')
+# Pronóstico: tasa global, peso global, muestras, iniciado, inicio, tiempo y total de la última muestra
+_PRONOSTICO = struct.Struct('<ddQBddd')
+_LARGO_NOMBRE = struct.Struct('<H')
+# Generador: presente, estado del Mersenne Twister (624 palabras + índice), hay gauss, gauss
+_PALABRAS_MT = 625
+_GENERADOR = struct.Struct(f'<B{_PALABRAS_MT}IBd')
+# Actor pendiente del motor de simulación: instante, orden de alta (+ nombre)
+_ACTOR = struct.Struct('<dQ')
+
+
+def _nombre_a_bytes(nombre):
+    datos = (nombre or "").encode("utf-8")
+    return _LARGO_NOMBRE.pack(len(datos)) + datos
+
+
+def _leer_nombre(datos, posicion):
+    (largo,) = _LARGO_NOMBRE.unpack_from(datos, posicion)
+    posicion += _LARGO_NOMBRE.size
+    return datos[posicion:posicion + largo].decode("utf-8"), posicion + largo
+
+
+def _lista(estructura, elementos):
+    return [_LARGO_LISTA.pack(len(elementos))] + [estructura.pack(*elemento) for elemento in elementos]
+
+
+def _leer_lista(datos, posicion, estructura):
+    (largo,) = _LARGO_LISTA.unpack_from(datos, posicion)
+    posicion += _LARGO_LISTA.size
+    elementos = []
+    for _ in range(largo):
+        elementos.append(estructura.unpack_from(datos, posicion))
+        posicion += estructura.size
+    return tuple(elementos), posicion
+
+
+def _pronostico_a_bytes(fuente, exportado):
+    tasas, pesos, tasa_global, peso_global, muestras, inicio, tiempo, total = exportado
+    return ([_nombre_a_bytes(fuente)] + _lista(_FRANJA, list(zip(tasas, pesos)))
+            + [_PRONOSTICO.pack(tasa_global, peso_global, muestras, inicio is not None,
+                                inicio or 0.0, tiempo or 0.0, total or 0.0)])
+
+
+def _leer_pronostico(datos, posicion):
+    fuente, posicion = _leer_nombre(datos, posicion)
+    franjas, posicion = _leer_lista(datos, posicion, _FRANJA)
+    (tasa_global, peso_global, muestras, iniciado,
+     inicio, tiempo, total) = _PRONOSTICO.unpack_from(datos, posicion)
+    if not iniciado:
+        inicio = tiempo = total = None
+    exportado = (tuple(tasa for tasa, _ in franjas), tuple(peso for _, peso in franjas),
+                 tasa_global, peso_global, muestras, inicio, tiempo, total)
+    return (fuente, exportado), posicion + _PRONOSTICO.size
+
+
+def serializar(tinacos, generador=None, reloj=0.0, eventos=0, cola=()):
+    """
+    Punto de control en binario.
+    tinacos: lista de (nombre, estado) con estado de TinacoContext.exportar_estado
+    (completo: con demanda, uso, entregado y pronósticos)
+    generador: estado de random.Random.getstate() (p. ej. el de la lluvia)
+    reloj, eventos, cola: estado del motor de simulación; cola es una lista
+    de (instante, orden de alta, nombre) de los actores pendientes
+    """
+    partes = [_ENCABEZADO.pack(_FIRMA, _FORMATO, len(tinacos), len(cola), reloj, eventos, time.time())]
+    for nombre, estado in tinacos:
+        partes.append(_nombre_a_bytes(nombre))
+        demanda, uso, entregado, pronosticos = estado[6:]
+        partes.append(_TINACO.pack(*estado[:6]))
+        partes.extend(_lista(_DEMANDA, demanda))
+        partes.append(_USO.pack(*uso))
+        partes.extend(_lista(_LITROS, [(litros,) for litros in entregado]))
+        partes.append(_LARGO_LISTA.pack(len(pronosticos)))
+        for fuente, exportado in pronosticos:
+            partes.extend(_pronostico_a_bytes(fuente, exportado))
+    if generador is None:
+        partes.append(_GENERADOR.pack(0, *([0] * _PALABRAS_MT), 0, 0.0))
+    else:
+        _, palabras, gauss = generador
+        partes.append(_GENERADOR.pack(1, *palabras, gauss is not None, gauss or 0.0))
+    for instante, orden, nombre in cola:
+        partes.append(_ACTOR.pack(instante, orden))
+        partes.append(_nombre_a_bytes(nombre))
+    return b"".join(partes)
+
+
+def deserializar(datos):
+    """Inverso de serializar; devuelve un diccionario con las mismas partes."""
+    firma, formato, n_tinacos, n_actores, reloj, eventos, creado = _ENCABEZADO.unpack_from(datos, 0)
+    if firma != _FIRMA or formato not in _FORMATOS_LEGIBLES:
+        raise ValueError("No es un punto de control de tinaco válido")
+    posicion = _ENCABEZADO.size
+
+    tinacos = []
+    for _ in range(n_tinacos):
+        nombre, posicion = _leer_nombre(datos, posicion)
+        nivel, bomba, fuentes, consumos, version, lloviendo = _TINACO.unpack_from(datos, posicion)
+        posicion += _TINACO.size
+        estado = (nivel, bool(bomba), fuentes, consumos, version, bool(lloviendo))
+        if formato >= 2:
+            demanda, posicion = _leer_lista(datos, posicion, _DEMANDA)
+            # En el formato 2 una demanda vacía viene de un estado sin contadores
+            if demanda or formato >= 3:
+                estado += (demanda,)
+        if formato >= 3:
+            uso = _USO.unpack_from(datos, posicion)
+            entregado, posicion = _leer_lista(datos, posicion + _USO.size, _LITROS)
+            (n_pronosticos,) = _LARGO_LISTA.unpack_from(datos, posicion)
+            posicion += _LARGO_LISTA.size
+            pronosticos = []
+            for _ in range(n_pronosticos):
+                pronostico, posicion = _leer_pronostico(datos, posicion)
+                pronosticos.append(pronostico)
+            estado += (uso, tuple(litros for (litros,) in entregado), tuple(pronosticos))
+        tinacos.append((nombre, estado))
+
+    presente, *resto = _GENERADOR.unpack_from(datos, posicion)
+    posicion += _GENERADOR.size
+    generador = None
+    if presente:
+        palabras, hay_gauss, gauss = tuple(resto[:_PALABRAS_MT]), resto[_PALABRAS_MT], resto[-1]
+        generador = (3, palabras, gauss if hay_gauss else None)
+
+    cola = []
+    for _ in range(n_actores):
+        instante, orden = _ACTOR.unpack_from(datos, posicion)
+        nombre, posicion = _leer_nombre(datos, posicion + _ACTOR.size)
+        cola.append((instante, orden, nombre))
+
+    return {
+        'tinacos': tinacos,
+        'generador': generador,
+        'reloj': reloj,
+        'eventos': eventos,
+        'cola': cola,
+        'creado': creado,
+    }
+
+
+def escribir(ruta, datos):
+    """Escribe el archivo de forma atómica: nunca queda un punto de control a medias."""
+    temporal = f"{ruta}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(datos)
+        archivo.flush()
+        os.fsync(archivo.fileno())
+    os.replace(temporal, ruta)
+
+
+def leer(ruta):
+    """Lee y deserializa un punto de control."""
+    with open(ruta, 'rb') as archivo:
+        return deserializar(archivo.read())
+
+
+def capturar_motor(motor):
+    """Punto de control (bytes) de un MotorSimulacion entre dos llamadas a ejecutar."""
+    return serializar(
+        [(tinaco.nombre, tinaco.exportar_estado()) for tinaco in motor.tinacos],
+        motor.rng.getstate(), motor.reloj, motor.eventos,
+        motor.pendientes(),
+    )
+
+
+def restaurar_tinacos(tinacos, punto):
+    """Restaura el estado de `tinacos` (mismos nombres y orden) desde un punto de control."""
+    guardados = punto['tinacos']
+    if [tinaco.nombre or "" for tinaco in tinacos] != [nombre for nombre, _ in guardados]:
+        raise ValueError("El punto de control es de otros tinacos")
+    for tinaco, (_, estado) in zip(tinacos, guardados):
+        tinaco.restaurar_estado(estado)
+
+
+def restaurar_motor(motor, punto):
+    """
+    Deja un MotorSimulacion recién armado (mismos tinacos y actores) en el
+    estado de un punto de control, para que continúe exactamente igual.
+    """
+    # El reloj va primero: los tinacos toman de él el instante de restauración
+    motor.reloj = punto['reloj']
+    restaurar_tinacos(motor.tinacos, punto)
+    if punto['generador'] is not None:
+        motor.rng.setstate(punto['generador'])
+    motor.eventos = punto['eventos']
+    motor.reprogramar(punto['cola'])
+
+
+def ejecutar_con_puntos_control(motor, duracion, ruta, intervalo=3600):
+    """
+    Ejecuta el motor `duracion` segundos simulados guardando un punto de
+    control en `ruta` cada `intervalo` segundos simulados y al final.
+    La escritura corre en otro hilo mientras la simulación continúa.
+    """
+    escritor = PuntoControl(ruta)
+    fin = motor.reloj + duracion
+    try:
+        while motor.reloj < fin:
+            motor.ejecutar(min(intervalo, fin - motor.reloj))
+            escritor.guardar(capturar_motor(motor))
+    finally:
+        escritor.cerrar()
+
+
+class GeneradorCompartido:
+    """
+    Copia en memoria compartida del estado de un random.Random que vive en
+    otro proceso (el de la lluvia), para incluirlo en los puntos de control.
+    """
+
+    def __init__(self):
+        self._palabras = RawArray(ctypes.c_uint32, _PALABRAS_MT)
+        self._gauss = RawValue(ctypes.c_double, 0.0)
+        self._hay_gauss = RawValue(ctypes.c_uint8, 0)
+        self._presente = RawValue(ctypes.c_uint8, 0)
+        self._lock = Lock()
+
+    def publicar(self, estado):
+        """
+        Guarda `estado` (de random.Random.getstate). Lo llama el proceso
+        dueño tras usar su generador, o main al restaurar un punto de control.
+        """
+        _, palabras, gauss = estado
+        with self._lock:
+            self._palabras[:] = palabras
+            self._hay_gauss.value = gauss is not None
+            self._gauss.value = gauss or 0.0
+            self._presente.value = 1
+
+    def estado(self):
+        """Último estado publicado (formato de getstate) o None."""
+        with self._lock:
+            if not self._presente.value:
+                return None
+            return (3, tuple(self._palabras), self._gauss.value if self._hay_gauss.value else None)
+
+
+class PuntoControl:
+    """
+    Escritor de puntos de control en un hilo aparte: guardar() solo deja los
+    bytes pendientes y el hilo escribe el más reciente de forma atómica,
+    fuera del camino de las operaciones del tinaco.
+    """
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self.escritos = 0
+        self._pendiente = None
+        self._cerrado = False
+        self._condicion = threading.Condition()
+        self._hilo = threading.Thread(target=self._bucle, name="PuntoControl", daemon=True)
+        self._hilo.start()
+
+    def guardar(self, datos):
+        """Programa la escritura de `datos`; reemplaza a uno pendiente sin escribir."""
+        with self._condicion:
+            self._pendiente = datos
+            self._condicion.notify()
+
+    def periodico(self, capturar, intervalo, terminar_evento):
+        """Guarda capturar() cada `intervalo` segundos hasta terminar_evento."""
+        def bucle():
+            while not terminar_evento.wait(intervalo):
+                self.guardar(capturar())
+
+        threading.Thread(target=bucle, name="PuntoControlPeriodico", daemon=True).start()
+
+    def _bucle(self):
+        while True:
+            with self._condicion:
+                while self._pendiente is None and not self._cerrado:
+                    self._condicion.wait()
+                datos, self._pendiente = self._pendiente, None
+                if datos is None:
+                    return
+            escribir(self.ruta, datos)
+            self.escritos += 1
+
+    def cerrar(self, datos=None):
+        """Escribe `datos` (si se dan) y lo pendiente, y detiene el hilo."""
+        with self._condicion:
+            if datos is not None:
+                self._pendiente = datos
+            self._cerrado = True
+            self._condicion.notify()
+        self._hilo.join()
@@ -0,0 +1,151 @@
+import collections
+import os
+import sys
+import threading
+from multiprocessing import util
+
+# Códigos de evento
+LLENADO = 0
+LLENADO_RECHAZADO = 1
+CONSUMO = 2
+CONSUMO_RECHAZADO = 3
+BOMBA_ACTIVADA = 4
+BOMBA_RECHAZADA = 5
+BOMBA_DESACTIVADA = 6
+MENSAJE = 7
+
+# Niveles de verbosidad de la consola
+SILENCIO = 0    # no se registra ni se imprime nada
+NORMAL = 1      # cambios de estado y mensajes de los actores
+DETALLADO = 2   # además las operaciones rechazadas
+
+VERBOSIDADES = {'silencio': SILENCIO, 'normal': NORMAL, 'detallado': DETALLADO}
+
+_NIVEL_MINIMO = {
+    LLENADO: NORMAL,
+    LLENADO_RECHAZADO: DETALLADO,
+    CONSUMO: NORMAL,
+    CONSUMO_RECHAZADO: DETALLADO,
+    BOMBA_ACTIVADA: NORMAL,
+    BOMBA_RECHAZADA: DETALLADO,
+    BOMBA_DESACTIVADA: NORMAL,
+    MENSAJE: NORMAL,
+}
+
+# Nombres para mostrar en consola
+_NOMBRES = {'Jardin': 'jardín', 'Lavadero': 'lavadero', 'Banio': 'baño'}
+_TITULOS = {'Jardin': 'Jardín', 'Lavadero': 'Lavadero', 'Banio': 'Baño'}
+
+
+def formatear(registro):
+    """Convierte un registro (tiempo, actor, codigo, delta, nivel, capacidad) en texto."""
+    _, actor, codigo, delta, nivel, capacidad = registro
+    if codigo == MENSAJE:
+        return actor
+
+    porcentaje = (nivel / capacidad) * 100
+    porcentaje_delta = (delta / capacidad) * 100
+    if codigo == LLENADO:
+        return f"Se añadió {porcentaje_delta:.1f}% desde {actor}, nivel actual = {porcentaje:.1f}%"
+    if codigo == LLENADO_RECHAZADO:
+        return f"No se puede llenar más desde {actor} (capacidad máxima: {capacidad}L)"
+    if codigo == CONSUMO:
+        return f"El {_NOMBRES.get(actor, actor)} consumió {porcentaje_delta:.1f}%, nivel actual = {porcentaje:.1f}%"
+    if codigo == CONSUMO_RECHAZADO:
+        if actor == 'Banio':
+            return "No se puede usar agua para Baño (tinaco vacío)"
+        return f"No se puede usar agua para {_TITULOS.get(actor, actor)} (nivel insuficiente: {porcentaje:.1f}%)"
+    if codigo == BOMBA_ACTIVADA:
+        return f"Bomba activada (nivel: {porcentaje:.1f}%)"
+    if codigo == BOMBA_RECHAZADA:
+        return f"No se puede activar la bomba, nivel insuficiente: {porcentaje:.1f}%"
+    if codigo == BOMBA_DESACTIVADA:
+        return f"Bomba desactivada (nivel: {porcentaje:.1f}%)"
+    return f"Evento {codigo} de {actor}"
+
+
+class RegistroEventos:
+    """
+    Bitácora estructurada de eventos del tinaco.
+    Cada operación agrega un registro compacto a un buffer circular
+    (deque, sin lock explícito) y un hilo escritor los formatea e imprime
+    por lotes, fuera de la sección crítica del tinaco.
+    Cada proceso tiene su propio buffer y su propio hilo escritor.
+    """
+
+    def __init__(self, verbosidad=DETALLADO, capacidad=65536, intervalo=0.1, salida=None, prefijo=""):
+        """
+        verbosidad: SILENCIO, NORMAL o DETALLADO (o su nombre)
+        capacidad: registros máximos pendientes; si el escritor se atrasa
+                   se descartan los más antiguos
+        intervalo: segundos entre vaciados del escritor
+        salida: archivo de texto destino (por defecto sys.stdout)
+        prefijo: texto antepuesto a cada línea (p. ej. el nombre del tinaco)
+        """
+        self.verbosidad = VERBOSIDADES.get(verbosidad, verbosidad)
+        self.capacidad = capacidad
+        self.intervalo = intervalo
+        self.salida = salida
+        self.prefijo = prefijo
+        self._iniciar()
+
+    def _iniciar(self):
+        self._buffer = collections.deque(maxlen=self.capacidad)
+        self._despertar = threading.Event()
+        self._escritor = None
+        self._pid = None
+
+    def __getstate__(self):
+        # El buffer y el hilo son propios de cada proceso
+        return {
+            'verbosidad': self.verbosidad,
+            'capacidad': self.capacidad,
+            'intervalo': self.intervalo,
+            'salida': None,
+            'prefijo': self.prefijo,
+        }
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._iniciar()
+
+    def anotar(self, tiempo, actor, codigo, delta, nivel, capacidad):
+        """Agrega un registro si la verbosidad lo permite."""
+        if self.verbosidad < _NIVEL_MINIMO[codigo]:
+            return
+        if self._pid != os.getpid():
+            self._arrancar_escritor()
+        self._buffer.append((tiempo, actor, codigo, delta, nivel, capacidad))
+
+    def mensaje(self, tiempo, texto):
+        """Agrega un mensaje libre de un actor."""
+        self.anotar(tiempo, texto, MENSAJE, 0, 0, 1)
+
+    def _arrancar_escritor(self):
+        # Tras un fork el hilo del padre no existe en el hijo y los
+        # registros heredados ya los escribe el padre
+        if self._pid is not None:
+            self._iniciar()
+        self._pid = os.getpid()
+        self._escritor = threading.Thread(target=self._bucle_escritor, name="RegistroEventos", daemon=True)
+        self._escritor.start()
+        util.Finalize(self, self.vaciar, exitpriority=10)
+
+    def _bucle_escritor(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self.vaciar()
+
+    def vaciar(self):
+        """Formatea y escribe todos los registros pendientes."""
+        buffer = self._buffer
+        lineas = []
+        while buffer:
+            try:
+                lineas.append(self.prefijo + formatear(buffer.popleft()))
+            except IndexError:
+                break
+        if lineas:
+            salida = self.salida or sys.stdout
+            salida.write("\n".join(lineas) + "\n")
+            salida.flush()
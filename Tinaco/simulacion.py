@@ -0,0 +1,204 @@
+import heapq
+import itertools
+import math
+import random
+import time
+
+from actores import ACTORES_BASE, actores_tinaco, con_anticipacion
+from punto_control import ejecutar_con_puntos_control, leer, restaurar_motor
+from traza import TrazaMutaciones
+from tinaco_context import TinacoContext
+
+
+class MotorSimulacion:
+    """
+    Motor de eventos discretos con reloj virtual.
+    Ejecuta las mismas reglas de los actores sobre un TinacoContext sin
+    procesos ni GUI. Cada actor tiene un instante de disparo en una cola de
+    prioridad y al ejecutarse indica cuándo vuelve a dispararse.
+    """
+
+    def __init__(self, tinaco=None, tiempo_real=False, semilla=None, despacho=False):
+        """
+        tinaco: TinacoContext con los actores por defecto (opcional; se
+        pueden agregar más con agregar_tinaco).
+        tiempo_real: si es True se espera entre eventos para seguir al reloj
+        de pared; si es False se avanza lo más rápido posible.
+        semilla: semilla del generador aleatorio de la lluvia.
+        despacho: los consumos encolan su demanda y un actor "Despacho" la
+        atiende por prioridad (ver actores_tinaco).
+        """
+        self.tiempo_real = tiempo_real
+        self.despacho = despacho
+        self.rng = random.Random(semilla)
+        self.reloj = 0.0
+        self.eventos = 0
+        self.tinacos = []
+        self._cola = []
+        self._actores = {}
+        self._dormidos = []  # una lista por tinaco
+        self._altas = itertools.count()
+
+        if tinaco is not None:
+            self.agregar_tinaco(tinaco)
+
+    @property
+    def tinaco(self):
+        """Primer tinaco de la simulación."""
+        return self.tinacos[0]
+
+    def agregar_tinaco(self, tinaco, config=None):
+        """
+        Agrega un tinaco y sus actores (config con el formato de ACTORES_BASE).
+        La bomba apagada no hace nada en paso_bomba, así que mientras lo esté
+        sale de la cola y vuelve cuando otro actor del tinaco la enciende.
+        """
+        self.tinacos.append(tinaco)
+
+        # Los eventos del tinaco se marcan con el reloj virtual
+        tinaco.reloj = self.ahora
+
+        prefijo = f"{tinaco.nombre}/" if tinaco.nombre else ""
+        dormidos = []
+        self._dormidos.append(dormidos)
+        for nombre, paso in actores_tinaco(tinaco, self.rng, config, self.despacho):
+            activo = (lambda: tinaco.bomba_activa) if nombre == "Bomba" else None
+            self.agregar_actor(prefijo + nombre, paso, activo=activo, dormidos=dormidos)
+
+    def ahora(self):
+        """Instante actual del reloj virtual en segundos."""
+        return self.reloj
+
+    def agregar_actor(self, nombre, paso, inicio=None, activo=None, dormidos=None):
+        """
+        Programa un actor; paso() ejecuta un ciclo y devuelve el retraso.
+        activo: función que dice si paso() hace algo. Cuando devuelve False
+        tras un disparo, el actor deja la cola (sus disparos no cambiarían
+        nada) y se guarda en `dormidos`, la lista de su tinaco; después de
+        cada evento de un actor con la misma lista se vuelve a programar en
+        el primero de sus disparos que aún no pasó si activo() es True.
+        """
+        instante = self.reloj if inicio is None else inicio
+        if dormidos is None:
+            dormidos = []
+            self._dormidos.append(dormidos)
+        # El orden de alta desempata actores con el mismo instante
+        orden = next(self._altas)
+        self._actores[nombre] = (orden, paso, activo, dormidos)
+        heapq.heappush(self._cola, (instante, orden, nombre, paso, activo, dormidos))
+
+    def pendientes(self):
+        """
+        Actores programados como (instante, orden de alta, nombre), sin orden;
+        los dormidos con su siguiente disparo después del reloj.
+        """
+        pendientes = [(instante, orden, nombre) for instante, orden, nombre, *_ in self._cola]
+        for dormidos in self._dormidos:
+            for proximo, periodo, orden, nombre, _, _ in dormidos:
+                while proximo <= self.reloj:
+                    proximo += periodo
+                pendientes.append((proximo, orden, nombre))
+        return pendientes
+
+    def reprogramar(self, pendientes):
+        """
+        Reemplaza los instantes de disparo de los actores ya agregados por
+        los de `pendientes` (de pendientes(), p. ej. de un punto de control).
+        Los actores vuelven a la cola aunque estuvieran dormidos; el orden de
+        alta guardado no se usa.
+        """
+        if set(self._actores) != {nombre for _, _, nombre in pendientes}:
+            raise ValueError("Los actores no coinciden con los de la simulación")
+        for dormidos in self._dormidos:
+            dormidos.clear()
+        self._cola = []
+        for instante, _, nombre in pendientes:
+            orden, paso, activo, dormidos = self._actores[nombre]
+            self._cola.append((instante, orden, nombre, paso, activo, dormidos))
+        heapq.heapify(self._cola)
+
+    def _despertar(self, dormidos, instante, orden):
+        """Vuelve a programar los dormidos activos tras el evento (instante, orden)."""
+        for dormido in list(dormidos):
+            proximo, periodo, orden_dormido, nombre, paso, activo = dormido
+            if activo():
+                # Los disparos anteriores a este evento ya pasaron sin hacer nada
+                while (proximo, orden_dormido) < (instante, orden):
+                    proximo += periodo
+                dormidos.remove(dormido)
+                heapq.heappush(self._cola, (proximo, orden_dormido, nombre, paso, activo, dormidos))
+
+    def ejecutar(self, duracion):
+        """
+        Avanza el reloj virtual `duracion` segundos procesando los eventos.
+        Rendimiento: con un tinaco y el llenado al 30%, un día simulado toma
+        unos 0.65 s donde se midió (0.9 s cuando la bomba apagada seguía en la
+        cola), o sea unos 4 minutos por año simulado. El motor es Python puro
+        y cada evento toma el lock del tinaco: no llega a años en segundos.
+        """
+        fin = self.reloj + duracion
+        cola = self._cola
+        inicio_virtual = self.reloj
+        inicio_real = time.monotonic()
+
+        # Algo pudo encender la bomba entre llamadas (p. ej. restaurar_estado);
+        # los eventos hasta el reloj ya se procesaron
+        for dormidos in self._dormidos:
+            if dormidos:
+                self._despertar(dormidos, self.reloj, math.inf)
+
+        while cola and cola[0][0] <= fin:
+            instante, orden, nombre, paso, activo, dormidos = heapq.heappop(cola)
+
+            if self.tiempo_real:
+                espera = (instante - inicio_virtual) - (time.monotonic() - inicio_real)
+                if espera > 0:
+                    time.sleep(espera)
+
+            self.reloj = instante
+            if activo is not None and not activo():
+                # Ya inactivo (p. ej. al reanudar): el disparo no cuenta como evento
+                retraso = paso()
+                dormidos.append((instante + retraso, retraso, orden, nombre, paso, activo))
+                continue
+            retraso = paso()
+            self.eventos += 1
+            if activo is not None and not activo():
+                dormidos.append((instante + retraso, retraso, orden, nombre, paso, activo))
+                continue
+            heapq.heappush(cola, (instante + retraso, orden, nombre, paso, activo, dormidos))
+            if dormidos:
+                self._despertar(dormidos, instante, orden)
+
+        self.reloj = fin
+
+
+def simular(duracion, semilla=None, tiempo_real=False, verbosidad="silencio", historial=None,
+            punto_control=None, reanudar=False, intervalo_punto_control=3600, grabar=None,
+            despacho=False, anticipar=None):
+    """
+    Simula `duracion` segundos de un tinaco y devuelve (motor, segundos reales).
+    punto_control: archivo donde guardar el estado cada
+    `intervalo_punto_control` segundos simulados; con reanudar=True se
+    continúa desde el estado guardado en él.
+    grabar: archivo donde grabar la traza de mutaciones (ver traza.py)
+    despacho: atender los consumos con el despacho por prioridad
+    anticipar: horizonte en segundos del llenado anticipado de la cisterna
+    (ver actores.paso_cisterna); None = llenado al bajar del 30%
+    """
+    tinaco = TinacoContext(verbosidad=verbosidad, historial=historial)
+    motor = MotorSimulacion(tiempo_real=tiempo_real, semilla=semilla, despacho=despacho)
+    motor.agregar_tinaco(tinaco, con_anticipacion(ACTORES_BASE, anticipar) if anticipar else None)
+    if reanudar:
+        restaurar_motor(motor, leer(punto_control))
+    if grabar is not None:
+        tinaco.traza = TrazaMutaciones.crear(grabar, tinaco)
+
+    inicio = time.perf_counter()
+    if punto_control is None:
+        motor.ejecutar(duracion)
+    else:
+        ejecutar_con_puntos_control(motor, duracion, punto_control, intervalo_punto_control)
+    if tinaco.traza is not None:
+        tinaco.traza.terminar(tinaco)
+    return motor, time.perf_counter() - inicio
@@ -0,0 +1,301 @@
+"""
+Telemetría local por HTTP y WebSocket (solo biblioteca estándar).
+
+- GET /estado: obtener_estado() de cada tinaco en JSON
+- GET /ws: WebSocket que envía un mensaje "completo" con el estado y luego
+  "delta" con los campos que cambian
+
+Un solo productor revisa el contador de versión de los tinacos (lectura sin
+lock) y, cuando cambia, toma el estado una vez y arma cada mensaje una vez
+para todos los clientes. Cada cliente tiene su propia tarea de envío: si se
+atrasa no recibe los deltas intermedios sino el estado completo más
+reciente, así que un cliente lento no frena a los demás ni al tinaco.
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import struct
+import threading
+
+_GUID_WEBSOCKET = b"258EAFA5-E914-47DA-95CA-C5AB0DC11D65"
+_TEXTO = 0x1
+_CIERRE = 0x8
+_PING = 0x9
+_PONG = 0xA
+# Códigos de cierre (RFC 6455)
+_ERROR_PROTOCOLO = 1002
+_DEMASIADO_GRANDE = 1009
+# Largo máximo de una trama: del cliente solo se esperan ping y cierre (los de
+# control no pasan de 125 bytes); del servidor, el estado de todos los tinacos
+_MAXIMO_CLIENTE = 4 * 1024
+_MAXIMO_SERVIDOR = 16 * 1024 * 1024
+# Bytes pendientes por cliente antes de esperar; a partir de ahí los
+# estados intermedios se descartan en vez de acumularse
+_LIMITE_BUFFER = 16 * 1024
+
+
+def _trama(opcode, datos):
+    """Trama WebSocket del servidor (sin máscara)."""
+    largo = len(datos)
+    if largo < 126:
+        encabezado = struct.pack('!BB', 0x80 | opcode, largo)
+    elif largo < 1 << 16:
+        encabezado = struct.pack('!BBH', 0x80 | opcode, 126, largo)
+    else:
+        encabezado = struct.pack('!BBQ', 0x80 | opcode, 127, largo)
+    return encabezado + datos
+
+
+class _TramaInvalida(ConnectionError):
+    """Trama fuera de protocolo; `codigo` es el código de cierre a responder."""
+
+    def __init__(self, codigo, motivo):
+        super().__init__(motivo)
+        self.codigo = codigo
+
+
+async def _leer_trama(reader, maximo, enmascarada):
+    """
+    Lee una trama; devuelve (opcode, datos) quitando la máscara.
+    maximo: largo máximo de los datos
+    enmascarada: si la trama debe traer máscara (las del cliente) o no (las
+    del servidor)
+    Lanza _TramaInvalida sin leer los datos si no cumple.
+    """
+    primero, segundo = await reader.readexactly(2)
+    largo = segundo & 0x7F
+    if largo == 126:
+        (largo,) = struct.unpack('!H', await reader.readexactly(2))
+    elif largo == 127:
+        (largo,) = struct.unpack('!Q', await reader.readexactly(8))
+    if bool(segundo & 0x80) != enmascarada:
+        raise _TramaInvalida(_ERROR_PROTOCOLO, "Trama con máscara incorrecta")
+    if largo > maximo:
+        raise _TramaInvalida(_DEMASIADO_GRANDE, f"Trama de {largo} bytes")
+    mascara = await reader.readexactly(4) if enmascarada else None
+    datos = await reader.readexactly(largo)
+    if mascara:
+        datos = bytes(b ^ mascara[i % 4] for i, b in enumerate(datos))
+    return primero & 0x0F, datos
+
+
+def _aceptacion(clave):
+    return base64.b64encode(hashlib.sha1(clave.encode() + _GUID_WEBSOCKET).digest()).decode()
+
+
+class _Cliente:
+    __slots__ = ('writer', 'secuencia', 'despertar')
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.secuencia = None  # último mensaje enviado
+        self.despertar = asyncio.Event()
+
+
+class ServidorTelemetria:
+    """
+    Servidor de telemetría en un hilo propio con su event loop.
+    Por defecto escucha solo en 127.0.0.1.
+    """
+
+    def __init__(self, tinacos, host="127.0.0.1", puerto=8765, intervalo=0.05):
+        """
+        tinacos: lista de TinacoContext (los nombres identifican a cada uno)
+        puerto: 0 elige uno libre (ver self.puerto tras iniciar)
+        intervalo: segundos entre revisiones del contador de versión
+        """
+        self.tinacos = list(tinacos)
+        self._instantaneas = [tinaco.instantanea() for tinaco in self.tinacos]
+        self.host = host
+        self.puerto = puerto
+        self.intervalo = intervalo
+        self.clientes = set()
+        self._conexiones = set()  # tareas que atienden conexiones abiertas
+        self._secuencia = 0
+        self._estado = None      # {nombre: estado} más reciente
+        self._completo = None    # trama con el estado completo
+        self._delta = None       # trama con los cambios respecto al anterior
+        self._hilo = None
+        self._loop = None
+        self._listo = threading.Event()
+        self._terminar = None
+
+    def _nombre(self, i, tinaco):
+        return tinaco.nombre or f"Tinaco {i + 1}"
+
+    def _tomar_estado(self):
+        return {
+            self._nombre(i, tinaco): tinaco.leer_estado(instantanea).como_dict()
+            for i, (tinaco, instantanea) in enumerate(zip(self.tinacos, self._instantaneas))
+        }
+
+    def _publicar(self, estado):
+        """Arma las tramas de un nuevo estado una sola vez y avisa a los clientes."""
+        cambios = {}
+        for nombre, datos in estado.items():
+            anterior = self._estado.get(nombre, {}) if self._estado else {}
+            diferencias = {campo: valor for campo, valor in datos.items() if anterior.get(campo) != valor}
+            if diferencias:
+                cambios[nombre] = diferencias
+        self._secuencia += 1
+        self._estado = estado
+        self._completo = _trama(_TEXTO, json.dumps(
+            {'tipo': 'completo', 'secuencia': self._secuencia, 'estado': estado}).encode())
+        self._delta = _trama(_TEXTO, json.dumps(
+            {'tipo': 'delta', 'secuencia': self._secuencia, 'cambios': cambios}).encode())
+        for cliente in self.clientes:
+            cliente.despertar.set()
+
+    async def _productor(self):
+        versiones = None
+        while True:
+            actuales = [tinaco.version for tinaco in self.tinacos]
+            if actuales != versiones:
+                versiones = actuales
+                self._publicar(self._tomar_estado())
+            await asyncio.sleep(self.intervalo)
+
+    async def _enviar(self, cliente):
+        """Tarea de envío de un cliente: siempre manda lo más reciente."""
+        while True:
+            await cliente.despertar.wait()
+            cliente.despertar.clear()
+            if cliente.secuencia == self._secuencia:
+                continue
+            trama = self._delta if cliente.secuencia == self._secuencia - 1 else self._completo
+            cliente.secuencia = self._secuencia
+            cliente.writer.write(trama)
+            await cliente.writer.drain()
+
+    async def _atender(self, reader, writer):
+        tarea = asyncio.current_task()
+        self._conexiones.add(tarea)
+        try:
+            await self._atender_peticion(reader, writer)
+        except asyncio.CancelledError:
+            writer.close()
+        finally:
+            self._conexiones.discard(tarea)
+
+    async def _atender_peticion(self, reader, writer):
+        try:
+            encabezado = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lineas = encabezado.decode("latin-1").split("\r\n")
+        partes = lineas[0].split()
+        ruta = partes[1] if len(partes) > 1 else ""
+        cabeceras = {}
+        for linea in lineas[1:]:
+            if ":" in linea:
+                clave, valor = linea.split(":", 1)
+                cabeceras[clave.strip().lower()] = valor.strip()
+
+        if ruta == "/ws" and cabeceras.get("upgrade", "").lower() == "websocket":
+            await self._websocket(reader, writer, cabeceras.get("sec-websocket-key", ""))
+            return
+
+        if ruta == "/estado":
+            cuerpo = json.dumps(self._estado if self._estado is not None else self._tomar_estado()).encode()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\nConnection: close\r\n\r\n" % len(cuerpo) + cuerpo)
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
+
+    async def _websocket(self, reader, writer, clave):
+        writer.write(
+            b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+            b"Sec-WebSocket-Accept: " + _aceptacion(clave).encode() + b"\r\n\r\n"
+        )
+        writer.transport.set_write_buffer_limits(high=_LIMITE_BUFFER)
+        cliente = _Cliente(writer)
+        self.clientes.add(cliente)
+        if self._completo is not None:
+            cliente.despertar.set()
+        envio = asyncio.create_task(self._enviar(cliente))
+        try:
+            # Del cliente solo se atienden ping y cierre
+            while True:
+                opcode, datos = await _leer_trama(reader, _MAXIMO_CLIENTE, enmascarada=True)
+                if opcode == _CIERRE:
+                    writer.write(_trama(_CIERRE, datos[:2]))
+                    break
+                if opcode == _PING:
+                    writer.write(_trama(_PONG, datos))
+        except _TramaInvalida as error:
+            writer.write(_trama(_CIERRE, struct.pack('!H', error.codigo)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self.clientes.discard(cliente)
+            envio.cancel()
+            await asyncio.gather(envio, return_exceptions=True)
+            writer.close()
+
+    async def _principal(self):
+        self._terminar = asyncio.Event()
+        self._publicar(self._tomar_estado())
+        servidor = await asyncio.start_server(self._atender, self.host, self.puerto)
+        self.puerto = servidor.sockets[0].getsockname()[1]
+        productor = asyncio.create_task(self._productor())
+        self._listo.set()
+        async with servidor:
+            await self._terminar.wait()
+        productor.cancel()
+        conexiones = list(self._conexiones)
+        for tarea in conexiones:
+            tarea.cancel()
+        await asyncio.gather(productor, *conexiones, return_exceptions=True)
+
+    def iniciar(self):
+        """Arranca el servidor en un hilo y espera a que escuche."""
+        def correr():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self._principal())
+            self._loop.close()
+
+        self._hilo = threading.Thread(target=correr, name="Telemetria", daemon=True)
+        self._hilo.start()
+        self._listo.wait()
+        return self
+
+    def detener(self, timeout=2):
+        if self._loop is not None and self._terminar is not None:
+            self._loop.call_soon_threadsafe(self._terminar.set)
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+
+
+async def suscribir(host="127.0.0.1", puerto=8765):
+    """
+    Cliente mínimo (para pruebas y paneles locales): se conecta a /ws y
+    produce los mensajes recibidos ya decodificados. Una trama fuera de
+    protocolo del servidor termina con ConnectionError.
+    """
+    reader, writer = await asyncio.open_connection(host, puerto)
+    clave = base64.b64encode(os.urandom(16)).decode()
+    writer.write(
+        f"GET /ws HTTP/1.1\r\nHost: {host}:{puerto}\r\nUpgrade: websocket\r\n"
+        f"Connection: Upgrade\r\nSec-WebSocket-Key: {clave}\r\nSec-WebSocket-Version: 13\r\n\r\n".encode()
+    )
+    respuesta = await reader.readuntil(b"\r\n\r\n")
+    if b" 101 " not in respuesta.split(b"\r\n", 1)[0] or _aceptacion(clave).encode() not in respuesta:
+        writer.close()
+        raise ConnectionError("El servidor no aceptó el WebSocket")
+    try:
+        while True:
+            opcode, datos = await _leer_trama(reader, _MAXIMO_SERVIDOR, enmascarada=False)
+            if opcode == _CIERRE:
+                break
+            if opcode == _TEXTO:
+                yield json.loads(datos)
+    finally:
+        writer.close()
@@ -0,0 +1,57 @@
+"""
+Varios procesos modifican el mismo tinaco a la vez: el nivel final debe ser
+el inicial más lo que entregaron los llenados exitosos menos lo que se
+llevaron los consumos exitosos.
+
+Se corre desde esta carpeta: python -m pytest
+"""
+from multiprocessing import Process, Queue
+
+import pytest
+
+from tinaco_context import TinacoContext
+
+OPERACIONES = ('llenar:Pluvial', 'llenar:Cisterna',
+               'consumir:Banio', 'consumir:Lavadero', 'consumir:Jardin')
+
+
+def _trabajador(tinaco, iteraciones, desfase, resultados):
+    """Recorre las operaciones en orden rotado y devuelve cuántas tuvieron éxito de cada una."""
+    exitos = dict.fromkeys(OPERACIONES, 0)
+    for i in range(iteraciones):
+        operacion = OPERACIONES[(i + desfase) % len(OPERACIONES)]
+        metodo, nombre = operacion.split(":")
+        if getattr(tinaco, metodo)(nombre):
+            exitos[operacion] += 1
+    resultados.put(exitos)
+
+
+@pytest.mark.parametrize("sincronizacion, iteraciones", [("nativa", 2000), ("manager", 200)])
+def test_nivel_final_coincide_con_las_operaciones_exitosas(sincronizacion, iteraciones):
+    n_trabajadores = 8
+    tinaco = TinacoContext(sincronizacion, verbosidad="silencio", nivel_inicial=500)
+    nivel_inicial = tinaco.nivel_agua
+    resultados = Queue()
+    procesos = [Process(target=_trabajador, args=(tinaco, iteraciones, i, resultados))
+                for i in range(n_trabajadores)]
+    for proceso in procesos:
+        proceso.start()
+    exitos = dict.fromkeys(OPERACIONES, 0)
+    for _ in procesos:
+        for operacion, cuenta in resultados.get(timeout=120).items():
+            exitos[operacion] += cuenta
+    for proceso in procesos:
+        proceso.join(timeout=30)
+        assert proceso.exitcode == 0
+
+    esperado = nivel_inicial
+    for operacion, cuenta in exitos.items():
+        metodo, nombre = operacion.split(":")
+        if metodo == "llenar":
+            esperado += cuenta * tinaco.flujos[nombre]
+        else:
+            esperado -= cuenta * tinaco.reglas_consumo[nombre]['consumo']
+    assert tinaco.nivel_agua == esperado
+    assert 0 <= tinaco.nivel_agua <= tinaco.capacidad_max
+    # La prueba solo dice algo si llenados y consumos tuvieron éxito
+    assert exitos['llenar:Pluvial'] and exitos['consumir:Banio']
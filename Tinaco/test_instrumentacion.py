@@ -0,0 +1,52 @@
+"""
+Las filas de contadores de la instrumentación son por hilo: pasar de
+MAX_PROCESOS hilos no debe fallar ni perder las cuentas de los que ya
+terminaron.
+
+Se corre desde esta carpeta: python -m pytest
+"""
+import threading
+
+from instrumentacion import MAX_PROCESOS, Instrumentacion
+
+
+def _medir(instrumentacion, veces, listo=None, seguir=None):
+    for _ in range(veces):
+        with instrumentacion.seccion(threading.Lock(), 'llenar'):
+            pass
+        instrumentacion.resultado('llenar', True)
+    if listo is not None:
+        listo.wait()
+        seguir.wait()
+
+
+def test_hilos_que_terminan_dejan_su_fila_al_siguiente():
+    instrumentacion = Instrumentacion(['llenar'])
+    for _ in range(3 * MAX_PROCESOS):
+        hilo = threading.Thread(target=_medir, args=(instrumentacion, 5))
+        hilo.start()
+        hilo.join()
+
+    totales = instrumentacion.instantanea()['llenar']
+    assert totales['llamadas'] == totales['exitos'] == 3 * MAX_PROCESOS * 5
+    assert instrumentacion.hilos_compartidos == 0
+
+
+def test_con_todas_las_filas_de_hilos_vivos_se_usa_la_compartida():
+    instrumentacion = Instrumentacion(['llenar'])
+    n_hilos = MAX_PROCESOS + 3
+    listo, seguir = threading.Barrier(n_hilos + 1), threading.Event()
+    hilos = [threading.Thread(target=_medir, args=(instrumentacion, 5, listo, seguir))
+             for _ in range(n_hilos)]
+    for hilo in hilos:
+        hilo.start()
+    # Todos miden sin terminar, así que ninguna fila se libera
+    listo.wait()
+    seguir.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert instrumentacion.hilos_compartidos == 3
+    assert instrumentacion.procesos()[-1][0] == 0
+    # Las filas propias no pierden cuentas; la compartida sí puede
+    assert MAX_PROCESOS * 5 <= instrumentacion.instantanea()['llenar']['llamadas'] <= n_hilos * 5
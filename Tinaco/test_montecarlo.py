@@ -0,0 +1,40 @@
+"""
+Sin lluvia, un lote de un tinaco debe seguir paso a paso al motor de
+eventos discretos con los actores por defecto: mismos periodos, mismas
+reglas y, en un mismo segundo, el mismo orden de disparo (el de alta de los
+actores en MotorSimulacion).
+
+Se corre desde esta carpeta: python -m pytest
+"""
+import copy
+
+import pytest
+
+from actores import ACTORES_BASE
+from simulacion import MotorSimulacion
+from tinaco_context import TinacoContext
+
+pytest.importorskip("numpy")
+from montecarlo import LoteTinacos  # noqa: E402
+
+
+def test_lote_sin_lluvia_sigue_al_motor_segundo_a_segundo():
+    config = copy.deepcopy(ACTORES_BASE)
+    config['fuentes'][0]['probabilidad'] = 0.0
+    tinaco = TinacoContext(verbosidad="silencio")
+    motor = MotorSimulacion(semilla=1)
+    motor.agregar_tinaco(tinaco, config)
+    lote = LoteTinacos(1, semilla=1, prob_lluvia=0.0)
+
+    ticks_bomba = 0
+    for segundo in range(20000):
+        # ejecutar(0) procesa los eventos del instante 0, como el tick 0 del lote
+        motor.ejecutar(1 if segundo else 0)
+        lote.paso()
+        assert tinaco.nivel_agua == lote.nivel_agua[0], f"segundo {segundo}"
+        assert tinaco.bomba_activa == lote.bomba_activa[0], f"segundo {segundo}"
+        ticks_bomba += tinaco.bomba_activa
+
+    # La comparación solo dice algo si la cisterna llegó a encender la bomba
+    assert ticks_bomba
+    assert lote.ticks_bomba[0] == ticks_bomba
@@ -0,0 +1,74 @@
+"""
+El servidor de telemetría publica los cambios del tinaco por WebSocket y
+cierra la conexión ante tramas del cliente fuera de protocolo.
+
+Se corre desde esta carpeta: python -m pytest
+"""
+import asyncio
+import os
+import struct
+
+import pytest
+
+from telemetria import ServidorTelemetria, suscribir
+from tinaco_context import TinacoContext
+
+
+@pytest.fixture
+def servidor():
+    tinaco = TinacoContext(verbosidad="silencio")
+    servidor = ServidorTelemetria([tinaco], puerto=0, intervalo=0.01).iniciar()
+    yield servidor
+    servidor.detener()
+
+
+def test_un_cambio_del_tinaco_llega_como_delta(servidor):
+    tinaco = servidor.tinacos[0]
+
+    async def recibir():
+        mensajes = suscribir(servidor.host, servidor.puerto)
+        completo = await mensajes.__anext__()
+        tinaco.llenar('Pluvial')
+        delta = await mensajes.__anext__()
+        await mensajes.aclose()
+        return completo, delta
+
+    completo, delta = asyncio.run(asyncio.wait_for(recibir(), timeout=10))
+    assert completo['tipo'] == 'completo'
+    assert completo['estado']['Tinaco 1']['nivel_agua'] == 300.0
+    assert delta['tipo'] == 'delta'
+    assert delta['secuencia'] == completo['secuencia'] + 1
+    assert delta['cambios']['Tinaco 1']['nivel_agua'] == 300.0 + tinaco.flujos['Pluvial']
+
+
+async def _cierre_tras_enviar(servidor, trama):
+    """Abre el WebSocket a mano, manda `trama` y devuelve el código del cierre del servidor."""
+    reader, writer = await asyncio.open_connection(servidor.host, servidor.puerto)
+    writer.write(b"GET /ws HTTP/1.1\r\nHost: prueba\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                 b"Sec-WebSocket-Key: dGhlIHNhbXBsZSBub25jZQ==\r\nSec-WebSocket-Version: 13\r\n\r\n")
+    await reader.readuntil(b"\r\n\r\n")
+    writer.write(trama)
+    try:
+        while True:
+            primero, segundo = await reader.readexactly(2)
+            largo = segundo & 0x7F
+            if largo == 126:
+                (largo,) = struct.unpack('!H', await reader.readexactly(2))
+            elif largo == 127:
+                (largo,) = struct.unpack('!Q', await reader.readexactly(8))
+            datos = await reader.readexactly(largo)
+            if primero & 0x0F == 0x8:
+                return struct.unpack('!H', datos)[0]
+    finally:
+        writer.close()
+
+
+@pytest.mark.parametrize("trama, codigo", [
+    # Ping sin máscara
+    (b"\x89\x00", 1002),
+    # Texto con máscara que anuncia 2^63 - 1 bytes
+    (b"\x81\xff" + struct.pack('!Q', (1 << 63) - 1) + os.urandom(4), 1009),
+], ids=["sin_mascara", "demasiado_grande"])
+def test_trama_fuera_de_protocolo_se_responde_con_cierre(servidor, trama, codigo):
+    cierre = asyncio.run(asyncio.wait_for(_cierre_tras_enviar(servidor, trama), timeout=10))
+    assert cierre == codigo
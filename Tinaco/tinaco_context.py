@@ -1,90 +1,565 @@
-from multiprocessing import Lock, Manager
+import ctypes
+import heapq
+import time
+from multiprocessing import Condition, Event, Lock, Manager
+from multiprocessing.sharedctypes import RawArray, RawValue
+
+from instrumentacion import Instrumentacion
+from pronostico import PronosticoDemanda
+from traza import LLENAR, CONSUMIR, ACTIVAR_BOMBA, DESACTIVAR_BOMBA
+from registro_eventos import (RegistroEventos, DETALLADO, LLENADO, LLENADO_RECHAZADO,
+                              CONSUMO, CONSUMO_RECHAZADO, BOMBA_ACTIVADA,
+                              BOMBA_RECHAZADA, BOMBA_DESACTIVADA)
+
+
+class EstadoCompartido(ctypes.Structure):
+    """
+    Bloque de estado del tinaco con disposición fija en memoria compartida.
+    Todos los procesos leen y escriben el mismo bloque.
+    """
+    _fields_ = [
+        ('nivel_agua', ctypes.c_double),
+        ('bomba_activa', ctypes.c_uint8),
+        ('fuentes', ctypes.c_uint32),   # bit i -> TinacoContext.FUENTES[i]
+        ('consumos', ctypes.c_uint32),  # bit i -> TinacoContext.CONSUMOS[i]
+        ('esperando', ctypes.c_uint32), # procesos bloqueados en TinacoContext.esperar
+        ('version', ctypes.c_uint64),   # aumenta con cada cambio de estado
+    ]
+
+
+class Acumulados(ctypes.Structure):
+    """
+    Totales del tinaco en memoria compartida (desde que se creó; se
+    guardan en los puntos de control). Se actualizan con el lock tomado.
+    """
+    _fields_ = [
+        ('consumido', ctypes.c_double),       # litros entregados a los consumos
+        ('arranques_bomba', ctypes.c_uint64),
+        ('paradas_bomba', ctypes.c_uint64),
+        ('segundos_bomba', ctypes.c_double),  # tiempo activa hasta la última parada
+        ('inicio_bomba', ctypes.c_double),    # instante (reloj del tinaco) del último arranque
+    ]
+
+
+class Instantanea(EstadoCompartido):
+    """
+    Copia del estado con la misma disposición que EstadoCompartido (fuentes
+    y consumos como máscaras de bits). Se crea una vez por lector con
+    TinacoContext.instantanea() y TinacoContext.leer_estado la vuelve a
+    llenar en sitio con una sola copia de bytes bajo el lock, sin crear
+    diccionarios por lectura.
+    """
+    
+    @property
+    def porcentaje(self):
+        return (self.nivel_agua / self._tinaco.capacidad_max) * 100
+    
+    def fuente_activa(self, nombre):
+        return bool(self.fuentes & self._tinaco._bits_fuentes[nombre])
+    
+    def consumo_activo(self, nombre):
+        return bool(self.consumos & self._tinaco._bits_consumos[nombre])
+    
+    def como_dict(self):
+        """El mismo diccionario que TinacoContext.obtener_estado."""
+        return self._tinaco._estado_a_dict(self)
+
+
+# Fuentes por defecto: nombre -> litros por ciclo
+FUENTES_BASE = {'Pluvial': 15, 'Cisterna': 30}
+
+# Consumos por defecto: nombre -> regla
+# - consumo: litros por uso
+# - umbral: fracción de la capacidad que el nivel debe superar para consumir
+# - piso: fracción de la capacidad por debajo de la cual no puede quedar el
+#   nivel tras el consumo (None = capacidad_min)
+CONSUMOS_BASE = {
+    'Jardin': {'consumo': 10, 'umbral': 0.5, 'piso': None},
+    'Lavadero': {'consumo': 8, 'umbral': 0.03, 'piso': 0.03},
+    'Banio': {'consumo': 5, 'umbral': 0, 'piso': 0},
+}
+
+# Despacho de la demanda (ver TinacoContext.despachar): nombre -> regla
+# - prioridad: menor se atiende primero
+# - cuota: usos concedidos como máximo por despacho (None = sin límite); el
+#   resto queda en cola para el siguiente
+# Los consumos que no están aquí van al final y sin cuota.
+DEMANDA_BASE = {
+    'Banio': {'prioridad': 0, 'cuota': None},
+    'Lavadero': {'prioridad': 1, 'cuota': 2},
+    'Jardin': {'prioridad': 2, 'cuota': 1},
+}
+
+# Máximo de fuentes o consumos por tinaco (bits de EstadoCompartido)
+MAX_ELEMENTOS = 32
+
+
+def _alias(tabla, nombre, campo=None):
+    """Propiedad que expone una entrada de las reglas como atributo."""
+    def obtener(self):
+        valor = getattr(self, tabla)[nombre]
+        return valor if campo is None else valor[campo]
+    
+    def asignar(self, valor):
+        if campo is None:
+            getattr(self, tabla)[nombre] = valor
+        else:
+            getattr(self, tabla)[nombre][campo] = valor
+    
+    return property(obtener, asignar)
+
 
 class TinacoContext:
-    def __init__(self):
-        
-        manager = Manager()
-        self.lock = manager.Lock()
-        self.lluvia_evento = manager.Event()
-        self.bomba_evento = manager.Event()
+    FUENTES = tuple(FUENTES_BASE)
+    CONSUMOS = tuple(CONSUMOS_BASE)
+    
+    # Flujos de agua (litros por ciclo) del tinaco por defecto
+    flujo_pluvial = _alias('flujos', 'Pluvial')
+    flujo_cisterna = _alias('flujos', 'Cisterna')
+    consumo_jardin = _alias('reglas_consumo', 'Jardin', 'consumo')
+    consumo_lavadero = _alias('reglas_consumo', 'Lavadero', 'consumo')
+    consumo_banio = _alias('reglas_consumo', 'Banio', 'consumo')
+
+    def __init__(self, sincronizacion="nativa", verbosidad=DETALLADO, historial=None,
+                 nombre=None, capacidad_max=1000, capacidad_min=100, nivel_inicial=300,
+                 nivel_minimo_bomba=0.25, fuentes=None, consumos=None, demanda=None,
+                 instrumentar=False):
+        """
+        sincronizacion:
+        - "nativa": Lock/Event de multiprocessing, sin proceso servidor
+        - "manager": proxies de un Manager() (cada operación es una llamada IPC)
+        verbosidad: "silencio", "normal" o "detallado" (ver registro_eventos)
+        historial: HistorialNivel opcional donde se guarda una muestra por
+                   cada cambio de estado
+        nombre: identifica al tinaco en la consola cuando hay varios
+        nivel_minimo_bomba: fracción de la capacidad necesaria para activar la bomba
+        fuentes: {nombre: flujo} (por defecto FUENTES_BASE)
+        consumos: {nombre: regla} (por defecto CONSUMOS_BASE)
+        demanda: {nombre: {'prioridad', 'cuota'}} para despachar(); lo que
+                 falte se toma de DEMANDA_BASE
+        instrumentar: mide la espera y retención del lock y cuenta los
+                      resultados de cada operación por proceso (ver
+                      instrumentacion.Instrumentacion)
+        """
+        self.sincronizacion = sincronizacion
+        self.nombre = nombre
+        self.registro = RegistroEventos(verbosidad, prefijo=f"[{nombre}] " if nombre else "")
+        self.reloj = time.time  # Fuente de marcas de tiempo de los eventos
+        self.historial = historial
+        self.traza = None  # TrazaMutaciones opcional (ver traza.py)
+        if sincronizacion == "nativa":
+            self.lock = Lock()
+            self.condicion = Condition(self.lock)
+            self.lluvia_evento = Event()
+            self.bomba_evento = Event()
+        elif sincronizacion == "manager":
+            manager = Manager()
+            self.lock = manager.Lock()
+            self.condicion = manager.Condition(self.lock)
+            self.lluvia_evento = manager.Event()
+            self.bomba_evento = manager.Event()
+        else:
+            raise ValueError(f"Modo de sincronización desconocido: {sincronizacion}")
         
         # Configuration values
-        self.capacidad_max = 1000  # Capacidad máxima en litros
-        self.capacidad_min = 100   # Capacidad mínima en litros
-        self.nivel_agua = 300      # Nivel inicial de agua
+        self.capacidad_max = capacidad_max  # Capacidad máxima en litros
+        self.capacidad_min = capacidad_min  # Capacidad mínima en litros
+        self.nivel_minimo_bomba = nivel_minimo_bomba
+        
+        # Reglas de fuentes y consumos; el orden define el bit de cada una
+        self.flujos = dict(FUENTES_BASE if fuentes is None else fuentes)
+        self.reglas_consumo = {
+            nombre: dict(regla)
+            for nombre, regla in (CONSUMOS_BASE if consumos is None else consumos).items()
+        }
+        if len(self.flujos) > MAX_ELEMENTOS or len(self.reglas_consumo) > MAX_ELEMENTOS:
+            raise ValueError(f"Un tinaco admite como máximo {MAX_ELEMENTOS} fuentes y {MAX_ELEMENTOS} consumos")
+        self.FUENTES = tuple(self.flujos)
+        self.CONSUMOS = tuple(self.reglas_consumo)
+        self._bits_fuentes = {nombre: 1 << i for i, nombre in enumerate(self.FUENTES)}
+        self._bits_consumos = {nombre: 1 << i for i, nombre in enumerate(self.CONSUMOS)}
+        self._indices_fuentes = {nombre: i for i, nombre in enumerate(self.FUENTES)}
+        self._indices_consumos = {nombre: i for i, nombre in enumerate(self.CONSUMOS)}
+        
+        # Prioridad y cuota de cada consumo para el despacho de la demanda
+        self.reglas_demanda = {}
+        for nombre in self.CONSUMOS:
+            regla = dict(DEMANDA_BASE.get(nombre, {'prioridad': len(DEMANDA_BASE), 'cuota': None}))
+            regla.update((demanda or {}).get(nombre, {}))
+            self.reglas_demanda[nombre] = regla
+        
+        # Sin instrumentación las operaciones usan el lock directamente
+        self.instrumentacion = None
+        if instrumentar:
+            self.instrumentacion = Instrumentacion(
+                [f"llenar:{f}" for f in self.FUENTES]
+                + [f"consumir:{c}" for c in self.CONSUMOS]
+                + ["activar_bomba", "desactivar_bomba", "obtener_estado", "transaccion", "despachar"]
+            )
+        
+        # Estado compartido entre procesos (se hereda al crear cada Process)
+        self._estado = RawValue(EstadoCompartido)
+        self.nivel_agua = nivel_inicial  # Nivel inicial de agua
         self.bomba_activa = False
+        self._acumulados = RawValue(Acumulados)
+        self._entregado = RawArray(ctypes.c_double, len(self.FUENTES))  # litros por fuente
+        self.pronosticos = {}  # fuente -> PronosticoDemanda (ver pronostico())
         
-        # Flujos de agua (litros por ciclo)
-        self.flujo_pluvial = 15    
-        self.flujo_cisterna = 30   
-        self.consumo_jardin = 10   
-        self.consumo_lavadero = 8 
-        self.consumo_banio = 5     
+        # Cola de demanda por consumo: solicitudes, atendidas y rechazadas
+        # acumuladas (pendientes = solicitadas - atendidas - rechazadas).
+        # Se modifican con el lock tomado.
+        self._solicitadas = RawArray(ctypes.c_uint64, len(self.CONSUMOS))
+        self._atendidas = RawArray(ctypes.c_uint64, len(self.CONSUMOS))
+        self._rechazadas = RawArray(ctypes.c_uint64, len(self.CONSUMOS))
         
-        # Estado de los componentes
-        self.fuentes = {'Pluvial': False, 'Cisterna': False}
-        self.consumos = {'Jardin': False, 'Lavadero': False, 'Banio': False}
+    def registrar(self, mensaje):
+        """Agrega un mensaje libre a la bitácora de eventos."""
+        self.registro.mensaje(self.reloj(), mensaje)
     
-    def llenar_desde_pluvial(self):
-        """Método para llenar el tinaco desde agua pluvial, respetando la capacidad máxima."""
+    # Acceso al estado compartido
+    @property
+    def nivel_agua(self):
+        return self._estado.nivel_agua
+    
+    @nivel_agua.setter
+    def nivel_agua(self, valor):
+        self._estado.nivel_agua = valor
+    
+    @property
+    def bomba_activa(self):
+        return bool(self._estado.bomba_activa)
+    
+    @bomba_activa.setter
+    def bomba_activa(self, valor):
+        self._estado.bomba_activa = 1 if valor else 0
+    
+    @property
+    def version(self):
+        """
+        Contador de cambios del estado. Se puede leer sin lock para saber
+        si hubo cambios desde la última lectura.
+        """
+        return self._estado.version
+    
+    @property
+    def fuentes(self):
+        """Estado de las fuentes como diccionario (copia, solo lectura)."""
+        return self._bits_a_dict(self._estado.fuentes, self.FUENTES)
+    
+    @property
+    def consumos(self):
+        """Estado de los consumos como diccionario (copia, solo lectura)."""
+        return self._bits_a_dict(self._estado.consumos, self.CONSUMOS)
+    
+    @staticmethod
+    def _bits_a_dict(bits, nombres):
+        return {nombre: bool(bits & (1 << i)) for i, nombre in enumerate(nombres)}
+    
+    def _cambio(self):
+        """Registra un cambio de estado. Se llama con el lock tomado."""
+        estado = self._estado
+        estado.version += 1
+        if estado.esperando:
+            self.condicion.notify_all()
+        if self.historial is not None:
+            self.historial.agregar(self.reloj(), estado.nivel_agua, estado.bomba_activa,
+                                   estado.fuentes, estado.consumos)
+    
+    def esperar(self, predicado, timeout=None, terminar_evento=None):
+        """
+        Bloquea hasta que `predicado(transaccion)` sea verdadero, sin sondear:
+        el predicado se vuelve a evaluar (con el lock tomado) en cada cambio
+        de estado. Devuelve False si se agota `timeout` o si se activa
+        `terminar_evento` (quien lo activa debe llamar a despertar()).
+        
+        Ejemplos de suscripción:
+            tinaco.esperar(lambda t: t.porcentaje < 30)
+            tinaco.esperar(lambda t: any(t.consumos.values()))
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        transaccion = Transaccion(self)
         with self.lock:
-            nivel_anterior = self.nivel_agua
-            porcentaje_anterior = (nivel_anterior / self.capacidad_max) * 100
-            
-            if self.nivel_agua + self.flujo_pluvial <= self.capacidad_max:
-                self.nivel_agua += self.flujo_pluvial
-                self.fuentes['Pluvial'] = True
-                
-                porcentaje_actual = (self.nivel_agua / self.capacidad_max) * 100
-                porcentaje_agregado = porcentaje_actual - porcentaje_anterior
-                print(f"Se añadió {porcentaje_agregado:.1f}% desde Pluvial, nivel actual = {porcentaje_actual:.1f}%")
+            self._estado.esperando += 1
+            try:
+                while not predicado(transaccion):
+                    if terminar_evento is not None and terminar_evento.is_set():
+                        return False
+                    restante = None if limite is None else limite - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        return False
+                    self.condicion.wait(restante)
                 return True
+            finally:
+                self._estado.esperando -= 1
+    
+    def despertar(self):
+        """Despierta a todos los que esperan (p. ej. al terminar el sistema)."""
+        with self.lock:
+            self.condicion.notify_all()
+    
+    def _seccion(self, operacion):
+        """Lock para `with`; si hay instrumentación, mide `operacion`."""
+        if self.instrumentacion is None:
+            return self.lock
+        return self.instrumentacion.seccion(self.lock, operacion)
+    
+    def _contar(self, operacion, exito):
+        """Cuenta el resultado de una operación si hay instrumentación."""
+        if self.instrumentacion is not None:
+            self.instrumentacion.resultado(operacion, exito)
+    
+    def estadisticas(self, por_proceso=False):
+        """Instantánea de la instrumentación (None si está desactivada)."""
+        if self.instrumentacion is None:
+            return None
+        return self.instrumentacion.instantanea(por_proceso)
+    
+    def _marcar_fuente(self, nombre, activa):
+        """Marca una fuente; devuelve True si su estado cambió."""
+        bit = self._bits_fuentes[nombre]
+        anterior = self._estado.fuentes
+        self._estado.fuentes = anterior | bit if activa else anterior & ~bit
+        return self._estado.fuentes != anterior
+    
+    def _marcar_consumo(self, nombre, activo):
+        """Marca un consumo; devuelve True si su estado cambió."""
+        bit = self._bits_consumos[nombre]
+        anterior = self._estado.consumos
+        self._estado.consumos = anterior | bit if activo else anterior & ~bit
+        return self._estado.consumos != anterior
+    
+    # Núcleo de cada operación: se llama con el lock tomado y deja en
+    # `eventos` lo que hay que registrar al soltarlo
+    def _llenar(self, fuente, eventos):
+        flujo = self.flujos[fuente]
+        nivel = self.nivel_agua
+        exito = nivel + flujo <= self.capacidad_max
+        if exito:
+            nivel += flujo
+            self.nivel_agua = nivel
+            self._entregado[self._indices_fuentes[fuente]] += flujo
+        if self._marcar_fuente(fuente, exito) or exito:
+            self._cambio()
+        if self.traza is not None:
+            self.traza.agregar(LLENAR, self._indices_fuentes[fuente], exito)
+        eventos.append((fuente, LLENADO if exito else LLENADO_RECHAZADO, flujo, nivel))
+        return exito
+    
+    def _consumir(self, consumo, eventos):
+        regla = self.reglas_consumo[consumo]
+        cantidad = regla['consumo']
+        nivel_umbral = self.capacidad_max * regla['umbral']
+        nivel_piso = self.capacidad_min if regla['piso'] is None else self.capacidad_max * regla['piso']
+        nivel = self.nivel_agua
+        exito = nivel > nivel_umbral and nivel - cantidad >= nivel_piso
+        if exito:
+            nivel -= cantidad
+            self.nivel_agua = nivel
+            self._acumulados.consumido += cantidad
+        if self._marcar_consumo(consumo, exito) or exito:
+            self._cambio()
+        if self.traza is not None:
+            self.traza.agregar(CONSUMIR, self._indices_consumos[consumo], exito)
+        eventos.append((consumo, CONSUMO if exito else CONSUMO_RECHAZADO, cantidad, nivel))
+        return exito
+    
+    def _activar_bomba(self, eventos):
+        nivel = self.nivel_agua
+        ya_activa = self.bomba_activa
+        exito = not ya_activa and nivel > self.capacidad_max * self.nivel_minimo_bomba
+        if exito:
+            self.bomba_activa = True
+            self._cambio()
+            self.bomba_evento.set()
+            self._acumulados.arranques_bomba += 1
+            self._acumulados.inicio_bomba = self.reloj()
+        if self.traza is not None:
+            self.traza.agregar(ACTIVAR_BOMBA, 0, exito)
+        if not ya_activa:
+            eventos.append(('Bomba', BOMBA_ACTIVADA if exito else BOMBA_RECHAZADA, 0, nivel))
+        return exito
+    
+    def _desactivar_bomba(self, eventos):
+        exito = self.bomba_activa
+        if exito:
+            self.bomba_activa = False
+            self._cambio()
+            self.bomba_evento.clear()
+            acumulados = self._acumulados
+            acumulados.paradas_bomba += 1
+            acumulados.segundos_bomba += self.reloj() - acumulados.inicio_bomba
+            eventos.append(('Bomba', BOMBA_DESACTIVADA, 0, self.nivel_agua))
+        if self.traza is not None:
+            self.traza.agregar(DESACTIVAR_BOMBA, 0, exito)
+        return exito
+    
+    def _despachar(self, eventos, resultados):
+        """
+        Atiende las solicitudes pendientes en orden de prioridad; devuelve
+        (atendidas, rechazadas) y agrega a `resultados` un (operación, éxito,
+        veces) por consumo para la instrumentación. Cada consumo con
+        pendientes está una vez en un montículo ordenado por (prioridad,
+        turno): conceder un uso es sacarlo y, si le quedan pendientes y
+        cuota, volverlo a meter con un turno nuevo, O(log n). Los consumos
+        con la misma prioridad se alternan.
+        """
+        pendientes = {}
+        monticulo = []
+        for i, consumo in enumerate(self.CONSUMOS):
+            n = self._solicitadas[i] - self._atendidas[i] - self._rechazadas[i]
+            if n:
+                pendientes[i] = n
+                monticulo.append((self.reglas_demanda[consumo]['prioridad'], i, i))
+        heapq.heapify(monticulo)
+        
+        turno = len(self.CONSUMOS)
+        concedidos = dict.fromkeys(pendientes, 0)
+        atendidas = rechazadas = 0
+        while monticulo:
+            prioridad, _, i = heapq.heappop(monticulo)
+            consumo = self.CONSUMOS[i]
+            if self._consumir(consumo, eventos):
+                self._atendidas[i] += 1
+                atendidas += 1
+                pendientes[i] -= 1
+                concedidos[i] += 1
+                cuota = self.reglas_demanda[consumo]['cuota']
+                if pendientes[i] and (cuota is None or concedidos[i] < cuota):
+                    heapq.heappush(monticulo, (prioridad, turno, i))
+                    turno += 1
             else:
-                self.fuentes['Pluvial'] = False
-                print(f"No se puede llenar más desde Pluvial (capacidad máxima: {self.capacidad_max}L)")
-                return False
+                # Las concesiones solo bajan el nivel: en este despacho
+                # ninguna de sus solicitudes pasaría la regla. _consumir ya
+                # anotó el rechazo de la primera; va uno por cada una de las demás
+                n = pendientes[i]
+                self._rechazadas[i] += n
+                rechazadas += n
+                cantidad = self.reglas_consumo[consumo]['consumo']
+                nivel = self.nivel_agua
+                for _ in range(n - 1):
+                    eventos.append((consumo, CONSUMO_RECHAZADO, cantidad, nivel))
+                resultados.append(("consumir:" + consumo, False, n))
+        for i, veces in concedidos.items():
+            if veces:
+                resultados.append(("consumir:" + self.CONSUMOS[i], True, veces))
+        return atendidas, rechazadas
+    
+    def _estado_a_dict(self, estado):
+        """Diccionario de un bloque con la disposición de EstadoCompartido."""
+        return {
+            'nivel_agua': estado.nivel_agua,
+            'porcentaje': (estado.nivel_agua / self.capacidad_max) * 100,
+            'bomba_activa': bool(estado.bomba_activa),
+            'fuentes': self._bits_a_dict(estado.fuentes, self.FUENTES),
+            'consumos': self._bits_a_dict(estado.consumos, self.CONSUMOS),
+            'version': estado.version
+        }
+    
+    def _obtener_estado(self):
+        return self._estado_a_dict(self._estado)
+    
+    def _anotar_eventos(self, eventos):
+        """Pasa los eventos a la bitácora; se llama fuera de la sección crítica."""
+        if eventos:
+            tiempo = self.reloj()
+            for actor, codigo, delta, nivel in eventos:
+                self.registro.anotar(tiempo, actor, codigo, delta, nivel, self.capacidad_max)
+    
+    def llenar(self, fuente):
+        """Llena el tinaco con el flujo de `fuente`, respetando la capacidad máxima."""
+        operacion = "llenar:" + fuente
+        eventos = []
+        with self._seccion(operacion):
+            exito = self._llenar(fuente, eventos)
+        
+        # El registro se hace fuera de la sección crítica
+        self._contar(operacion, exito)
+        self._anotar_eventos(eventos)
+        return exito
+    
+    def consumir(self, consumo):
+        """
+        Consume agua para `consumo` según su regla: el nivel debe superar el
+        umbral y después del consumo no puede quedar por debajo del piso.
+        """
+        operacion = "consumir:" + consumo
+        eventos = []
+        with self._seccion(operacion):
+            exito = self._consumir(consumo, eventos)
+        
+        self._contar(operacion, exito)
+        self._anotar_eventos(eventos)
+        return exito
+    
+    def solicitar(self, consumo, cantidad=1):
+        """
+        Encola `cantidad` usos de `consumo` para el siguiente despachar().
+        Toma el lock solo para sumar al contador (puede haber varios
+        escritores: procesos, el planificador asyncio, la GUI); varias tomas
+        del mismo tipo pueden pedir varios usos a la vez.
+        """
+        i = self._indices_consumos[consumo]
+        with self.lock:
+            self._solicitadas[i] += cantidad
+    
+    def despachar(self):
+        """
+        Atiende en lote todas las solicitudes pendientes con una sola toma
+        del lock: primero las de mayor prioridad (baño, lavadero, jardín),
+        cada consumo hasta su cuota, con la misma regla de nivel que
+        consumir(). Las que no pasan la regla se rechazan y las que exceden
+        la cuota esperan al siguiente despacho. Devuelve (atendidas, rechazadas).
+        La instrumentación mide la toma del lock como "despachar" y cuenta
+        cada uso atendido o rechazado en "consumir:<consumo>".
+        """
+        eventos = []
+        resultados = []
+        with self._seccion("despachar"):
+            atendidas, rechazadas = self._despachar(eventos, resultados)
+        
+        self._contar("despachar", atendidas > 0)
+        if self.instrumentacion is not None:
+            for operacion, exito, veces in resultados:
+                self.instrumentacion.resultado(operacion, exito, veces)
+        self._anotar_eventos(eventos)
+        return atendidas, rechazadas
+    
+    def demanda(self):
+        """Contadores de la cola por consumo: {nombre: (pendientes, atendidas, rechazadas)}."""
+        with self.lock:
+            return {
+                consumo: (self._solicitadas[i] - self._atendidas[i] - self._rechazadas[i],
+                          self._atendidas[i], self._rechazadas[i])
+                for i, consumo in enumerate(self.CONSUMOS)
+            }
+    
+    def llenar_desde_pluvial(self):
+        """Método para llenar el tinaco desde agua pluvial, respetando la capacidad máxima."""
+        return self.llenar('Pluvial')
     
     def llenar_desde_cisterna(self):
         """Método para llenar el tinaco desde la cisterna, respetando la capacidad máxima."""
-        with self.lock:
-            nivel_anterior = self.nivel_agua
-            porcentaje_anterior = (nivel_anterior / self.capacidad_max) * 100
-            
-            if self.nivel_agua + self.flujo_cisterna <= self.capacidad_max:
-                self.nivel_agua += self.flujo_cisterna
-                self.fuentes['Cisterna'] = True
-                
-                porcentaje_actual = (self.nivel_agua / self.capacidad_max) * 100
-                porcentaje_agregado = porcentaje_actual - porcentaje_anterior
-                print(f"Se añadió {porcentaje_agregado:.1f}% desde Cisterna, nivel actual = {porcentaje_actual:.1f}%")
-                return True
-            else:
-                self.fuentes['Cisterna'] = False
-                print(f"No se puede llenar más desde Cisterna (capacidad máxima: {self.capacidad_max}L)")
-                return False
+        return self.llenar('Cisterna')
     
     def activar_bomba(self):
         """Activa la bomba si el nivel de agua supera el 25% de la capacidad."""
-        with self.lock:
-            nivel_minimo_bomba = self.capacidad_max * 0.25
-            if not self.bomba_activa and self.nivel_agua > nivel_minimo_bomba:
-                self.bomba_activa = True
-                self.bomba_evento.set()
-                print(f"Bomba activada (nivel: {(self.nivel_agua / self.capacidad_max) * 100:.1f}%)")
-                return True
-            elif not self.bomba_activa:
-                print(f"No se puede activar la bomba, nivel insuficiente: {(self.nivel_agua / self.capacidad_max) * 100:.1f}%")
-            return False
+        eventos = []
+        with self._seccion("activar_bomba"):
+            exito = self._activar_bomba(eventos)
+        
+        self._contar("activar_bomba", exito)
+        self._anotar_eventos(eventos)
+        return exito
     
     def desactivar_bomba(self):
         """Desactiva la bomba de agua."""
-        with self.lock:
-            if self.bomba_activa:
-                self.bomba_activa = False
-                self.bomba_evento.clear()
-                print(f"Bomba desactivada (nivel: {(self.nivel_agua / self.capacidad_max) * 100:.1f}%)")
-                return True
-            return False
+        eventos = []
+        with self._seccion("desactivar_bomba"):
+            exito = self._desactivar_bomba(eventos)
+        
+        self._contar("desactivar_bomba", exito)
+        self._anotar_eventos(eventos)
+        return exito
     
     def consumir_jardin(self):
         """
@@ -92,81 +567,251 @@ class TinacoContext:
         - Nivel > 50% de la capacidad
         - No baja del mínimo permitido
         """
-        with self.lock:
-            nivel_anterior = self.nivel_agua
-            porcentaje_anterior = (nivel_anterior / self.capacidad_max) * 100
-            
-            # Jardín solo puede consumir si el nivel está por encima del 50%
-            nivel_minimo_jardin = self.capacidad_max * 0.5
-            
-            if self.nivel_agua > nivel_minimo_jardin and self.nivel_agua - self.consumo_jardin >= self.capacidad_min:
-                self.nivel_agua -= self.consumo_jardin
-                self.consumos['Jardin'] = True
-                
-                porcentaje_actual = (self.nivel_agua / self.capacidad_max) * 100
-                porcentaje_consumido = porcentaje_anterior - porcentaje_actual
-                print(f"El jardín consumió {porcentaje_consumido:.1f}%, nivel actual = {porcentaje_actual:.1f}%")
-                return True
-            else:
-                self.consumos['Jardin'] = False
-                print(f"No se puede usar agua para Jardín (nivel insuficiente: {porcentaje_anterior:.1f}%)")
-                return False
+        return self.consumir('Jardin')
     
     def consumir_lavadero(self):
         """
         Consume agua para el lavadero si se cumplen las restricciones:
         - No debe llevar el tinaco a menos del 3%
         """
-        with self.lock:
-            nivel_anterior = self.nivel_agua
-            porcentaje_anterior = (nivel_anterior / self.capacidad_max) * 100
-            
-            # Lavadero no puede consumir si el nivel baja del 3%
-            nivel_minimo_lavadero = self.capacidad_max * 0.03
-            
-            if self.nivel_agua > nivel_minimo_lavadero and self.nivel_agua - self.consumo_lavadero >= nivel_minimo_lavadero:
-                self.nivel_agua -= self.consumo_lavadero
-                self.consumos['Lavadero'] = True
-                
-                porcentaje_actual = (self.nivel_agua / self.capacidad_max) * 100
-                porcentaje_consumido = porcentaje_anterior - porcentaje_actual
-                print(f"El lavadero consumió {porcentaje_consumido:.1f}%, nivel actual = {porcentaje_actual:.1f}%")
-                return True
-            else:
-                self.consumos['Lavadero'] = False
-                print(f"No se puede usar agua para Lavadero (nivel insuficiente: {porcentaje_anterior:.1f}%)")
-                return False
+        return self.consumir('Lavadero')
     
     def consumir_banio(self):
         """
         Consume agua para el baño:
         - Siempre disponible mientras haya agua
         """
-        with self.lock:
-            nivel_anterior = self.nivel_agua
-            porcentaje_anterior = (nivel_anterior / self.capacidad_max) * 100
-            
-            # Baño siempre puede consumir a menos que esté vacío
-            if self.nivel_agua > 0 and self.nivel_agua - self.consumo_banio >= 0:
-                self.nivel_agua -= self.consumo_banio
-                self.consumos['Banio'] = True
-                
-                porcentaje_actual = (self.nivel_agua / self.capacidad_max) * 100
-                porcentaje_consumido = porcentaje_anterior - porcentaje_actual
-                print(f"El baño consumió {porcentaje_consumido:.1f}%, nivel actual = {porcentaje_actual:.1f}%")
-                return True
-            else:
-                self.consumos['Banio'] = False
-                print(f"No se puede usar agua para Baño (tinaco vacío)")
-                return False
+        return self.consumir('Banio')
     
     def obtener_estado(self):
         """Obtiene el estado actual del tinaco y sus componentes."""
+        with self._seccion("obtener_estado"):
+            return self._obtener_estado()
+    
+    def instantanea(self):
+        """Instantanea de este tinaco, para reutilizarla con leer_estado."""
+        destino = Instantanea()
+        destino._tinaco = self
+        # Vistas de bytes de ambos bloques, creadas una sola vez
+        destino._vista = memoryview(destino).cast('B')
+        destino._origen = memoryview(self._estado).cast('B')
+        return destino
+    
+    def leer_estado(self, destino):
+        """
+        Copia el estado actual en `destino` (de instantanea()) y lo devuelve.
+        Lectura consistente como obtener_estado, pero sin asignar memoria.
+        """
+        if destino._tinaco is not self:
+            raise ValueError("La instantánea es de otro tinaco")
+        if self.instrumentacion is not None:
+            with self._seccion("obtener_estado"):
+                destino._vista[:] = destino._origen
+            return destino
+        # acquire/release explícitos: `with` sobre el Lock nativo crea una
+        # tupla de argumentos en cada __exit__
+        self.lock.acquire()
+        try:
+            destino._vista[:] = destino._origen
+        finally:
+            self.lock.release()
+        return destino
+    
+    def uso_bomba(self):
+        """
+        Arranques, paradas y segundos con la bomba activa (incluye el tramo
+        en curso), según el reloj del tinaco.
+        """
         with self.lock:
+            acumulados = self._acumulados
+            segundos = acumulados.segundos_bomba
+            if self._estado.bomba_activa:
+                segundos += self.reloj() - acumulados.inicio_bomba
             return {
-                'nivel_agua': self.nivel_agua,
-                'porcentaje': (self.nivel_agua / self.capacidad_max) * 100,
-                'bomba_activa': self.bomba_activa,
-                'fuentes': self.fuentes.copy(),
-                'consumos': self.consumos.copy()
-            }
\ No newline at end of file
+                'arranques': acumulados.arranques_bomba,
+                'paradas': acumulados.paradas_bomba,
+                'segundos_activa': segundos,
+            }
+    
+    def pronostico(self, fuente):
+        """
+        PronosticoDemanda del llenado anticipado de `fuente`; se crea la
+        primera vez y va en los puntos de control. Para que el proceso
+        principal vea lo que aprende el de la cisterna hay que pedirlo antes
+        de crear los procesos.
+        """
+        pronostico = self.pronosticos.get(fuente)
+        if pronostico is None:
+            pronostico = self.pronosticos[fuente] = PronosticoDemanda()
+        return pronostico
+    
+    def exportar_estado(self):
+        """
+        Copia consistente del estado compartido para un punto de control:
+        (nivel_agua, bomba_activa, fuentes, consumos, version, lloviendo,
+        demanda, uso, entregado, pronosticos), con
+        - fuentes y consumos como bits
+        - demanda: (solicitadas, atendidas, rechazadas) por consumo, en el
+          orden de CONSUMOS
+        - uso: (consumido, arranques, paradas, segundos con la bomba activa
+          incluyendo el tramo en curso)
+        - entregado: litros por fuente, en el orden de FUENTES
+        - pronosticos: (fuente, PronosticoDemanda.exportar()) por pronóstico
+        Las muestras del pronóstico se toman con el lock (paso_cisterna), así
+        que también es consistente.
+        """
+        with self.lock:
+            estado = self._estado
+            acumulados = self._acumulados
+            demanda = tuple(zip(self._solicitadas, self._atendidas, self._rechazadas))
+            segundos = acumulados.segundos_bomba
+            if estado.bomba_activa:
+                segundos += self.reloj() - acumulados.inicio_bomba
+            uso = (acumulados.consumido, acumulados.arranques_bomba, acumulados.paradas_bomba, segundos)
+            pronosticos = tuple((fuente, pronostico.exportar())
+                                for fuente, pronostico in self.pronosticos.items())
+            return (estado.nivel_agua, estado.bomba_activa, estado.fuentes, estado.consumos,
+                    estado.version, self.lluvia_evento.is_set(), demanda, uso,
+                    tuple(self._entregado), pronosticos)
+    
+    def restaurar_estado(self, exportado):
+        """
+        Restaura un estado devuelto por exportar_estado. Los campos después
+        de lloviendo son opcionales (una traza solo guarda los primeros; los
+        puntos de control viejos, hasta la demanda): los que faltan quedan
+        como están. Los pronósticos de fuentes sin pronóstico en este tinaco
+        se ignoran.
+        """
+        nivel_agua, bomba_activa, fuentes, consumos, version, lloviendo = exportado[:6]
+        demanda, uso, entregado, pronosticos = (tuple(exportado[6:]) + (None,) * 4)[:4]
+        if demanda is not None and len(demanda) != len(self.CONSUMOS):
+            raise ValueError("La demanda guardada es de otros consumos")
+        if entregado is not None and len(entregado) != len(self.FUENTES):
+            raise ValueError("Lo entregado guardado es de otras fuentes")
+        with self.lock:
+            estado = self._estado
+            estado.nivel_agua = nivel_agua
+            estado.bomba_activa = bomba_activa
+            estado.fuentes = fuentes
+            estado.consumos = consumos
+            estado.version = version
+            if estado.esperando:
+                self.condicion.notify_all()
+            # Los eventos se ajustan con el lock tomado para que nadie vea
+            # la bomba activa con bomba_evento sin marcar
+            if bomba_activa:
+                self.bomba_evento.set()
+                self._acumulados.inicio_bomba = self.reloj()
+            else:
+                self.bomba_evento.clear()
+            if lloviendo:
+                self.lluvia_evento.set()
+            else:
+                self.lluvia_evento.clear()
+            if demanda is not None:
+                for i, (solicitadas, atendidas, rechazadas) in enumerate(demanda):
+                    self._solicitadas[i] = solicitadas
+                    self._atendidas[i] = atendidas
+                    self._rechazadas[i] = rechazadas
+            if uso is not None:
+                acumulados = self._acumulados
+                (acumulados.consumido, acumulados.arranques_bomba,
+                 acumulados.paradas_bomba, acumulados.segundos_bomba) = uso
+            if entregado is not None:
+                self._entregado[:] = entregado
+            for fuente, exportado_pronostico in pronosticos or ():
+                if fuente in self.pronosticos:
+                    self.pronosticos[fuente].restaurar(exportado_pronostico)
+    
+    def ejecutar(self, regla):
+        """
+        Ejecuta `regla(transaccion)` con una sola adquisición del lock y
+        devuelve lo que devuelva la regla. `transaccion` ofrece las mismas
+        operaciones que el tinaco (ver Transaccion), así que leer el estado
+        y actuar según él es atómico. Los eventos se registran al final.
+        """
+        transaccion = Transaccion(self)
+        with self._seccion("transaccion"):
+            resultado = regla(transaccion)
+        
+        if self.instrumentacion is not None:
+            for operacion, exito in transaccion.resultados:
+                self.instrumentacion.resultado(operacion, exito)
+        self._anotar_eventos(transaccion.eventos)
+        return resultado
+    
+    def transaccion(self, operaciones):
+        """
+        Aplica una lista de operaciones bajo un solo lock y devuelve la
+        lista de resultados. Cada operación es una tupla con el nombre de
+        un método de Transaccion y sus argumentos, p. ej.
+        [('obtener_estado',), ('activar_bomba',), ('llenar', 'Cisterna')].
+        """
+        return self.ejecutar(
+            lambda transaccion: [getattr(transaccion, nombre)(*argumentos)
+                                 for nombre, *argumentos in operaciones]
+        )
+
+
+class Transaccion:
+    """
+    Operaciones del tinaco dentro de TinacoContext.ejecutar. No toman el
+    lock (la transacción ya lo tiene) y acumulan los eventos para
+    registrarlos al terminar. Solo es válida durante la regla.
+    """
+    
+    def __init__(self, tinaco):
+        self.tinaco = tinaco
+        self.eventos = []
+        self.resultados = []  # (operación, éxito) para la instrumentación
+    
+    @property
+    def nivel_agua(self):
+        return self.tinaco.nivel_agua
+    
+    @property
+    def porcentaje(self):
+        return (self.tinaco.nivel_agua / self.tinaco.capacidad_max) * 100
+    
+    @property
+    def bomba_activa(self):
+        return self.tinaco.bomba_activa
+    
+    @property
+    def consumido(self):
+        """Litros entregados a los consumos desde que se creó el tinaco."""
+        return self.tinaco._acumulados.consumido
+    
+    def entregado(self, fuente=None):
+        """Litros que entregó `fuente` (o todas) desde que se creó el tinaco."""
+        entregado = self.tinaco._entregado
+        if fuente is None:
+            return sum(entregado)
+        return entregado[self.tinaco._indices_fuentes[fuente]]
+    
+    @property
+    def fuentes(self):
+        return self.tinaco.fuentes
+    
+    @property
+    def consumos(self):
+        return self.tinaco.consumos
+    
+    def _anotar(self, operacion, exito):
+        self.resultados.append((operacion, exito))
+        return exito
+    
+    def llenar(self, fuente):
+        return self._anotar("llenar:" + fuente, self.tinaco._llenar(fuente, self.eventos))
+    
+    def consumir(self, consumo):
+        return self._anotar("consumir:" + consumo, self.tinaco._consumir(consumo, self.eventos))
+    
+    def activar_bomba(self):
+        return self._anotar("activar_bomba", self.tinaco._activar_bomba(self.eventos))
+    
+    def desactivar_bomba(self):
+        return self._anotar("desactivar_bomba", self.tinaco._desactivar_bomba(self.eventos))
+    
+    def obtener_estado(self):
+        return self.tinaco._obtener_estado()
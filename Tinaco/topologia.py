@@ -0,0 +1,143 @@
+"""
+Topología declarativa: varios tinacos con sus fuentes y consumos en un
+archivo JSON. Todos los tinacos usan las mismas reglas genéricas
+(TinacoContext.llenar/consumir y los pasos de actores.py) y corren en un
+solo proceso sobre MotorSimulacion, sin un proceso por actor.
+
+Formato (los porcentajes son de la capacidad máxima):
+
+{
+  "tinacos": [
+    {
+      "nombre": "Torre A",
+      "replicas": 20,
+      "capacidad_max": 1000, "capacidad_min": 100, "nivel_inicial": 300,
+      "bomba": {"periodo": 1, "nivel_minimo": 25, "activacion_minima": 25},
+      "fuentes": [
+        {"nombre": "Pluvial", "tipo": "pluvial", "flujo": 15, "periodo": 4, "probabilidad": 0.2},
+        {"nombre": "Cisterna", "tipo": "cisterna", "flujo": 30, "periodo": 3,
+         "encender_bajo": 30, "apagar_sobre": 90}
+      ],
+      "consumos": [
+        {"nombre": "Jardin", "consumo": 10, "periodo": 5, "umbral": 50, "piso": "minimo"},
+        {"nombre": "Banio", "consumo": 5, "periodo": 3}
+      ]
+    }
+  ]
+}
+
+La cisterna acepta además "horizonte" (segundos) para llenar por anticipado
+según el pronóstico de la demanda (ver actores.paso_cisterna).
+"replicas" (opcional) crea "Torre A 1".."Torre A 20" con la misma
+configuración. Lo que se omite toma el valor del tinaco por defecto.
+"""
+import json
+
+from actores import ACTORES_BASE
+from simulacion import MotorSimulacion
+from tinaco_context import TinacoContext, FUENTES_BASE, CONSUMOS_BASE
+
+_FUENTE_POR_TIPO = {fuente['tipo']: fuente for fuente in ACTORES_BASE['fuentes']}
+_FLUJO_POR_TIPO = {fuente['tipo']: FUENTES_BASE[fuente['nombre']] for fuente in ACTORES_BASE['fuentes']}
+
+
+def _normalizar_fuente(fuente):
+    tipo = fuente.get('tipo')
+    if tipo not in _FUENTE_POR_TIPO:
+        raise ValueError(f"Fuente {fuente.get('nombre')!r}: tipo desconocido {tipo!r}")
+    normalizada = dict(_FUENTE_POR_TIPO[tipo], flujo=_FLUJO_POR_TIPO[tipo])
+    normalizada.update(fuente)
+    return normalizada
+
+
+def _normalizar_consumo(consumo):
+    base = next((c for c in ACTORES_BASE['consumos'] if c['nombre'] == consumo.get('nombre')), None)
+    if base is not None:
+        regla = CONSUMOS_BASE[base['nombre']]
+        normalizado = {
+            'nombre': base['nombre'],
+            'periodo': base['periodo'],
+            'consumo': regla['consumo'],
+            'umbral': regla['umbral'] * 100,
+            'piso': 'minimo' if regla['piso'] is None else regla['piso'] * 100,
+        }
+    else:
+        normalizado = {'umbral': 0, 'piso': 0}
+    normalizado.update(consumo)
+    for campo in ('nombre', 'consumo', 'periodo'):
+        if campo not in normalizado:
+            raise ValueError(f"Consumo {consumo.get('nombre')!r}: falta {campo!r}")
+    return normalizado
+
+
+def normalizar_tinaco(config):
+    """Completa la configuración de un tinaco con los valores por defecto."""
+    normalizado = {
+        'nombre': config.get('nombre'),
+        'capacidad_max': config.get('capacidad_max', 1000),
+        'capacidad_min': config.get('capacidad_min', 100),
+        'nivel_inicial': config.get('nivel_inicial', 300),
+        'bomba': dict(ACTORES_BASE['bomba'], activacion_minima=25),
+    }
+    normalizado['bomba'].update(config.get('bomba', {}))
+    if 'fuentes' in config:
+        normalizado['fuentes'] = [_normalizar_fuente(f) for f in config['fuentes']]
+    else:
+        normalizado['fuentes'] = [_normalizar_fuente({'tipo': f['tipo']}) for f in ACTORES_BASE['fuentes']]
+    if 'consumos' in config:
+        normalizado['consumos'] = [_normalizar_consumo(c) for c in config['consumos']]
+    else:
+        normalizado['consumos'] = [_normalizar_consumo({'nombre': c['nombre']}) for c in ACTORES_BASE['consumos']]
+    return normalizado
+
+
+def cargar_topologia(ruta):
+    """Lee un archivo de topología y devuelve la lista de tinacos normalizados."""
+    with open(ruta, encoding="utf-8") as archivo:
+        datos = json.load(archivo)
+
+    tinacos = []
+    for i, original in enumerate(datos.get('tinacos', [])):
+        config = normalizar_tinaco(original)
+        nombre = config['nombre'] or f"Tinaco {i + 1}"
+        replicas = original.get('replicas', 1)
+        if replicas == 1:
+            tinacos.append(dict(config, nombre=nombre))
+        else:
+            tinacos.extend(dict(config, nombre=f"{nombre} {n + 1}") for n in range(replicas))
+
+    nombres = [t['nombre'] for t in tinacos]
+    if len(set(nombres)) != len(nombres):
+        raise ValueError("Los nombres de los tinacos deben ser únicos")
+    return tinacos
+
+
+def crear_tinaco(config, **opciones):
+    """Crea el TinacoContext de una configuración normalizada."""
+    fuentes = {f['nombre']: f['flujo'] for f in config['fuentes']}
+    consumos = {
+        c['nombre']: {
+            'consumo': c['consumo'],
+            'umbral': c['umbral'] / 100,
+            'piso': None if c['piso'] == 'minimo' else c['piso'] / 100,
+        }
+        for c in config['consumos']
+    }
+    return TinacoContext(
+        nombre=config['nombre'],
+        capacidad_max=config['capacidad_max'],
+        capacidad_min=config['capacidad_min'],
+        nivel_inicial=config['nivel_inicial'],
+        nivel_minimo_bomba=config['bomba']['activacion_minima'] / 100,
+        fuentes=fuentes,
+        consumos=consumos,
+        **opciones
+    )
+
+
+def crear_motor(tinacos, semilla=None, tiempo_real=False, verbosidad="silencio"):
+    """Arma un MotorSimulacion con todos los tinacos de la topología."""
+    motor = MotorSimulacion(tiempo_real=tiempo_real, semilla=semilla)
+    for config in tinacos:
+        motor.agregar_tinaco(crear_tinaco(config, verbosidad=verbosidad), config)
+    return motor
@@ -0,0 +1,198 @@
+"""
+Grabación y reproducción de las mutaciones de un TinacoContext.
+
+Cada llenar/consumir/activar_bomba/desactivar_bomba se agrega, con el lock
+del tinaco tomado, como un registro de 4 bytes a un archivo mapeado en
+memoria: el orden del archivo es el orden en que los procesos tomaron el
+lock. La reproducción vuelve a aplicar las operaciones en ese orden sobre un
+tinaco nuevo, sin procesos ni esperas, y comprueba cada resultado y el
+estado final.
+"""
+import functools
+import json
+import mmap
+import os
+import struct
+import time
+
+# Operaciones grabadas
+LLENAR = 1
+CONSUMIR = 2
+ACTIVAR_BOMBA = 3
+DESACTIVAR_BOMBA = 4
+
+# Encabezado: firma, formato, largo de la configuración (JSON), capacidad
+# (registros), total escritos, truncada, estado inicial, hay final, estado final
+_FIRMA = b'TINTRAZ1'
+_FORMATO = 1
+_ENCABEZADO = struct.Struct('<8sHxxIQ')
+_OFFSET_ESCRITOS = _ENCABEZADO.size
+_ESCRITOS = struct.Struct('<QB')
+# Estado: nivel_agua, bomba_activa, fuentes, consumos, version
+_ESTADO = struct.Struct('<dBIIQ')
+_OFFSET_INICIAL = 40
+_OFFSET_HAY_FINAL = 71
+_OFFSET_FINAL = 72
+_TAMANO_ENCABEZADO = 128
+
+# Registro: operación, índice de la fuente o consumo, resultado
+REGISTRO = struct.Struct('<BBBx')
+
+
+class TrazaMutaciones:
+    """
+    Traza binaria de solo agregado. Se crea con crear() a partir de un
+    tinaco (guarda su configuración y su estado actual) y se asigna a
+    tinaco.traza antes de arrancar los procesos. Si se llena se marca como
+    truncada y deja de grabar.
+    """
+
+    def __init__(self, ruta):
+        """Abre una traza existente (para reproducirla o seguir grabando)."""
+        self.ruta = ruta
+        self._abrir()
+
+    @classmethod
+    def crear(cls, ruta, tinaco, tamano_max=64 * 1024 * 1024):
+        """Crea (o reemplaza) la traza de `tinaco` en `ruta`."""
+        config = json.dumps({
+            'nombre': tinaco.nombre,
+            'capacidad_max': tinaco.capacidad_max,
+            'capacidad_min': tinaco.capacidad_min,
+            'nivel_minimo_bomba': tinaco.nivel_minimo_bomba,
+            'fuentes': tinaco.flujos,
+            'consumos': tinaco.reglas_consumo,
+        }).encode("utf-8")
+        inicio_registros = _TAMANO_ENCABEZADO + (len(config) + 7) // 8 * 8
+        capacidad = (tamano_max - inicio_registros) // REGISTRO.size
+        if capacidad < 1:
+            raise ValueError(f"tamano_max demasiado pequeño: {tamano_max} bytes")
+
+        with open(ruta, 'wb') as archivo:
+            archivo.truncate(inicio_registros + capacidad * REGISTRO.size)
+            archivo.write(_ENCABEZADO.pack(_FIRMA, _FORMATO, len(config), capacidad))
+            archivo.seek(_OFFSET_INICIAL)
+            archivo.write(_ESTADO.pack(*tinaco.exportar_estado()[:5]))
+            archivo.seek(_TAMANO_ENCABEZADO)
+            archivo.write(config)
+        return cls(ruta)
+
+    def _abrir(self):
+        fd = os.open(self.ruta, os.O_RDWR)
+        try:
+            self._mapa = mmap.mmap(fd, 0)
+        finally:
+            os.close(fd)
+        firma, formato, largo_config, self.capacidad = _ENCABEZADO.unpack_from(self._mapa, 0)
+        if firma != _FIRMA or formato != _FORMATO:
+            raise ValueError(f"{self.ruta} no es una traza de tinaco válida")
+        self.config = json.loads(self._mapa[_TAMANO_ENCABEZADO:_TAMANO_ENCABEZADO + largo_config])
+        self._inicio = _TAMANO_ENCABEZADO + (largo_config + 7) // 8 * 8
+
+    def __getstate__(self):
+        # El mapa se vuelve a abrir en cada proceso
+        return {'ruta': self.ruta}
+
+    def __setstate__(self, estado):
+        self.__dict__.update(estado)
+        self._abrir()
+
+    @property
+    def escritos(self):
+        """Registros grabados."""
+        return _ESCRITOS.unpack_from(self._mapa, _OFFSET_ESCRITOS)[0]
+
+    @property
+    def truncada(self):
+        """True si la traza se llenó y se perdieron operaciones."""
+        return bool(_ESCRITOS.unpack_from(self._mapa, _OFFSET_ESCRITOS)[1])
+
+    def __len__(self):
+        return self.escritos
+
+    def agregar(self, operacion, indice, exito):
+        """Agrega un registro. Se llama con el lock del tinaco tomado."""
+        escritos, truncada = _ESCRITOS.unpack_from(self._mapa, _OFFSET_ESCRITOS)
+        if escritos >= self.capacidad:
+            if not truncada:
+                _ESCRITOS.pack_into(self._mapa, _OFFSET_ESCRITOS, escritos, 1)
+            return
+        REGISTRO.pack_into(self._mapa, self._inicio + escritos * REGISTRO.size, operacion, indice, exito)
+        # El contador se actualiza después: un lector nunca ve un registro a medias
+        _ESCRITOS.pack_into(self._mapa, _OFFSET_ESCRITOS, escritos + 1, 0)
+
+    @property
+    def estado_inicial(self):
+        return _ESTADO.unpack_from(self._mapa, _OFFSET_INICIAL)
+
+    @property
+    def estado_final(self):
+        """Estado guardado por terminar(), o None si la grabación no terminó."""
+        if not self._mapa[_OFFSET_HAY_FINAL]:
+            return None
+        return _ESTADO.unpack_from(self._mapa, _OFFSET_FINAL)
+
+    def terminar(self, tinaco):
+        """Guarda el estado final de `tinaco` para verificar la reproducción."""
+        _ESTADO.pack_into(self._mapa, _OFFSET_FINAL, *tinaco.exportar_estado()[:5])
+        self._mapa[_OFFSET_HAY_FINAL] = 1
+        self._mapa.flush()
+
+    def registros(self):
+        """Itera los registros como tuplas (operacion, indice, exito), sin copiar el buffer."""
+        fin = self._inicio + self.escritos * REGISTRO.size
+        with memoryview(self._mapa) as vista:
+            yield from REGISTRO.iter_unpack(vista[self._inicio:fin])
+
+    def cerrar(self):
+        self._mapa.close()
+
+
+def reproducir(ruta):
+    """
+    Aplica la traza de `ruta` sobre un tinaco nuevo lo más rápido posible y
+    devuelve un resumen: operaciones, segundos, ops_por_s, la primera
+    operación cuyo resultado difiere (divergencia, o None) y si el estado
+    final coincide con el grabado (coincide, o None si no se guardó).
+    """
+    from tinaco_context import TinacoContext
+
+    traza = TrazaMutaciones(ruta)
+    config = traza.config
+    tinaco = TinacoContext(
+        verbosidad="silencio", nombre=config['nombre'],
+        capacidad_max=config['capacidad_max'], capacidad_min=config['capacidad_min'],
+        nivel_minimo_bomba=config['nivel_minimo_bomba'],
+        fuentes=config['fuentes'], consumos=config['consumos'],
+    )
+    tinaco.restaurar_estado(tuple(traza.estado_inicial) + (False,))
+
+    operaciones = {
+        LLENAR: [functools.partial(tinaco.llenar, fuente) for fuente in tinaco.FUENTES],
+        CONSUMIR: [functools.partial(tinaco.consumir, consumo) for consumo in tinaco.CONSUMOS],
+        ACTIVAR_BOMBA: [tinaco.activar_bomba],
+        DESACTIVAR_BOMBA: [tinaco.desactivar_bomba],
+    }
+
+    divergencia = None
+    n = 0
+    inicio = time.perf_counter()
+    for n, (operacion, indice, exito) in enumerate(traza.registros(), 1):
+        if operaciones[operacion][indice]() != exito and divergencia is None:
+            divergencia = n - 1
+    segundos = time.perf_counter() - inicio
+
+    final = tinaco.exportar_estado()[:5]
+    grabado = traza.estado_final
+    resumen = {
+        'operaciones': n,
+        'segundos': segundos,
+        'ops_por_s': n / segundos if segundos > 0 else 0.0,
+        'divergencia': divergencia,
+        'truncada': traza.truncada,
+        'coincide': None if grabado is None else tuple(final) == tuple(grabado),
+        'nivel_final': final[0],
+        'version_final': final[4],
+    }
+    traza.cerrar()
+    return resumen